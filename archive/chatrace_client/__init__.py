@@ -0,0 +1,23 @@
+"""Importable ChatRace API client (sync + asyncio) used by the archive probes"""
+
+from .client import (
+    AUTH_ERROR_CODE,
+    DEFAULT_API_URL,
+    ChatRaceClient,
+    ChatRaceConfig,
+    ChatRaceResponse,
+)
+from .aio import AsyncChatRaceClient
+from .stats import EndpointStats, percentile, write_report
+
+__all__ = [
+    "AUTH_ERROR_CODE",
+    "DEFAULT_API_URL",
+    "AsyncChatRaceClient",
+    "ChatRaceClient",
+    "ChatRaceConfig",
+    "ChatRaceResponse",
+    "EndpointStats",
+    "percentile",
+    "write_report",
+]
@@ -0,0 +1,69 @@
+"""asyncio flavour of the ChatRace client.
+
+`requests` has no native asyncio support and the archive scripts only depend
+on `requests` + `python-dotenv`, so instead of pulling in another HTTP stack
+the async client runs the pooled sync client on a bounded thread pool and
+caps in-flight calls with a semaphore.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from .client import ChatRaceClient, ChatRaceConfig, ChatRaceResponse
+
+
+class AsyncChatRaceClient:
+    """Awaitable wrapper around `ChatRaceClient` with configurable concurrency"""
+
+    def __init__(self, config: Optional[ChatRaceConfig] = None, **overrides):
+        self._client = ChatRaceClient(config, **overrides)
+        self.config = self._client.config
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, self.config.concurrency),
+            thread_name_prefix="chatrace",
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self._client.close()
+
+    def _limit(self) -> asyncio.Semaphore:
+        # Created lazily so the semaphore binds to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(max(1, self.config.concurrency))
+        return self._semaphore
+
+    async def call(self, payload: Dict[str, Any], auth: bool = True, token: Optional[str] = None,
+                   url: Optional[str] = None) -> ChatRaceResponse:
+        loop = asyncio.get_running_loop()
+        async with self._limit():
+            return await loop.run_in_executor(
+                self._executor, lambda: self._client.call(payload, auth=auth, token=token, url=url)
+            )
+
+    async def call_many(self, payloads: Iterable[Dict[str, Any]], auth: bool = True) -> List[ChatRaceResponse]:
+        """Fan out payloads concurrently, preserving input order"""
+        return await asyncio.gather(*(self.call(p, auth=auth) for p in payloads))
+
+    async def whitelabel(self) -> ChatRaceResponse:
+        return await self.call({"op": "wt", "op1": "get"})
+
+    async def conversations_get(self, account_id: Optional[str] = None, offset: int = 0,
+                                limit: Optional[int] = None) -> ChatRaceResponse:
+        payload = {"account_id": account_id or self.config.business_id, "op": "conversations",
+                   "op1": "get", "offset": offset}
+        if limit is not None:
+            payload["limit"] = limit
+        return await self.call(payload)
+
+    async def list_get(self, op: str, account_id: Optional[str] = None, **extra) -> ChatRaceResponse:
+        return await self.call({"account_id": account_id or self.config.business_id, "op": op,
+                                "op1": "get", **extra})
@@ -0,0 +1,243 @@
+"""Sync ChatRace client with a shared keep-alive connection pool"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_API_URL = "https://app.aiprlassist.com/php/user"
+DEFAULT_CONCURRENCY = 8
+DEFAULT_TIMEOUT = 30
+
+# ChatRace answers auth failures with {"status": "ERROR", "code": 1}
+AUTH_ERROR_CODE = 1
+
+
+@dataclass
+class ChatRaceResponse:
+    """Result of one op/op1/op2 call, classified like the archive probes do"""
+
+    status_code: int
+    text: str
+    elapsed: float
+    ttfb: float = 0.0
+    data: Any = None
+    error: Optional[str] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.text.encode("utf-8")) if self.text else 0
+
+    @property
+    def outcome(self) -> str:
+        """One of: ok, non_json, null, auth_error, api_error, http_error, exception"""
+        if self.error is not None:
+            return "exception"
+        if self.status_code != 200:
+            return "http_error"
+        if isinstance(self.data, dict):
+            if self.data.get("status") == "OK":
+                return "ok"
+            if self.data.get("code") == AUTH_ERROR_CODE:
+                return "auth_error"
+            return "api_error"
+        if self.text.strip() == "null":
+            return "null"
+        if self.data is None:
+            # Non-JSON bodies are treated as success by the original scripts
+            return "non_json"
+        return "ok"
+
+    @property
+    def ok(self) -> bool:
+        return self.outcome in ("ok", "non_json")
+
+    @property
+    def error_code(self) -> Any:
+        if isinstance(self.data, dict):
+            return self.data.get("code", "Unknown")
+        return None
+
+
+@dataclass
+class ChatRaceConfig:
+    """Connection settings, defaulting to the same .env keys the scripts use"""
+
+    api_url: str = DEFAULT_API_URL
+    user_token: Optional[str] = None
+    api_token: Optional[str] = None
+    business_id: Optional[str] = None
+    user_id: Optional[str] = None
+    concurrency: int = DEFAULT_CONCURRENCY
+    timeout: float = DEFAULT_TIMEOUT
+    retries: int = 0
+    extra_headers: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_env(cls, **overrides) -> "ChatRaceConfig":
+        values = {
+            "api_url": os.getenv("API_URL") or DEFAULT_API_URL,
+            "user_token": os.getenv("USER_TOKEN"),
+            "api_token": os.getenv("API_TOKEN"),
+            "business_id": os.getenv("BUSINESS_ID"),
+            "user_id": os.getenv("USER_ID"),
+            "concurrency": int(os.getenv("CHATRACE_CONCURRENCY", DEFAULT_CONCURRENCY)),
+            "timeout": float(os.getenv("CHATRACE_TIMEOUT", DEFAULT_TIMEOUT)),
+        }
+        values.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**values)
+
+
+class ChatRaceClient:
+    """Pooled client for the `{op, op1, op2, account_id}` JSON protocol.
+
+    One `requests.Session` is shared by every call so TCP+TLS connections to
+    the PHP endpoint are reused; the pool is sized to `concurrency` so
+    `call_many` never opens more sockets than it has workers.
+    """
+
+    def __init__(self, config: Optional[ChatRaceConfig] = None, **overrides):
+        self.config = config or ChatRaceConfig.from_env(**overrides)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=max(1, self.config.concurrency),
+            max_retries=self.config.retries,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "User-Agent": "mobile-app",
+            **self.config.extra_headers,
+        })
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self.session.close()
+
+    # ===== core transport =====
+
+    def headers_for(self, auth: bool = True, token: Optional[str] = None) -> Dict[str, str]:
+        if not auth:
+            return {}
+        token = token or self.config.user_token or self.config.api_token
+        return {"X-ACCESS-TOKEN": token} if token else {}
+
+    def call(self, payload: Dict[str, Any], auth: bool = True, token: Optional[str] = None,
+             url: Optional[str] = None) -> ChatRaceResponse:
+        """POST one payload and return a classified response (never raises on HTTP errors)"""
+        started = time.perf_counter()
+        try:
+            response = self.session.post(
+                url or self.config.api_url,
+                json=payload,
+                headers=self.headers_for(auth, token),
+                timeout=self.config.timeout,
+                stream=True,
+            )
+            # With stream=True the body has not been read yet, so this is TTFB
+            ttfb = time.perf_counter() - started
+            text = response.text
+            elapsed = time.perf_counter() - started
+        except requests.RequestException as e:
+            return ChatRaceResponse(0, "", time.perf_counter() - started, error=str(e))
+
+        try:
+            data = json.loads(text)
+        except (json.JSONDecodeError, ValueError):
+            data = None
+        return ChatRaceResponse(response.status_code, text, elapsed, ttfb=ttfb, data=data)
+
+    def call_many(self, payloads: Iterable[Dict[str, Any]], auth: bool = True,
+                  concurrency: Optional[int] = None) -> List[ChatRaceResponse]:
+        """Run payloads in parallel on the shared pool, preserving input order"""
+        payloads = list(payloads)
+        workers = max(1, min(concurrency or self.config.concurrency, len(payloads) or 1))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda p: self.call(p, auth=auth), payloads))
+
+    # ===== typed helpers per op family =====
+
+    def _account(self, account_id: Optional[str]) -> Optional[str]:
+        return account_id or self.config.business_id
+
+    def whitelabel(self) -> ChatRaceResponse:
+        return self.call({"op": "wt", "op1": "get"})
+
+    def users_get(self, user_id: Optional[str] = None, account_id: Optional[str] = None,
+                  ms_id: Optional[str] = None) -> ChatRaceResponse:
+        payload = {"account_id": self._account(account_id), "op": "users", "op1": "get"}
+        if user_id is not None:
+            payload["user_id"] = user_id
+        if ms_id is not None:
+            payload["ms_id"] = ms_id
+        return self.call(payload)
+
+    def conversations_get(self, account_id: Optional[str] = None, offset: int = 0,
+                          limit: Optional[int] = None, conversation_id: Optional[str] = None) -> ChatRaceResponse:
+        payload = {"account_id": self._account(account_id), "op": "conversations", "op1": "get", "offset": offset}
+        if limit is not None:
+            payload["limit"] = limit
+        if conversation_id is not None:
+            payload["id"] = conversation_id
+        return self.call(payload)
+
+    def conversations_send(self, contact_id: str, message: str, channel: int = 9,
+                           account_id: Optional[str] = None) -> ChatRaceResponse:
+        return self.call({
+            "account_id": self._account(account_id), "op": "conversations", "op1": "send",
+            "contact_id": contact_id, "channel": channel, "message": message,
+        })
+
+    def conversations_update(self, contact_id: str, op2: str, data: Dict[str, Any],
+                             account_id: Optional[str] = None) -> ChatRaceResponse:
+        return self.call({
+            "account_id": self._account(account_id), "op": "conversations", "op1": "update",
+            "op2": op2, "contact_id": contact_id, "data": data,
+        })
+
+    def contacts_get(self, contact_id: str, account_id: Optional[str] = None) -> ChatRaceResponse:
+        return self.call({"account_id": self._account(account_id), "op": "contacts", "op1": "get",
+                          "contact_id": contact_id})
+
+    def list_get(self, op: str, account_id: Optional[str] = None, **extra) -> ChatRaceResponse:
+        """Generic `{op}/get` for the reference lists (admins, inbox_team, flows, tags, ...)"""
+        return self.call({"account_id": self._account(account_id), "op": op, "op1": "get", **extra})
+
+    def admins_get(self, account_id: Optional[str] = None) -> ChatRaceResponse:
+        return self.list_get("admins", account_id, basic_info=True)
+
+    def teams_get(self, account_id: Optional[str] = None) -> ChatRaceResponse:
+        return self.list_get("inbox_team", account_id)
+
+    def flows_get(self, account_id: Optional[str] = None) -> ChatRaceResponse:
+        return self.list_get("flows", account_id)
+
+    def tags_get(self, account_id: Optional[str] = None) -> ChatRaceResponse:
+        return self.list_get("tags", account_id)
+
+    def products_get(self, account_id: Optional[str] = None) -> ChatRaceResponse:
+        return self.list_get("products", account_id)
+
+    def saved_replies_get(self, account_id: Optional[str] = None) -> ChatRaceResponse:
+        return self.list_get("inbox_saved_reply", account_id)
+
+    def calendars_get(self, account_id: Optional[str] = None) -> ChatRaceResponse:
+        return self.list_get("calendars", account_id)
+
+    def orders_get(self, order_id: Optional[str] = None, account_id: Optional[str] = None) -> ChatRaceResponse:
+        payload = {"account_id": self._account(account_id), "op": "ecommerce", "op1": "orders", "op2": "get"}
+        if order_id is not None:
+            payload["id"] = order_id
+        return self.call(payload)
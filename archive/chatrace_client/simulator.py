@@ -0,0 +1,289 @@
+"""Local stand-in for the ChatRace PHP endpoint (`/php/user`).
+
+Speaks the same `{op, op1, op2, account_id}` JSON protocol, serves the saved
+fixtures from `archive/` and can synthesize large accounts plus inject
+latency and error codes, so the probes and `backend/server.js` (via API_URL)
+can be benchmarked offline:
+
+    python -m chatrace_client.simulator --port 8090 --conversations 20000 \\
+        --latency-ms 40 --jitter-ms 20 --error-rate 0.02 --error-code 1
+
+    API_URL=http://127.0.0.1:8090/php/user node backend/server.js
+"""
+
+import argparse
+import copy
+import json
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent
+
+# Ops the real endpoint answers without X-ACCESS-TOKEN
+PUBLIC_OPS = {"wt", "whitelabel", "login"}
+
+# ChatRace caps conversations/get pages; larger limits are clamped
+MAX_PAGE = 200
+
+
+def load_fixture(name: str) -> Any:
+    with open(FIXTURES_DIR / name, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@dataclass
+class SimulatorConfig:
+    conversations: int = 0
+    messages_per_conversation: int = 40
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    error_code: int = 1
+    http_error_rate: float = 0.0
+    error_ops: List[str] = field(default_factory=list)
+    token: Optional[str] = None
+    seed: int = 42
+
+
+class ChatRaceSimulator:
+    """In-memory ChatRace account built from fixtures plus synthetic rows"""
+
+    def __init__(self, config: SimulatorConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+        self.whitelabel = load_fixture("whitelabel_response.json")
+        self.conversation_templates = load_fixture("working_conversations.json")["data"]
+        self.message_templates = load_fixture("working_messages.json")["data"]
+
+        self.conversations: List[Dict[str, Any]] = copy.deepcopy(self.conversation_templates)
+        self.conversations.extend(self._synthesize_conversations(config.conversations))
+        self._sort()
+        self.by_id = {c["ms_id"]: c for c in self.conversations}
+        # Appended via conversations/send; everything else is generated lazily
+        self.sent: Dict[str, List[Dict[str, Any]]] = {}
+
+    # ===== data synthesis =====
+
+    def _synthesize_conversations(self, count: int) -> List[Dict[str, Any]]:
+        now_ms = int(time.time() * 1000)
+        rows = []
+        for i in range(count):
+            template = self.conversation_templates[i % len(self.conversation_templates)]
+            ts = now_ms - self.rng.randint(0, 90 * 24 * 3600 * 1000)
+            row = dict(template)
+            row.update({
+                "ms_id": str(9_000_000_000_000_000_000 + i),
+                "full_name": f"Guest {100000 + i}",
+                "channel": self.rng.choice(["0", "9", "9", "9", "10"]),
+                "timestamp": str(ts),
+                "last_active": str(ts // 1000),
+                "t_last_sent": str(ts),
+            })
+            rows.append(row)
+        return rows
+
+    def _sort(self) -> None:
+        self.conversations.sort(key=lambda c: int(c.get("timestamp") or 0), reverse=True)
+
+    def messages_for(self, conversation_id: str) -> List[Dict[str, Any]]:
+        """Deterministic per-conversation history so repeated reads are stable"""
+        convo = self.by_id.get(conversation_id)
+        if convo is None:
+            return []
+        if conversation_id in {c["ms_id"] for c in self.conversation_templates}:
+            base = copy.deepcopy(self.message_templates)
+        else:
+            rng = random.Random(zlib.crc32(conversation_id.encode()))
+            last_ts = int(convo.get("timestamp") or 0)
+            base = []
+            for n in range(self.config.messages_per_conversation):
+                template = self.message_templates[n % len(self.message_templates)]
+                ts = last_ts - (self.config.messages_per_conversation - n) * rng.randint(1_000, 600_000)
+                base.append({
+                    **template,
+                    "id": f"{conversation_id}{ts}",
+                    "channel": convo["channel"],
+                    "dir": str(n % 2),
+                    "timestamp": str(ts),
+                })
+        return sorted(base + self.sent.get(conversation_id, []),
+                      key=lambda m: int(m["timestamp"]), reverse=True)
+
+    # ===== protocol =====
+
+    def handle(self, payload: Dict[str, Any], token: Optional[str]) -> Tuple[int, Any]:
+        op = str(payload.get("op") or "")
+        op1 = str(payload.get("op1") or "")
+        op2 = str(payload.get("op2") or "")
+        key = "/".join(p for p in (op, op1, op2) if p)
+        with self.lock:
+            self.stats[key] += 1
+
+        injected = self._inject_error(op)
+        if injected is not None:
+            return injected
+
+        if op not in PUBLIC_OPS:
+            if not token or (self.config.token and token != self.config.token):
+                return 200, {"status": "ERROR", "code": 1}
+
+        if op in ("wt", "whitelabel"):
+            return 200, self.whitelabel
+        if op == "conversations" and op1 == "get":
+            return 200, self._conversations_get(payload)
+        if op == "conversations" and op1 == "send":
+            return 200, self._conversations_send(payload)
+        if op == "conversations" and op1 == "update":
+            return 200, {"status": "OK"}
+        if op in ("users", "contacts") and op1 == "get":
+            cid = str(payload.get("ms_id") or payload.get("contact_id") or payload.get("user_id") or "")
+            convo = self.by_id.get(cid)
+            if convo is None:
+                return 200, {"status": "ERROR", "code": 404}
+            return 200, {"status": "OK", "data": {"id": cid, "full_name": convo["full_name"],
+                                                 "phone": convo.get("phone", ""), "email": ""}}
+        if op1 in ("get", ""):
+            return 200, {"status": "OK", "data": []}
+        return 200, {"status": "OK"}
+
+    def _inject_error(self, op: str) -> Optional[Tuple[int, Any]]:
+        cfg = self.config
+        if cfg.error_ops and op not in cfg.error_ops:
+            return None
+        roll = self.rng.random()
+        if roll < cfg.http_error_rate:
+            return 500, None
+        if roll < cfg.http_error_rate + cfg.error_rate:
+            return 200, {"status": "ERROR", "code": cfg.error_code}
+        return None
+
+    def _conversations_get(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        offset = max(0, int(payload.get("offset") or 0))
+        limit = max(1, min(MAX_PAGE, int(payload.get("limit") or 20)))
+        if payload.get("id"):
+            messages = self.messages_for(str(payload["id"]))
+            return {"status": "OK", "data": messages[offset:offset + limit]}
+        with self.lock:
+            page = self.conversations[offset:offset + limit]
+        return {"status": "OK", "data": page}
+
+    def _conversations_send(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        cid = str(payload.get("contact_id") or "")
+        convo = self.by_id.get(cid)
+        if convo is None:
+            return {"status": "ERROR", "code": 404}
+        now_ms = int(time.time() * 1000)
+        text = str(payload.get("message") or "")
+        message = {
+            "id": f"{cid}{now_ms}",
+            "channel": str(payload.get("channel", convo["channel"])),
+            "dir": "0",
+            "sentBy": "1",
+            "message": json.dumps([{"text": text}]),
+            "timestamp": str(now_ms),
+        }
+        with self.lock:
+            self.sent.setdefault(cid, []).append(message)
+            convo["timestamp"] = str(now_ms)
+            convo["last_msg"] = text[:100]
+            self._sort()
+        return {"status": "OK", "data": {"id": message["id"]}}
+
+    def sleep(self) -> None:
+        cfg = self.config
+        delay = cfg.latency_ms + (self.rng.uniform(0, cfg.jitter_ms) if cfg.jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+
+def make_handler(sim: ChatRaceSimulator):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, body: Any) -> None:
+            raw = b"null" if body is None else json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_GET(self):
+            if self.path.startswith("/__stats"):
+                with sim.lock:
+                    return self._send(200, {"requests": dict(sim.stats),
+                                            "conversations": len(sim.conversations)})
+            self._send(404, {"status": "ERROR", "message": "POST the JSON protocol"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            token = self.headers.get("X-ACCESS-TOKEN")
+            sim.sleep()
+            if "application/json" not in (self.headers.get("Content-Type") or ""):
+                # Multipart uploads (files) are accepted and acknowledged
+                return self._send(200, {"status": "OK", "data": {"bytes": len(raw)}})
+            try:
+                payload = json.loads(raw or b"{}")
+            except json.JSONDecodeError:
+                return self._send(200, None)
+            status, body = sim.handle(payload, token)
+            self._send(status, body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local ChatRace upstream simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--conversations", type=int, default=0, help="synthetic conversations on top of fixtures")
+    parser.add_argument("--messages", type=int, default=40, help="messages per synthetic conversation")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction answered with {status: ERROR, code}")
+    parser.add_argument("--error-code", type=int, default=1)
+    parser.add_argument("--http-error-rate", type=float, default=0.0, help="fraction answered with HTTP 500")
+    parser.add_argument("--error-ops", nargs="*", default=[], help="only inject errors for these ops")
+    parser.add_argument("--token", help="require this exact X-ACCESS-TOKEN")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    sim = ChatRaceSimulator(SimulatorConfig(
+        conversations=args.conversations,
+        messages_per_conversation=args.messages,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_code=args.error_code,
+        http_error_rate=args.http_error_rate,
+        error_ops=args.error_ops,
+        token=args.token,
+        seed=args.seed,
+    ))
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(sim))
+    print(f"🧪 ChatRace simulator on http://{args.host}:{args.port}/php/user "
+          f"({len(sim.conversations)} conversations)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Latency aggregation and diffable reports for endpoint sweeps"""
+
+import csv
+import json
+import math
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Sequence
+
+from .client import ChatRaceResponse
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is open-ended
+HISTOGRAM_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty sample"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def histogram(values_ms: Sequence[float]) -> Dict[str, int]:
+    counts = Counter()
+    for value in values_ms:
+        for bound in HISTOGRAM_BUCKETS_MS:
+            if value <= bound:
+                counts[f"<={bound}ms"] += 1
+                break
+        else:
+            counts[f">{HISTOGRAM_BUCKETS_MS[-1]}ms"] += 1
+    labels = [f"<={b}ms" for b in HISTOGRAM_BUCKETS_MS] + [f">{HISTOGRAM_BUCKETS_MS[-1]}ms"]
+    return {label: counts.get(label, 0) for label in labels}
+
+
+@dataclass
+class EndpointStats:
+    """Per-endpoint summary over N repetitions (all times in milliseconds)"""
+
+    name: str
+    samples: int
+    outcome: str
+    outcomes: Dict[str, int]
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    ttfb_p50_ms: float
+    ttfb_p95_ms: float
+    bytes_p50: float
+    histogram: Dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_responses(cls, name: str, responses: List[ChatRaceResponse]) -> "EndpointStats":
+        latencies = [r.elapsed * 1000 for r in responses]
+        ttfbs = [r.ttfb * 1000 for r in responses]
+        sizes = [r.size for r in responses]
+        outcomes = Counter(r.outcome for r in responses)
+        return cls(
+            name=name,
+            samples=len(responses),
+            # The dominant outcome is what gets compared between runs
+            outcome=outcomes.most_common(1)[0][0] if outcomes else "none",
+            outcomes=dict(outcomes),
+            p50_ms=round(percentile(latencies, 50), 1),
+            p95_ms=round(percentile(latencies, 95), 1),
+            p99_ms=round(percentile(latencies, 99), 1),
+            max_ms=round(max(latencies, default=0.0), 1),
+            ttfb_p50_ms=round(percentile(ttfbs, 50), 1),
+            ttfb_p95_ms=round(percentile(ttfbs, 95), 1),
+            bytes_p50=percentile(sizes, 50),
+            histogram=histogram(latencies),
+        )
+
+
+CSV_COLUMNS = [
+    "name", "samples", "outcome", "p50_ms", "p95_ms", "p99_ms", "max_ms",
+    "ttfb_p50_ms", "ttfb_p95_ms", "bytes_p50",
+]
+
+
+def write_report(path: str, stats: List[EndpointStats], meta: Dict) -> None:
+    """Write a JSON (default) or CSV report; rows are sorted by name so runs diff cleanly"""
+    rows = sorted(stats, key=lambda s: s.name)
+    if path.endswith(".csv"):
+        hist_columns = [f"hist_{k}" for k in rows[0].histogram] if rows else []
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS + hist_columns)
+            writer.writeheader()
+            for row in rows:
+                record = {k: getattr(row, k) for k in CSV_COLUMNS}
+                record.update({f"hist_{k}": v for k, v in row.histogram.items()})
+                writer.writerow(record)
+        return
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "endpoints": [asdict(row) for row in rows]}, f, indent=2)
@@ -1,8 +1,8 @@
 #!/usr/bin/env python3
-import requests
 import json
 import os
 from dotenv import load_dotenv
+from chatrace_client import ChatRaceClient
 
 # Load environment variables
 load_dotenv()
@@ -23,16 +23,12 @@ whitelabel_request = {
     "op1": "info"
 }
 
-headers = {
-    'Content-Type': 'application/json',
-    'User-Agent': 'mobile-app',
-    'X-ACCESS-TOKEN': API_TOKEN
-}
-
 try:
-    response = requests.post(API_URL, json=whitelabel_request, headers=headers)
+    with ChatRaceClient(api_url=API_URL, api_token=API_TOKEN) as client:
+        response = client.call(whitelabel_request, token=API_TOKEN)
+    if response.error is not None:
+        raise RuntimeError(response.error)
     print(f"📊 Status Code: {response.status_code}")
-    print(f"📄 Content-Type: {response.headers.get('content-type', 'N/A')}")
     print(f"📄 Content-Length: {len(response.text)}")
     
     # Save the response to a file
@@ -42,8 +38,8 @@ try:
     print("✅ Respuesta guardada en 'whitelabel_response.html'")
     
     # Also try to parse as JSON and save as JSON
-    try:
-        data = response.json()
+    data = response.data
+    if data is not None:
         with open('whitelabel_response.json', 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
         print("✅ JSON guardado en 'whitelabel_response.json'")
@@ -57,8 +53,7 @@ try:
             print(f"🌐 Domain: {whitelabel_data.get('appdomain', 'N/A')}")
             print(f"🔗 WebSocket: {whitelabel_data.get('wsurl', 'N/A')}")
             print(f"🔗 Google Client: {whitelabel_data.get('google', {}).get('client', 'N/A')}")
-            
-    except json.JSONDecodeError:
+    else:
         print("❌ Response no es JSON válido, guardado como HTML")
         
 except Exception as e:
@@ -1,35 +1,19 @@
 #!/usr/bin/env python3
 
-import requests
-import json
+import argparse
 import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
 from dotenv import load_dotenv
+from chatrace_client import ChatRaceClient, EndpointStats, write_report
 
 load_dotenv()
 
-def test_all_endpoints():
-    """Test all 62 endpoints from postman_api_docs.md"""
-    
-    # API Configuration
-    api_url = os.getenv("API_URL", "https://app.aiprlassist.com/php/user")
-    user_token = os.getenv("USER_TOKEN")
-    business_id = os.getenv("BUSINESS_ID")
-    user_id = os.getenv("USER_ID")
-    
-    # Headers
-    headers = {
-        'Content-Type': 'application/json',
-        'User-Agent': 'mobile-app',
-        'X-ACCESS-TOKEN': user_token
-    }
-    
-    print("🧪 Testing ALL 62 endpoints from postman_api_docs.md")
-    print(f"URL: {api_url}")
-    print(f"Business ID: {business_id}")
-    print(f"User ID: {user_id}")
-    print("=" * 80)
+def get_endpoints(business_id, user_id):
+    """All endpoints from postman_api_docs.md"""
     
-    # All endpoints from postman_api_docs.md
     endpoints = [
         # Public endpoints (no auth required)
         {
@@ -435,50 +419,69 @@ def test_all_endpoints():
             "auth_required": True
         }
     ]
+    return endpoints
+
+def test_all_endpoints():
+    """Test all 62 endpoints from postman_api_docs.md"""
+    
+    # API Configuration
+    api_url = os.getenv("API_URL", "https://app.aiprlassist.com/php/user")
+    user_token = os.getenv("USER_TOKEN")
+    business_id = os.getenv("BUSINESS_ID")
+    user_id = os.getenv("USER_ID")
+    
+    print("🧪 Testing ALL 62 endpoints from postman_api_docs.md")
+    print(f"URL: {api_url}")
+    print(f"Business ID: {business_id}")
+    print(f"User ID: {user_id}")
+    print("=" * 80)
+    
+    endpoints = get_endpoints(business_id, user_id)
     
     working_endpoints = []
     failed_endpoints = []
     auth_errors = []
     other_errors = []
     
+    # One pooled client for the whole sweep; auth and public endpoints run as
+    # two parallel batches so public calls never carry the access token
+    with ChatRaceClient(api_url=api_url, user_token=user_token, business_id=business_id) as client:
+        public = [e for e in endpoints if not e['auth_required']]
+        private = [e for e in endpoints if e['auth_required']]
+        responses = dict(zip(
+            (e['name'] for e in public),
+            client.call_many((e['payload'] for e in public), auth=False)
+        ))
+        responses.update(zip(
+            (e['name'] for e in private),
+            client.call_many(e['payload'] for e in private)
+        ))
+    
     for i, endpoint in enumerate(endpoints, 1):
         print(f"\n[{i:2d}/62] Testing: {endpoint['name']}")
+        response = responses[endpoint['name']]
+        outcome = response.outcome
         
-        # Use headers with or without auth based on endpoint
-        test_headers = headers if endpoint['auth_required'] else {
-            'Content-Type': 'application/json',
-            'User-Agent': 'mobile-app'
-        }
-        
-        try:
-            response = requests.post(api_url, headers=test_headers, json=endpoint['payload'])
-            
-            if response.status_code == 200:
-                try:
-                    data = response.json()
-                    if data.get("status") == "OK":
-                        print(f"✅ SUCCESS: {endpoint['name']}")
-                        working_endpoints.append(endpoint['name'])
-                    else:
-                        error_code = data.get("code", "Unknown")
-                        print(f"❌ API ERROR (Code {error_code}): {endpoint['name']}")
-                        if error_code == 1:
-                            auth_errors.append(endpoint['name'])
-                        else:
-                            other_errors.append(endpoint['name'])
-                except json.JSONDecodeError:
-                    if response.text.strip() == "null":
-                        print(f"⚠️ NULL RESPONSE: {endpoint['name']}")
-                        other_errors.append(endpoint['name'])
-                    else:
-                        print(f"✅ SUCCESS (Non-JSON): {endpoint['name']}")
-                        working_endpoints.append(endpoint['name'])
-            else:
-                print(f"❌ HTTP {response.status_code}: {endpoint['name']}")
-                other_errors.append(endpoint['name'])
-                
-        except Exception as e:
-            print(f"❌ EXCEPTION: {endpoint['name']} - {str(e)}")
+        if outcome == "ok":
+            print(f"✅ SUCCESS: {endpoint['name']}")
+            working_endpoints.append(endpoint['name'])
+        elif outcome == "non_json":
+            print(f"✅ SUCCESS (Non-JSON): {endpoint['name']}")
+            working_endpoints.append(endpoint['name'])
+        elif outcome == "auth_error":
+            print(f"❌ API ERROR (Code {response.error_code}): {endpoint['name']}")
+            auth_errors.append(endpoint['name'])
+        elif outcome == "api_error":
+            print(f"❌ API ERROR (Code {response.error_code}): {endpoint['name']}")
+            other_errors.append(endpoint['name'])
+        elif outcome == "null":
+            print(f"⚠️ NULL RESPONSE: {endpoint['name']}")
+            other_errors.append(endpoint['name'])
+        elif outcome == "http_error":
+            print(f"❌ HTTP {response.status_code}: {endpoint['name']}")
+            other_errors.append(endpoint['name'])
+        else:
+            print(f"❌ EXCEPTION: {endpoint['name']} - {response.error}")
             other_errors.append(endpoint['name'])
     
     # Final Summary
@@ -505,5 +508,67 @@ def test_all_endpoints():
         for endpoint in other_errors:
             print(f"   - {endpoint}")
 
+def sweep_endpoints(workers=8, repeat=5, report=None):
+    """Parallel sweep: every endpoint N times on a bounded worker pool, with latency stats"""
+    
+    api_url = os.getenv("API_URL", "https://app.aiprlassist.com/php/user")
+    user_token = os.getenv("USER_TOKEN")
+    business_id = os.getenv("BUSINESS_ID")
+    user_id = os.getenv("USER_ID")
+    
+    endpoints = get_endpoints(business_id, user_id)
+    
+    print(f"⚡ Sweeping {len(endpoints)} endpoints x {repeat} with {workers} workers")
+    print(f"URL: {api_url}")
+    print("=" * 80)
+    
+    results = defaultdict(list)
+    started = time.perf_counter()
+    
+    with ChatRaceClient(api_url=api_url, user_token=user_token, business_id=business_id,
+                        concurrency=workers) as client:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(client.call, endpoint['payload'], endpoint['auth_required']): endpoint['name']
+                for endpoint in endpoints
+                for _ in range(repeat)
+            }
+            for future in as_completed(futures):
+                results[futures[future]].append(future.result())
+    
+    wall = time.perf_counter() - started
+    stats = [EndpointStats.from_responses(name, responses) for name, responses in results.items()]
+    
+    print(f"{'ENDPOINT':<32} {'OUTCOME':<11} {'p50':>7} {'p95':>7} {'p99':>7} {'ttfb50':>7} {'bytes':>7}")
+    for row in sorted(stats, key=lambda r: r.p95_ms, reverse=True):
+        print(f"{row.name[:32]:<32} {row.outcome:<11} {row.p50_ms:>7.0f} {row.p95_ms:>7.0f} "
+              f"{row.p99_ms:>7.0f} {row.ttfb_p50_ms:>7.0f} {row.bytes_p50:>7.0f}")
+    
+    total = sum(row.samples for row in stats)
+    print("=" * 80)
+    print(f"📊 {total} calls in {wall:.1f}s ({total / wall if wall else 0:.1f} req/s)")
+    
+    if report:
+        write_report(report, stats, {
+            "api_url": api_url,
+            "workers": workers,
+            "repeat": repeat,
+            "wall_seconds": round(wall, 2),
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+        })
+        print(f"💾 Report written to {report}")
+    
+    return stats
+
 if __name__ == "__main__":
-    test_all_endpoints() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="ChatRace endpoint sweep")
+    parser.add_argument("--sweep", action="store_true", help="parallel sweep with latency percentiles")
+    parser.add_argument("--workers", type=int, default=8, help="bounded worker pool size (sweep mode)")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions per endpoint (sweep mode)")
+    parser.add_argument("--report", help="write a .json or .csv report (sweep mode)")
+    args = parser.parse_args()
+    
+    if args.sweep:
+        sweep_endpoints(workers=args.workers, repeat=args.repeat, report=args.report)
+    else:
+        test_all_endpoints() 
\ No newline at end of file
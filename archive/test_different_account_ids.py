@@ -1,12 +1,30 @@
 #!/usr/bin/env python3
 
-import requests
-import json
 import os
 from dotenv import load_dotenv
+from chatrace_client import ChatRaceClient
 
 load_dotenv()
 
+def report_response(response, label):
+    """Print a probe result the same way the sequential version did"""
+    if response.error is not None:
+        print(f"❌ EXCEPTION: {label} - {response.error}")
+        return
+    print(f"Status: {response.status_code} ({response.elapsed * 1000:.0f} ms)")
+    print(f"Response: {response.text[:150]}...")
+    outcome = response.outcome
+    if outcome == "ok":
+        print(f"✅ SUCCESS: {label}")
+    elif outcome == "non_json":
+        print(f"✅ SUCCESS (Non-JSON): {label}")
+    elif outcome == "null":
+        print(f"⚠️ NULL RESPONSE: {label}")
+    elif outcome == "http_error":
+        print(f"❌ HTTP {response.status_code}: {label}")
+    else:
+        print(f"❌ API ERROR (Code {response.error_code}): {label}")
+
 def test_different_account_ids():
     """Test different account_id values to find one that works"""
     
@@ -37,53 +55,23 @@ def test_different_account_ids():
         "1145544",  # Previous number
     ]
     
-    headers = {
-        'Content-Type': 'application/json',
-        'User-Agent': 'mobile-app',
-        'X-ACCESS-TOKEN': user_token
-    }
-    
     working_account_ids = []
     failed_account_ids = []
     
-    for account_id in account_ids_to_test:
+    # All probes share one pooled client and run in parallel
+    payloads = [
+        {"account_id": account_id, "op": "conversations", "op1": "get"}
+        for account_id in account_ids_to_test
+    ]
+    with ChatRaceClient(api_url=api_url, user_token=user_token) as client:
+        responses = client.call_many(payloads)
+    
+    for account_id, response in zip(account_ids_to_test, responses):
         print(f"\n--- Testing account_id: {account_id} ---")
-        
-        # Test with conversations endpoint
-        payload = {
-            "account_id": account_id,
-            "op": "conversations",
-            "op1": "get"
-        }
-        
-        try:
-            response = requests.post(api_url, headers=headers, json=payload)
-            print(f"Status: {response.status_code}")
-            print(f"Response: {response.text[:150]}...")
-            
-            if response.status_code == 200:
-                try:
-                    data = response.json()
-                    if data.get("status") == "OK":
-                        print(f"✅ SUCCESS: account_id {account_id} works!")
-                        working_account_ids.append(account_id)
-                    else:
-                        error_code = data.get("code", "Unknown")
-                        print(f"❌ API ERROR (Code {error_code}): account_id {account_id}")
-                        failed_account_ids.append(account_id)
-                except json.JSONDecodeError:
-                    if response.text.strip() == "null":
-                        print(f"⚠️ NULL RESPONSE: account_id {account_id}")
-                        failed_account_ids.append(account_id)
-                    else:
-                        print(f"✅ SUCCESS (Non-JSON): account_id {account_id}")
-                        working_account_ids.append(account_id)
-            else:
-                print(f"❌ HTTP {response.status_code}: account_id {account_id}")
-                failed_account_ids.append(account_id)
-                
-        except Exception as e:
-            print(f"❌ EXCEPTION: account_id {account_id} - {str(e)}")
+        report_response(response, f"account_id {account_id}")
+        if response.ok:
+            working_account_ids.append(account_id)
+        else:
             failed_account_ids.append(account_id)
     
     # Summary
@@ -115,12 +103,6 @@ def test_with_working_account_id():
     print(f"\n🧪 Testing all endpoints with working account_id: {working_account_id}")
     print("=" * 80)
     
-    headers = {
-        'Content-Type': 'application/json',
-        'User-Agent': 'mobile-app',
-        'X-ACCESS-TOKEN': user_token
-    }
-    
     # Test key endpoints with working account_id
     endpoints_to_test = [
         {
@@ -177,37 +159,15 @@ def test_with_working_account_id():
     working_endpoints = []
     failed_endpoints = []
     
-    for endpoint in endpoints_to_test:
+    with ChatRaceClient(api_url=api_url, user_token=user_token) as client:
+        responses = client.call_many(endpoint['payload'] for endpoint in endpoints_to_test)
+    
+    for endpoint, response in zip(endpoints_to_test, responses):
         print(f"\n--- Testing: {endpoint['name']} ---")
-        
-        try:
-            response = requests.post(api_url, headers=headers, json=endpoint['payload'])
-            print(f"Status: {response.status_code}")
-            print(f"Response: {response.text[:150]}...")
-            
-            if response.status_code == 200:
-                try:
-                    data = response.json()
-                    if data.get("status") == "OK":
-                        print(f"✅ SUCCESS: {endpoint['name']}")
-                        working_endpoints.append(endpoint['name'])
-                    else:
-                        error_code = data.get("code", "Unknown")
-                        print(f"❌ API ERROR (Code {error_code}): {endpoint['name']}")
-                        failed_endpoints.append(endpoint['name'])
-                except json.JSONDecodeError:
-                    if response.text.strip() == "null":
-                        print(f"⚠️ NULL RESPONSE: {endpoint['name']}")
-                        failed_endpoints.append(endpoint['name'])
-                    else:
-                        print(f"✅ SUCCESS (Non-JSON): {endpoint['name']}")
-                        working_endpoints.append(endpoint['name'])
-            else:
-                print(f"❌ HTTP {response.status_code}: {endpoint['name']}")
-                failed_endpoints.append(endpoint['name'])
-                
-        except Exception as e:
-            print(f"❌ EXCEPTION: {endpoint['name']} - {str(e)}")
+        report_response(response, endpoint['name'])
+        if response.ok:
+            working_endpoints.append(endpoint['name'])
+        else:
             failed_endpoints.append(endpoint['name'])
     
     # Summary
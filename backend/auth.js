@@ -1,10 +1,12 @@
-import { Pool } from 'pg';
 import { OAuth2Client } from 'google-auth-library';
 import { v4 as uuidv4 } from 'uuid';
 import bcrypt from 'bcryptjs';
+import { createPool } from './db-pool.js';
+import { TtlCache } from './ttl-cache.js';
 
-// Database pool with Railway-specific config
-const pool = new Pool({
+// Database pool with Railway-specific config. Shared app-wide (server.js, unified inbox bridge);
+// idle client errors are logged and counted by createPool.
+const pool = createPool('main', {
   connectionString: process.env.DATABASE_URL,
   ssl: { rejectUnauthorized: false },
   keepAlive: true,
@@ -13,13 +15,30 @@ const pool = new Pool({
   idleTimeoutMillis: 30000
 });
 
-// Robust PG pool error handling
-pool.on('error', (err) => {
-  try {
-    console.error('❌ Postgres client error:', err?.message || err);
-  } catch {}
+// Authorization records hit on every admin request. Every write to authorized_users in this
+// module invalidates the business's entries; other replicas see changes within the TTL.
+const authorizationCache = new TtlCache({
+  name: 'authorized_users',
+  ttlMs: Number(process.env.AUTH_CACHE_TTL_MS || 30000),
+  maxEntries: Number(process.env.AUTH_CACHE_MAX_ENTRIES || 5000)
+});
+const businessCache = new TtlCache({
+  name: 'businesses',
+  ttlMs: Number(process.env.BUSINESS_CACHE_TTL_MS || 300000),
+  maxEntries: 1000
 });
 
+const authorizationKey = (businessId, email) => `${businessId}\u0000${email}`;
+
+function invalidateBusinessUsers(businessId) {
+  const prefix = `${businessId}\u0000`;
+  authorizationCache.deleteWhere(key => key.startsWith(prefix));
+}
+
+function authCacheMetrics() {
+  return { authorizations: authorizationCache.metrics(), businesses: businessCache.metrics() };
+}
+
 // Google OAuth client
 const googleClient = new OAuth2Client(process.env.VITE_GOOGLE_CLIENT_ID);
 
@@ -57,32 +76,36 @@ async function verifyGoogleToken(token) {
   }
 }
 
-// Check if user is authorized for a business
+// Check if user is authorized for a business (cached, including "not authorized")
 async function checkUserAuthorization(businessId, email) {
   try {
-    const query = `
-      SELECT au.*, b.name as business_name, b.subdomain 
-      FROM authorized_users au
-      JOIN businesses b ON au.business_id = b.business_id
-      WHERE au.business_id = $1 
-        AND (au.email = $2 OR au.google_email = $2)
-        AND au.active = true
-    `;
-    
-    const result = await pool.query(query, [businessId, email]);
-    return result.rows[0] || null;
+    return await authorizationCache.getOrLoad(authorizationKey(businessId, email), async () => {
+      const query = `
+        SELECT au.*, b.name as business_name, b.subdomain 
+        FROM authorized_users au
+        JOIN businesses b ON au.business_id = b.business_id
+        WHERE au.business_id = $1 
+          AND (au.email = $2 OR au.google_email = $2)
+          AND au.active = true
+      `;
+      
+      const result = await pool.query(query, [businessId, email]);
+      return result.rows[0] || null;
+    });
   } catch (error) {
     console.error('❌ Authorization check failed:', error);
     return null;
   }
 }
 
-// Get business info by subdomain
+// Get business info by subdomain (cached)
 async function getBusinessBySubdomain(subdomain) {
   try {
-    const query = 'SELECT * FROM businesses WHERE subdomain = $1 AND active = true';
-    const result = await pool.query(query, [subdomain]);
-    return result.rows[0] || null;
+    return await businessCache.getOrLoad(subdomain, async () => {
+      const query = 'SELECT * FROM businesses WHERE subdomain = $1 AND active = true';
+      const result = await pool.query(query, [subdomain]);
+      return result.rows[0] || null;
+    });
   } catch (error) {
     console.error('❌ Business lookup failed:', error);
     return null;
@@ -167,6 +190,7 @@ async function useInvitation(token, userEmail, userName) {
     ]);
 
     await db.query('COMMIT');
+    invalidateBusinessUsers(invitation.business_id);
 
     return {
       invitation,
@@ -274,6 +298,7 @@ async function reviewAccessRequest(requestId, reviewedBy, status, notes = null)
     }
     
     await db.query('COMMIT');
+    if (status === 'approved') invalidateBusinessUsers(request.business_id);
     return request;
   } catch (error) {
     try { await db.query('ROLLBACK'); } catch {}
@@ -308,11 +333,8 @@ async function requireAdmin(req, res, next) {
     const userEmail = req.headers['x-user-email'];
     const token = req.headers['x-access-token'] || req.headers['authorization']?.replace('Bearer ', '');
     
-    console.log(`🔍 requireAdmin DEBUG: businessId=${businessId}, userEmail=${userEmail}, token=${token?.substring(0, 20)}...`);
-    
     // For development: if using the main USER_TOKEN, allow admin access
     if (token === process.env.USER_TOKEN || token === process.env.API_TOKEN) {
-      console.log('✅ Admin access granted via main token');
       req.user = { 
         id: 1, 
         email: userEmail || 'admin@test.com', 
@@ -330,14 +352,12 @@ async function requireAdmin(req, res, next) {
     }
     
     const user = await checkUserAuthorization(businessId, userEmail);
-    console.log(`🔍 checkUserAuthorization result:`, user ? `Found user with role: ${user.role}` : 'User not found');
     
     if (!user || user.role !== 'admin') {
       console.log(`❌ Access denied: user=${!!user}, role=${user?.role}`);
       return res.status(403).json({ error: 'Admin access required' });
     }
     
-    console.log('✅ Admin access granted');
     req.user = user;
     req.businessId = businessId;
     next();
@@ -477,6 +497,7 @@ async function changePassword(email, businessId, currentPassword, newPassword, i
       SET password_hash = $1, must_change_password = $2, temp_password = $3
       WHERE id = $4
     `, [newPasswordHash, isAdminReset, isAdminReset, user.id]);
+    invalidateBusinessUsers(businessId);
     
     const message = isAdminReset 
       ? 'Password reset successfully. User must change password on next login.'
@@ -525,6 +546,7 @@ async function createUserWithPassword(userData, createdBy) {
     const result = await pool.query(insertQuery, [
       businessId, email, name, role, passwordHash
     ]);
+    invalidateBusinessUsers(businessId);
     
     return { success: true, user: result.rows[0] };
   } catch (error) {
@@ -581,6 +603,7 @@ async function updateUser(businessId, userId, updateData) {
     `;
     
     const result = await pool.query(updateQuery, [name, email, role, businessId, userId]);
+    invalidateBusinessUsers(businessId);
     
     if (result.rows.length === 0) {
       return { success: false, error: 'User not found' };
@@ -604,6 +627,7 @@ async function updateUserStatus(businessId, userId, active) {
     `;
     
     const result = await pool.query(updateQuery, [active, businessId, userId]);
+    invalidateBusinessUsers(businessId);
     
     if (result.rows.length === 0) {
       return { success: false, error: 'User not found' };
@@ -626,6 +650,7 @@ async function deleteUser(businessId, userId) {
     `;
     
     const result = await pool.query(deleteQuery, [businessId, userId]);
+    invalidateBusinessUsers(businessId);
     
     if (result.rows.length === 0) {
       return { success: false, error: 'User not found' };
@@ -639,6 +664,7 @@ async function deleteUser(businessId, userId) {
 }
 
 export {
+  pool,
   initializeAuth,
   verifyGoogleToken,
   checkUserAuthorization,
@@ -663,5 +689,8 @@ export {
   getUserById,
   updateUser,
   updateUserStatus,
-  deleteUser
+  deleteUser,
+  // Authorization cache
+  invalidateBusinessUsers,
+  authCacheMetrics
 };
\ No newline at end of file
@@ -0,0 +1,60 @@
+// conversation-cursor.js
+// Keyset cursors for the unified conversation list: every source is read already sorted by
+// (last_message_at, conversation_id) descending and k-way merged, so a page only touches
+// `limit` rows per source no matter how deep it is.
+
+import { timeOf } from './conversation-index.js';
+
+function encodeCursor(state) {
+  return Buffer.from(JSON.stringify(state)).toString('base64url');
+}
+
+// Empty/absent cursor = first page. Throws on anything that doesn't decode to an object.
+function decodeCursor(cursor) {
+  if (!cursor) return {};
+  const state = JSON.parse(Buffer.from(String(cursor), 'base64url').toString('utf8'));
+  if (!state || typeof state !== 'object' || Array.isArray(state)) {
+    throw new Error('Invalid cursor');
+  }
+  return state;
+}
+
+// Newest first; ties broken by conversation_id so the order is total and stable
+function compareKeyset(a, b) {
+  const tA = timeOf(a);
+  const tB = timeOf(b);
+  if (tA !== tB) return tB - tA;
+  const idA = String(a.conversation_id);
+  const idB = String(b.conversation_id);
+  return idA < idB ? 1 : idA > idB ? -1 : 0;
+}
+
+// streams: { [name]: { rows, exhausted } }, each rows array already sorted by compareKeyset.
+// Returns the merged page plus, per source, how many of its rows were consumed.
+function mergeKeyset(streams, limit) {
+  const names = Object.keys(streams);
+  const heads = Object.fromEntries(names.map(name => [name, 0]));
+  const page = [];
+
+  while (page.length < limit) {
+    let best = null;
+    for (const name of names) {
+      const row = streams[name].rows[heads[name]];
+      if (row && (best === null || compareKeyset(row, streams[best].rows[heads[best]]) < 0)) {
+        best = name;
+      }
+    }
+    if (best === null) break;
+    page.push(streams[best].rows[heads[best]]);
+    heads[best] += 1;
+  }
+
+  return { page, consumed: heads };
+}
+
+function stripKeyset(row) {
+  const { _next, _keyset, ...rest } = row;
+  return rest;
+}
+
+export { encodeCursor, decodeCursor, compareKeyset, mergeKeyset, stripKeyset };
@@ -0,0 +1,201 @@
+// conversation-index.js
+// Per-account in-process cache of the merged (ChatRace + unified DB) conversation list.
+// The expensive fetch+merge+sort runs once per TTL; pages are served by slicing the
+// cached, already-sorted array, and SSE events patch it in place.
+
+const DEFAULT_TTL_MS = Number(process.env.CONVERSATION_INDEX_TTL_MS || 30000);
+const DEFAULT_MAX_ENTRIES = Number(process.env.CONVERSATION_INDEX_MAX_ENTRIES || 200);
+// A list built while one of the sources was failing is only trusted this long
+const DEFAULT_PARTIAL_TTL_MS = Number(process.env.CONVERSATION_INDEX_PARTIAL_TTL_MS || 5000);
+// Past this age a stale entry is rebuilt before answering instead of in the background
+const MAX_STALE_FACTOR = 10;
+
+// Same normalization as the unified sort: ChatRace unix-ms strings or ISO/Date values
+function toEpochMs(value) {
+  let t = value || 0;
+  if (typeof t === 'string' && /^\d+$/.test(t)) t = parseInt(t);
+  const ms = new Date(t).getTime();
+  return Number.isNaN(ms) ? 0 : ms;
+}
+
+// Rows carry last_message_ts (epoch ms, set once at ingest); fill it in for any that don't
+function timeOf(row) {
+  if (typeof row.last_message_ts !== 'number') row.last_message_ts = toEpochMs(row.last_message_at);
+  return row.last_message_ts;
+}
+
+// Most recent first: plain numeric compare, no parsing inside the sort
+function byRecency(a, b) {
+  return timeOf(b) - timeOf(a);
+}
+
+function countSources(rows) {
+  const counts = { chatrace: 0, woodstock: 0, vapi: 0, vapi_rural: 0 };
+  for (const row of rows) {
+    if (row.source in counts) counts[row.source] += 1;
+  }
+  return { ...counts, rural_king: counts.vapi_rural }; // Alias for frontend
+}
+
+class ConversationIndex {
+  constructor({ ttlMs = DEFAULT_TTL_MS, partialTtlMs = DEFAULT_PARTIAL_TTL_MS, maxEntries = DEFAULT_MAX_ENTRIES } = {}) {
+    this.ttlMs = ttlMs;
+    this.partialTtlMs = partialTtlMs;
+    this.maxEntries = maxEntries;
+    this.entries = new Map(); // key -> { rows, byId, sources, builtAt, ttlMs, partial, stale }
+    this.pending = new Map(); // key -> in-flight build promise (single-flight)
+    this.stats = { hits: 0, misses: 0, stale: 0, builds: 0, partialBuilds: 0, patches: 0 };
+  }
+
+  key(accountId, platform) {
+    return `${accountId || ''}::${platform || 'all'}`;
+  }
+
+  // loader() must resolve to the full merged list, already sorted most recent first, or to
+  // { rows, partial: true } when a source failed (cached for partialTtlMs only)
+  async getPage(accountId, platform, offset, limit, loader) {
+    const key = this.key(accountId, platform);
+    let entry = this.entries.get(key);
+    let state = 'hit';
+
+    if (!entry) {
+      state = 'miss';
+      entry = await this.build(key, loader);
+    } else {
+      const age = Date.now() - entry.builtAt;
+      if (age > this.ttlMs * MAX_STALE_FACTOR) {
+        state = 'miss';
+        entry = await this.build(key, loader);
+      } else if (entry.stale || age > entry.ttlMs) {
+        // Stale-while-revalidate: answer from the cached list, refresh in the background
+        state = 'stale';
+        this.build(key, loader).catch(err => console.error('❌ Conversation index refresh failed:', err));
+      }
+    }
+
+    this.stats[state === 'hit' ? 'hits' : state === 'miss' ? 'misses' : 'stale'] += 1;
+
+    // LRU touch
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+
+    return {
+      data: entry.rows.slice(offset, offset + limit),
+      total: entry.rows.length,
+      sources: entry.sources,
+      partial: entry.partial,
+      state
+    };
+  }
+
+  build(key, loader) {
+    if (this.pending.has(key)) return this.pending.get(key);
+
+    const promise = (async () => {
+      const result = await loader();
+      const rows = Array.isArray(result) ? result : result.rows;
+      const partial = !Array.isArray(result) && Boolean(result.partial);
+      const entry = {
+        rows,
+        byId: new Map(rows.map(row => [String(row.conversation_id), row])),
+        sources: countSources(rows),
+        builtAt: Date.now(),
+        ttlMs: partial ? Math.min(this.partialTtlMs, this.ttlMs) : this.ttlMs,
+        partial,
+        stale: false
+      };
+      this.stats.builds += 1;
+      if (partial) this.stats.partialBuilds += 1;
+      this.entries.set(key, entry);
+      while (this.entries.size > this.maxEntries) {
+        this.entries.delete(this.entries.keys().next().value);
+      }
+      return entry;
+    })().finally(() => this.pending.delete(key));
+
+    this.pending.set(key, promise);
+    return promise;
+  }
+
+  *entriesFor(accountId) {
+    for (const [key, entry] of this.entries) {
+      if (!accountId || key.startsWith(`${accountId}::`)) yield entry;
+    }
+  }
+
+  // Move a conversation to its new position after a message, in every cached view of the account
+  touch(accountId, conversationId, { last_message_at, last_message_content } = {}) {
+    const id = String(conversationId);
+    const at = last_message_at ?? Date.now();
+    let found = false;
+
+    for (const entry of this.entriesFor(accountId)) {
+      const row = entry.byId.get(id);
+      if (!row) {
+        // Unknown conversation (new thread): let the next read refresh this view
+        entry.stale = true;
+        continue;
+      }
+      found = true;
+      const from = entry.rows.indexOf(row);
+      if (from !== -1) entry.rows.splice(from, 1);
+
+      row.last_message_at = at;
+      row.last_message_ts = toEpochMs(at);
+      if (typeof last_message_content === 'string') row.last_message_content = last_message_content;
+
+      const t = timeOf(row);
+      let lo = 0;
+      let hi = entry.rows.length;
+      while (lo < hi) {
+        const mid = (lo + hi) >>> 1;
+        if (timeOf(entry.rows[mid]) > t) lo = mid + 1; else hi = mid;
+      }
+      entry.rows.splice(lo, 0, row);
+    }
+
+    if (found) this.stats.patches += 1;
+    return found;
+  }
+
+  invalidate(accountId = null) {
+    for (const entry of this.entriesFor(accountId)) entry.stale = true;
+  }
+
+  // Inbox event subscriber: keep cached pages in step with what SSE clients are told
+  applyEvent(event) {
+    if (!event) return;
+    const accountId = event.account_id || null;
+    if (event.type === 'resync') {
+      this.invalidate(accountId);
+      return;
+    }
+    if (!event.conversation_id) return;
+    // message_sent/conversation_updated are the pre-typed names, still accepted
+    if (event.type === 'message_appended' || event.type === 'message_sent' || event.type === 'message_received') {
+      this.touch(accountId, event.conversation_id, {
+        last_message_at: event.last_message_at ?? event.t ?? Date.now(),
+        last_message_content: event.message
+      });
+    } else if (event.type === 'conversation_upserted' || event.type === 'conversation_updated') {
+      if (event.last_message_at != null) {
+        // Synced conversation with new activity: reposition (or mark unknown threads stale)
+        this.touch(accountId, event.conversation_id, {
+          last_message_at: event.last_message_at,
+          last_message_content: event.last_message_content
+        });
+      } else {
+        // State changes (archived, read, assign...) may change filters/badges
+        this.invalidate(accountId);
+      }
+    }
+  }
+
+  clear() {
+    this.entries.clear();
+  }
+}
+
+const conversationIndex = new ConversationIndex();
+
+export { ConversationIndex, conversationIndex, toEpochMs, timeOf, byRecency };
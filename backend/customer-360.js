@@ -0,0 +1,228 @@
+// customer-360.js
+// Customer identification for the inbox contact panel: phone/email normalization that matches
+// normalize_phone_e164()/normalize_email() in the schema, and an in-process LRU over the
+// indexed customer_360 lookup so repeat hits for the same caller never reach the database.
+// refresh_customer_360() NOTIFYs customer_360_changed, so a LOFT ingest (or any other refresh)
+// clears the cache on every replica as soon as it commits.
+
+import pg from 'pg';
+
+const DEFAULT_TTL_MS = Number(process.env.CUSTOMER_360_TTL_MS || 60000);
+const DEFAULT_MAX_ENTRIES = Number(process.env.CUSTOMER_360_MAX_ENTRIES || 5000);
+const CHANGE_CHANNEL = 'customer_360_changed';
+const RECONNECT_MIN_MS = 500;
+const RECONNECT_MAX_MS = 30000;
+
+const PROFILE_COLUMNS = `
+  customerid, full_name, phone_e164, business_phone_e164, email_norm, city, state, zipcode,
+  noemail, total_orders, total_spent, loyalty_tier, last_order_date, days_since_last_order,
+  open_orders, last_order, refreshed_at`;
+
+// US numbers only, same rules as the SQL function: drop an extension, keep digits,
+// 10 digits or 11 starting with 1
+function normalizePhone(phone) {
+  const digits = String(phone || '').toLowerCase().split('x')[0].replace(/\D/g, '');
+  if (/^[2-9]\d{9}$/.test(digits)) return `+1${digits}`;
+  if (/^1[2-9]\d{9}$/.test(digits)) return `+${digits}`;
+  return null;
+}
+
+function normalizeEmail(email) {
+  const value = String(email || '').trim();
+  return /^.+@.+$/.test(value) ? value.toLowerCase() : null;
+}
+
+// vapi_rural_+13323339453 / vapi_+13323339453 carry the caller's number
+function phoneFromConversationId(conversationId) {
+  const match = String(conversationId || '').match(/^vapi(?:_rural)?_(\+?\d{10,11})$/);
+  return match ? normalizePhone(match[1]) : null;
+}
+
+function toProfile(row) {
+  return {
+    customerid: row.customerid,
+    full_name: row.full_name || '',
+    phone: row.phone_e164 || row.business_phone_e164 || '',
+    email: row.email_norm || '',
+    city: row.city || '',
+    state: row.state || '',
+    zipcode: row.zipcode || '',
+    noemail: Boolean(row.noemail),
+    total_orders: Number(row.total_orders || 0),
+    total_spent: Number(row.total_spent || 0),
+    loyalty_tier: row.loyalty_tier,
+    last_order_date: row.last_order_date,
+    days_since_last_order: row.days_since_last_order,
+    open_orders: Number(row.open_orders || 0),
+    last_order: row.last_order,
+    refreshed_at: row.refreshed_at
+  };
+}
+
+class CustomerLookup {
+  constructor(db, { ttlMs = DEFAULT_TTL_MS, maxEntries = DEFAULT_MAX_ENTRIES } = {}) {
+    this.db = db;
+    this.ttlMs = ttlMs;
+    this.maxEntries = maxEntries;
+    this.entries = new Map(); // key -> { profile, expiresAt }; Map order doubles as LRU order
+    this.pending = new Map(); // key -> in-flight query (single-flight)
+    this.generation = 0; // bumped on invalidation so in-flight queries don't store old profiles
+    this.listener = null;
+    this.stopped = false;
+    this.reconnectMs = RECONNECT_MIN_MS;
+    this.stats = { hits: 0, misses: 0, queries: 0, queryMsTotal: 0, invalidations: 0, reconnects: 0 };
+  }
+
+  // -> profile or null; misses are cached too so unknown callers don't hit the DB every turn
+  async lookup({ phone, email } = {}) {
+    const candidates = [['phone', normalizePhone(phone)], ['email', normalizeEmail(email)]];
+    for (const [kind, value] of candidates) {
+      if (!value) continue;
+      const profile = await this.get(kind, value);
+      if (profile) return profile;
+    }
+    return null;
+  }
+
+  async get(kind, value) {
+    const key = `${kind}:${value}`;
+    const entry = this.entries.get(key);
+    if (entry && entry.expiresAt > Date.now()) {
+      this.stats.hits += 1;
+      this.entries.delete(key);
+      this.entries.set(key, entry);
+      return entry.profile;
+    }
+
+    this.stats.misses += 1;
+    if (this.pending.has(key)) return this.pending.get(key);
+
+    const generation = this.generation;
+    const promise = this.query(kind, value)
+      .then((profile) => {
+        if (generation === this.generation) this.set(key, profile);
+        return profile;
+      })
+      .finally(() => {
+        if (this.pending.get(key) === promise) this.pending.delete(key);
+      });
+    this.pending.set(key, promise);
+    return promise;
+  }
+
+  async query(kind, value) {
+    const start = Date.now();
+    // Prefer the primary phone, then the most recent buyer when a number is shared
+    const sql = kind === 'phone'
+      ? `SELECT ${PROFILE_COLUMNS} FROM customer_360
+         WHERE phone_e164 = $1 OR business_phone_e164 = $1
+         ORDER BY (phone_e164 = $1) DESC, last_order_date DESC NULLS LAST
+         LIMIT 1`
+      : `SELECT ${PROFILE_COLUMNS} FROM customer_360
+         WHERE email_norm = $1
+         ORDER BY last_order_date DESC NULLS LAST
+         LIMIT 1`;
+    const result = await this.db.query(sql, [value]);
+    this.stats.queries += 1;
+    this.stats.queryMsTotal += Date.now() - start;
+    return result.rows[0] ? toProfile(result.rows[0]) : null;
+  }
+
+  set(key, profile) {
+    this.entries.delete(key);
+    this.entries.set(key, { profile, expiresAt: Date.now() + this.ttlMs });
+    while (this.entries.size > this.maxEntries) {
+      this.entries.delete(this.entries.keys().next().value);
+    }
+  }
+
+  // On customer_360_changed or a manual sync; profiles otherwise age out after ttlMs
+  invalidate() {
+    this.generation += 1;
+    this.stats.invalidations += 1;
+    this.entries.clear();
+    this.pending.clear();
+  }
+
+  // LISTEN for refreshes on the customer_360 database. Never throws: while disconnected the
+  // TTL still bounds staleness, and every reconnect clears the cache once for what was missed.
+  async listenForChanges({ connectionString, createClient = () => new pg.Client({ connectionString }) }) {
+    this.createClient = createClient;
+    this.stopped = false;
+    try {
+      await this.listen();
+    } catch (error) {
+      console.error('❌ customer_360 change listener failed to connect:', error.message);
+      this.retry();
+    }
+    return this;
+  }
+
+  async listen() {
+    const client = this.createClient();
+    client.on('notification', () => this.invalidate());
+    client.on('error', (error) => {
+      console.error('❌ customer_360 change listener error:', error.message);
+      this.reconnect(client);
+    });
+    client.on('end', () => this.reconnect(client));
+
+    try {
+      await client.connect();
+      await client.query(`LISTEN ${CHANGE_CHANNEL}`);
+    } catch (error) {
+      client.removeAllListeners();
+      client.end().catch(() => {});
+      throw error;
+    }
+    this.listener = client;
+    this.reconnectMs = RECONNECT_MIN_MS;
+  }
+
+  reconnect(client) {
+    if (this.stopped || client !== this.listener) return;
+    this.listener = null;
+    client.removeAllListeners();
+    client.end().catch(() => {});
+    this.stats.reconnects += 1;
+    this.retry();
+  }
+
+  retry() {
+    const delay = this.reconnectMs;
+    this.reconnectMs = Math.min(this.reconnectMs * 2, RECONNECT_MAX_MS);
+    const timer = setTimeout(async () => {
+      if (this.stopped) return;
+      try {
+        await this.listen();
+        this.invalidate();
+      } catch (error) {
+        console.error('❌ customer_360 change listener reconnect failed:', error.message);
+        this.retry();
+      }
+    }, delay);
+    timer.unref?.();
+  }
+
+  async stop() {
+    this.stopped = true;
+    const client = this.listener;
+    this.listener = null;
+    if (client) {
+      client.removeAllListeners();
+      await client.end().catch(() => {});
+    }
+  }
+
+  metrics() {
+    const { queryMsTotal, ...stats } = this.stats;
+    return {
+      ...stats,
+      entries: this.entries.size,
+      listening: Boolean(this.listener),
+      avgQueryMs: stats.queries ? +(queryMsTotal / stats.queries).toFixed(2) : 0
+    };
+  }
+}
+
+export { CustomerLookup, normalizePhone, normalizeEmail, phoneFromConversationId };
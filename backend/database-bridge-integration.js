@@ -1,17 +1,199 @@
 // database-bridge-integration.js
 // WORKING PULL Integration: Bridge external databases to unified inbox
 
-import pg from 'pg';
 import { config } from 'dotenv';
+import { createPool, withTransaction, withSavepoint, poolStats } from './db-pool.js';
+import { pool as mainPool } from './auth.js';
+import { inboxEvents, EVENT_TYPES } from './inbox-events.js';
 
 // Load environment variables
 config();
 
+// Keyset sort expression for unified_conversations: integer epoch ms of the stored
+// timestamp (NULLs sort last), ids compared bytewise like JS strings. Both parts are
+// immutable so they can back an index, and the cursor round-trips without timezone math.
+const KEYSET_MS = `floor(EXTRACT(EPOCH FROM COALESCE(last_message_at, 'epoch'::timestamp)) * 1000)::bigint`;
+const KEYSET_ID = 'conversation_id COLLATE "C"';
+
+// Incremental Woodstock sync: conversations per round-trip, and how far back the first run looks
+const WOODSTOCK_SYNC_BATCH = Number(process.env.WOODSTOCK_SYNC_BATCH || 500);
+const WOODSTOCK_BACKFILL_DAYS = Number(process.env.WOODSTOCK_BACKFILL_DAYS || 30);
+const WOODSTOCK_MESSAGES_PER_CONVERSATION = 20;
+// Rows per unnest() bulk insert; array parameters don't count against the bind limit
+const BULK_CHUNK_ROWS = 5000;
+// Calls per savepoint in syncVAPICalls; a failing chunk is retried call by call
+const VAPI_CHUNK_CALLS = 500;
+// A sync batch larger than this publishes one resync event instead of one event per conversation
+const SYNC_EVENT_MAX = Number(process.env.INBOX_SYNC_EVENT_MAX || 100);
+
+// unified_messages is range-partitioned by month on created_at. Partitions are created ahead of
+// time (never inside a sync transaction, which would lock the parent); anything outside the
+// prepared range (a backfill, a call window crossing a month boundary) lands in the default
+// partition and is moved into its own month by the next maintenance run, which a sync triggers
+// as soon as it wrote such rows. Months past the retention window are detached (kept as
+// archived_* tables for export) or dropped, so reads and vacuum only see live months.
+const MESSAGE_PARTITIONS_AHEAD = 2;
+const MESSAGE_RETENTION_MONTHS = Number(process.env.UNIFIED_MESSAGES_RETENTION_MONTHS || 12); // 0 keeps everything
+const MESSAGE_RETENTION_MODE = process.env.UNIFIED_MESSAGES_RETENTION_MODE || 'detach'; // 'detach' | 'drop'
+const MESSAGE_MAINTENANCE_INTERVAL_MS = 6 * 60 * 60 * 1000;
+const MESSAGE_PARTITION_RE = /^unified_messages_p(\d{4})_(\d{2})$/;
+
+const UNIFIED_MESSAGES_DDL = `
+  CREATE TABLE unified_messages (
+    id BIGINT NOT NULL DEFAULT nextval('unified_messages_id_seq'),
+    conversation_id TEXT NOT NULL,
+    message_key TEXT,
+    message_content TEXT NOT NULL,
+    message_role TEXT NOT NULL, -- 'user', 'assistant'
+    created_at TIMESTAMP NOT NULL,
+    source TEXT NOT NULL,
+    function_data JSONB DEFAULT '{}',
+    PRIMARY KEY (id, created_at),
+    FOREIGN KEY (conversation_id) REFERENCES unified_conversations(conversation_id)
+  ) PARTITION BY RANGE (created_at);
+  CREATE TABLE unified_messages_default PARTITION OF unified_messages DEFAULT;
+  CREATE UNIQUE INDEX uq_unified_messages_source_key ON unified_messages (source, message_key, created_at);
+  CREATE INDEX idx_unified_messages_conversation_time ON unified_messages (conversation_id, created_at);
+  ALTER SEQUENCE unified_messages_id_seq OWNED BY unified_messages.id;
+`;
+
+// First day of the month containing date, and of the month `offset` months later (UTC)
+function monthStart(date, offset = 0) {
+  return new Date(Date.UTC(date.getUTCFullYear(), date.getUTCMonth() + offset, 1));
+}
+
+function partitionName(month) {
+  return `unified_messages_p${month.getUTCFullYear()}_${String(month.getUTCMonth() + 1).padStart(2, '0')}`;
+}
+
+// Natural key for messages without an upstream id. Computed in SQL so the startup
+// backfill and every later insert hash exactly the same text.
+const messageHashSql = (m) =>
+  `md5(${m}.conversation_id || '|' || ${m}.created_at::text || '|' || ${m}.message_role || '|' || ${m}.message_content)`;
+
+// syncVAPICalls keys call messages as <call_id>:<kind>. Rows written before message keys
+// existed are recognised by their fixed content prefixes so they get the same keys.
+const vapiMessageKeySql = (m) => `substr(${m}.conversation_id, 6) || ':' || CASE
+    WHEN ${m}.message_content LIKE '📞 Phone call started%' THEN 'started'
+    WHEN ${m}.message_content LIKE '📋 Call Summary:%' THEN 'summary'
+    WHEN ${m}.message_content LIKE '🎵 Recording:%' THEN 'recording'
+    WHEN ${m}.message_role = 'user' THEN 'transcript'
+  END`;
+
+// "($1, $2, $3), ($4, $5, $6), ..." for a multi-row VALUES list
+function valuesPlaceholders(rowCount, width) {
+  const rows = [];
+  for (let r = 0; r < rowCount; r++) {
+    const cols = [];
+    for (let c = 1; c <= width; c++) cols.push(`$${r * width + c}`);
+    rows.push(`(${cols.join(', ')})`);
+  }
+  return rows.join(', ');
+}
+
+function woodstockFunctionData(message) {
+  const functionData = {};
+  if (message.executed_function_name) {
+    functionData.function_name = message.executed_function_name;
+    functionData.input_parameters = message.function_input_parameters;
+    functionData.output_result = message.function_output_result;
+  }
+  return functionData;
+}
+
+// conversation_upserted for conversations a sync just wrote. Shared sources belong to the
+// deployment's business (BUSINESS_ID), so their events go to that account's streams only;
+// without one configured they reach every stream and carry no customer details (clients refetch).
+function publishConversationChanges(source, conversations) {
+  if (conversations.length === 0) return;
+  const accountId = process.env.BUSINESS_ID || undefined;
+  if (conversations.length > SYNC_EVENT_MAX) {
+    inboxEvents.publish({ type: EVENT_TYPES.RESYNC, account_id: accountId, source, reason: 'bulk_sync', count: conversations.length });
+    return;
+  }
+  for (const conv of conversations) {
+    const event = {
+      type: EVENT_TYPES.CONVERSATION_UPSERTED,
+      account_id: accountId,
+      source,
+      conversation_id: conv.conversation_id,
+      last_message_at: conv.last_message_at ? new Date(conv.last_message_at).getTime() : null
+    };
+    if (accountId) {
+      event.customer_name = conv.customer_name;
+      event.last_message_content = conv.last_message_content;
+    }
+    inboxEvents.publish(event);
+  }
+}
+
+// Messages for one call, keyed by their role in the call so updates replace in place. created_at
+// is part of the unique key (and the partition key), so every keyed message is stamped with the
+// call's start; summary and recording carry the end of the call as displayed_at instead, which
+// is only known once the call is over.
+// created_at is NOT NULL and the partition key: older rows may lack a start time
+const vapiCallTime = call => call.call_started_at ?? call.call_ended_at ?? call.created_at;
+
+function vapiCallMessages(call) {
+  const messages = [
+    {
+      key: 'started',
+      content: `📞 Phone call started`,
+      role: 'assistant'
+    }
+  ];
+  
+  if (call.transcript) {
+    messages.push({
+      key: 'transcript',
+      content: call.transcript,
+      role: 'user'
+    });
+  }
+  
+  if (call.summary) {
+    messages.push({
+      key: 'summary',
+      content: `📋 Call Summary: ${call.summary}`,
+      role: 'assistant', 
+      displayedAt: call.call_ended_at
+    });
+  }
+  
+  if (call.recording_url) {
+    messages.push({
+      key: 'recording',
+      content: `🎵 Recording: ${call.recording_url}`,
+      role: 'assistant',
+      displayedAt: call.call_ended_at
+    });
+  }
+  
+  return messages.map(message => ({
+    conversation_id: `vapi_${call.call_id}`,
+    message_key: `${call.call_id}:${message.key}`,
+    content: message.content,
+    role: message.role,
+    created_at: vapiCallTime(call),
+    source: 'vapi',
+    function_data: message.displayedAt ? { displayed_at: message.displayedAt } : {}
+  }));
+}
+
+function chunk(items, size) {
+  const chunks = [];
+  for (let i = 0; i < items.length; i += size) chunks.push(items.slice(i, i + size));
+  return chunks;
+}
+
 class DatabaseBridgeIntegration {
   constructor() {
-    // Database connections
+    // Connection pools (pg.Pool has the same query() API as the old single clients)
     this.woodstockDb = null;
+    this.woodstockUrl = null;
     this.mainDb = null;
+    // Set when a bulk insert put rows in unified_messages_default
+    this.defaultPartitionDirty = false;
   }
   
   async initialize() {
@@ -25,24 +207,24 @@ class DatabaseBridgeIntegration {
       console.log('📡 Connecting to Woodstock database...');
       console.log('🔑 Using env var:', !!process.env.WOODSTOCK_DATABASE_URL ? 'YES' : 'NO (using fallback)');
       
-      this.woodstockDb = new pg.Client({
+      this.woodstockUrl = woodstockUrl;
+      this.woodstockDb = createPool('woodstock', {
         connectionString: woodstockUrl,
-        connectionTimeoutMillis: 10000, // 10 second timeout
+        max: Number(process.env.WOODSTOCK_POOL_MAX || 5),
+        connectionTimeoutMillis: 10000, // 10 second timeout (counted as an acquire timeout)
         query_timeout: 30000, // 30 second query timeout
         statement_timeout: 30000 // 30 second statement timeout
       });
       
-      // Connect to main inbox database
+      // Main inbox database: same DATABASE_URL as auth.js, so share its pool
       console.log('📡 Connecting to main inbox database...');
-      this.mainDb = new pg.Client({
-        connectionString: process.env.DATABASE_URL
-      });
+      this.mainDb = mainPool;
       
-      // Connect to both databases
+      // Fail fast if either database is unreachable; later drops are healed by the pools
       console.log('🔌 Attempting to establish database connections...');
       await Promise.all([
-        this.woodstockDb.connect().then(() => console.log('✅ Woodstock DB connected')),
-        this.mainDb.connect().then(() => console.log('✅ Main DB connected'))
+        this.woodstockDb.query('SELECT 1').then(() => console.log('✅ Woodstock DB connected')),
+        this.mainDb.query('SELECT 1').then(() => console.log('✅ Main DB connected'))
       ]);
       
       console.log('✅ All database connections established');
@@ -76,147 +258,474 @@ class DatabaseBridgeIntegration {
         metadata JSONB DEFAULT '{}'
       );
       
-      CREATE TABLE IF NOT EXISTS unified_messages (
-        id SERIAL PRIMARY KEY,
-        conversation_id TEXT NOT NULL,
-        message_content TEXT NOT NULL,
-        message_role TEXT NOT NULL, -- 'user', 'assistant'
-        created_at TIMESTAMP NOT NULL,
-        source TEXT NOT NULL,
-        function_data JSONB DEFAULT '{}',
-        FOREIGN KEY (conversation_id) REFERENCES unified_conversations(conversation_id)
-      );
-      
       CREATE INDEX IF NOT EXISTS idx_unified_conversations_source ON unified_conversations(source);
       CREATE INDEX IF NOT EXISTS idx_unified_conversations_updated ON unified_conversations(updated_at);
-      CREATE INDEX IF NOT EXISTS idx_unified_messages_conversation ON unified_messages(conversation_id);
+      CREATE INDEX IF NOT EXISTS idx_unified_conversations_keyset
+        ON unified_conversations ((${KEYSET_MS}) DESC, (${KEYSET_ID}) DESC);
+      CREATE INDEX IF NOT EXISTS idx_unified_conversations_source_keyset
+        ON unified_conversations (source, (${KEYSET_MS}) DESC, (${KEYSET_ID}) DESC);
+      
+      -- High-water marks for incremental syncs, one row per source
+      CREATE TABLE IF NOT EXISTS unified_sync_state (
+        source TEXT PRIMARY KEY,
+        watermark_at TEXT,
+        watermark_id TEXT,
+        rows_synced BIGINT DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT NOW()
+      );
     `);
     
+    const messages = await this.mainDb.query(
+      "SELECT relkind FROM pg_class WHERE oid = to_regclass('unified_messages')"
+    );
+    if (messages.rows.length === 0) {
+      await withTransaction(this.mainDb, async (db) => {
+        await db.query('CREATE SEQUENCE IF NOT EXISTS unified_messages_id_seq');
+        await db.query(UNIFIED_MESSAGES_DDL);
+      });
+    } else if (messages.rows[0].relkind !== 'p') {
+      await this.migrateMessageKeys();
+      await this.partitionUnifiedMessages();
+    }
+    await this.removeHashedVapiDuplicates();
+    await this.stabilizeVapiMessageTimes();
+    
+    await this.maintainMessagePartitions({ force: true });
+    
     console.log('✅ Unified tables created/verified');
   }
   
+  // One-off: move a pre-partitioning unified_messages heap into the partitioned layout.
+  // Partitions are created for every month present, so nothing lands in the default partition.
+  async partitionUnifiedMessages() {
+    console.log('🗂️ Partitioning unified_messages by month...');
+    const moved = await withTransaction(this.mainDb, async (db) => {
+      await db.query('LOCK TABLE unified_messages IN ACCESS EXCLUSIVE MODE');
+      await db.query(`
+        ALTER TABLE unified_messages RENAME TO unified_messages_unpartitioned;
+        ALTER INDEX IF EXISTS unified_messages_pkey RENAME TO unified_messages_unpartitioned_pkey;
+        ALTER INDEX IF EXISTS uq_unified_messages_source_key RENAME TO uq_unified_messages_unpartitioned_source_key;
+        DROP INDEX IF EXISTS idx_unified_messages_conversation;
+        CREATE SEQUENCE IF NOT EXISTS unified_messages_id_seq;
+        ALTER SEQUENCE unified_messages_id_seq OWNED BY NONE;
+      `);
+      await db.query(UNIFIED_MESSAGES_DDL);
+      
+      // Month bounds rendered by Postgres: created_at has no time zone, so JS Date parsing could shift them
+      const range = await db.query(`
+        SELECT to_char(MIN(created_at), 'YYYY-MM-01') AS first, to_char(MAX(created_at), 'YYYY-MM-01') AS last
+        FROM unified_messages_unpartitioned
+      `);
+      if (range.rows[0].first) {
+        await this.createMessagePartitions(new Date(range.rows[0].first), new Date(range.rows[0].last), db);
+      }
+      
+      const result = await db.query(`
+        INSERT INTO unified_messages (
+          id, conversation_id, message_key, message_content, message_role, created_at, source, function_data
+        )
+        SELECT id, conversation_id, message_key, message_content, message_role, created_at, source, function_data
+        FROM unified_messages_unpartitioned
+      `);
+      await db.query('DROP TABLE unified_messages_unpartitioned');
+      await db.query("SELECT setval('unified_messages_id_seq', GREATEST((SELECT MAX(id) FROM unified_messages), 1))");
+      return result.rowCount;
+    });
+    console.log(`✅ unified_messages partitioned (${moved} rows moved)`);
+  }
+  
+  // Monthly partitions for every month in [first, last]; existing ones are left alone
+  async createMessagePartitions(first, last, db = this.mainDb) {
+    for (let month = first; month <= last; month = monthStart(month, 1)) {
+      await db.query(`
+        CREATE TABLE IF NOT EXISTS ${partitionName(month)} PARTITION OF unified_messages
+        FOR VALUES FROM ('${month.toISOString().slice(0, 10)}') TO ('${monthStart(month, 1).toISOString().slice(0, 10)}')
+      `);
+    }
+  }
+  
+  // Keeps partitions ready for the coming months and applies retention. Runs at startup and
+  // then at most every MESSAGE_MAINTENANCE_INTERVAL_MS from runSync().
+  async maintainMessagePartitions({ force = false } = {}) {
+    const now = new Date();
+    if (!force && this.lastMessageMaintenanceAt && now - this.lastMessageMaintenanceAt < MESSAGE_MAINTENANCE_INTERVAL_MS) return;
+    this.lastMessageMaintenanceAt = now;
+    
+    try {
+      await this.createMessagePartitions(monthStart(now), monthStart(now, MESSAGE_PARTITIONS_AHEAD));
+      const cutoff = MESSAGE_RETENTION_MONTHS > 0 ? monthStart(now, -MESSAGE_RETENTION_MONTHS) : null;
+      if (cutoff) await this.applyMessageRetention(cutoff);
+      await this.drainDefaultMessagePartition(cutoff);
+    } catch (error) {
+      console.error('❌ unified_messages partition maintenance failed:', error.message);
+    }
+  }
+  
+  // Give every month found in the default partition its own partition. A range can only be
+  // added while the default holds none of its rows, so they are moved out and back in within
+  // one short transaction, outside any sync.
+  async drainDefaultMessagePartition(cutoff = null) {
+    this.defaultPartitionDirty = false;
+    const months = await this.mainDb.query(`
+      SELECT to_char(date_trunc('month', created_at), 'YYYY-MM-01') AS month, COUNT(*) AS row_count
+      FROM unified_messages_default
+      WHERE $1::timestamp IS NULL OR created_at >= $1::timestamp
+      GROUP BY 1
+      ORDER BY 1
+    `, [cutoff]);
+    
+    for (const { month: monthText, row_count: moved } of months.rows) {
+      const month = new Date(monthText);
+      const from = month.toISOString().slice(0, 10);
+      const to = monthStart(month, 1).toISOString().slice(0, 10);
+      await withTransaction(this.mainDb, async (db) => {
+        await db.query(`
+          CREATE TEMP TABLE unified_messages_moving (LIKE unified_messages) ON COMMIT DROP;
+          WITH moved AS (
+            DELETE FROM unified_messages_default WHERE created_at >= '${from}' AND created_at < '${to}'
+            RETURNING *
+          )
+          INSERT INTO unified_messages_moving SELECT * FROM moved;
+        `);
+        await this.createMessagePartitions(month, month, db);
+        await db.query('INSERT INTO unified_messages SELECT * FROM unified_messages_moving');
+      });
+      console.log(`🗂️ unified_messages: moved ${moved} rows from the default partition into ${partitionName(month)}`);
+    }
+  }
+  
+  // Partitions wholly older than cutoff are detached (archived_<name>) or dropped - a catalog
+  // change instead of a DELETE, so no bloat and nothing left for vacuum
+  async applyMessageRetention(cutoff) {
+    const partitions = await this.mainDb.query(`
+      SELECT c.relname
+      FROM pg_inherits i
+      JOIN pg_class c ON c.oid = i.inhrelid
+      WHERE i.inhparent = 'unified_messages'::regclass
+    `);
+    
+    for (const { relname } of partitions.rows) {
+      const match = relname.match(MESSAGE_PARTITION_RE);
+      if (!match) continue;
+      const month = new Date(Date.UTC(Number(match[1]), Number(match[2]) - 1, 1));
+      if (monthStart(month, 1) > cutoff) continue;
+      
+      if (MESSAGE_RETENTION_MODE === 'drop') {
+        await this.mainDb.query(`DROP TABLE ${relname}`);
+      } else {
+        await withTransaction(this.mainDb, async (db) => {
+          await db.query(`ALTER TABLE unified_messages DETACH PARTITION ${relname}`);
+          await db.query(`ALTER TABLE ${relname} RENAME TO archived_${relname}`);
+        });
+      }
+      console.log(`🗄️ unified_messages: ${MESSAGE_RETENTION_MODE === 'drop' ? 'dropped' : 'archived'} ${relname}`);
+    }
+    
+    // Stragglers older than the partitioned range sit in the default partition
+    const stale = await this.mainDb.query('DELETE FROM unified_messages_default WHERE created_at < $1', [cutoff]);
+    if (stale.rowCount > 0) console.log(`🗄️ unified_messages: removed ${stale.rowCount} expired rows from the default partition`);
+  }
+  
+  // unified_messages gets a natural key (source, message_key) so re-syncs are idempotent.
+  // One-off on existing tables: key legacy rows, drop the duplicates, then add the unique index.
+  async migrateMessageKeys() {
+    await this.mainDb.query('ALTER TABLE unified_messages ADD COLUMN IF NOT EXISTS message_key TEXT');
+    
+    const existing = await this.mainDb.query(
+      "SELECT to_regclass('uq_unified_messages_source_key') IS NOT NULL AS present"
+    );
+    if (existing.rows[0].present) return;
+    
+    console.log('🔑 Adding natural keys to unified_messages...');
+    const removed = await withTransaction(this.mainDb, async (db) => {
+      // VAPI rows get the keys the call sync writes, so the next sync updates them in place
+      await db.query(`
+        UPDATE unified_messages m SET message_key = ${vapiMessageKeySql('m')}
+        WHERE message_key IS NULL AND source = 'vapi' AND conversation_id LIKE 'vapi\\_%'
+      `);
+      await db.query(`
+        UPDATE unified_messages m SET message_key = ${messageHashSql('m')} WHERE message_key IS NULL
+      `);
+      const deleted = await db.query(`
+        DELETE FROM unified_messages a
+        USING unified_messages b
+        WHERE a.source = b.source AND a.message_key = b.message_key AND a.id > b.id
+      `);
+      await db.query(`
+        CREATE UNIQUE INDEX uq_unified_messages_source_key ON unified_messages (source, message_key)
+      `);
+      return deleted.rowCount;
+    });
+    console.log(`✅ unified_messages keyed (${removed} duplicate rows removed)`);
+  }
+  
+  // Tables keyed before VAPI rows got call keys hold content-hash copies of call messages that
+  // the next sync re-created under <call_id>:<kind>. Drop the hashed copies for those calls;
+  // a no-op once cleaned up.
+  async removeHashedVapiDuplicates() {
+    const removed = await this.mainDb.query(`
+      DELETE FROM unified_messages m
+      WHERE m.source = 'vapi'
+        AND m.message_key NOT LIKE '%:%'
+        AND EXISTS (
+          SELECT 1 FROM unified_messages k
+          WHERE k.source = 'vapi' AND k.conversation_id = m.conversation_id AND k.message_key LIKE '%:%'
+        )
+    `);
+    if (removed.rowCount > 0) console.log(`🔑 unified_messages: removed ${removed.rowCount} hashed duplicates of VAPI call messages`);
+  }
+  
+  // Summary/recording messages used to be stamped with the call's end, so a call synced before
+  // and after it ended has two copies. Keep one, moved to the call's start like the sync now
+  // writes it (with the old time kept as displayed_at); a no-op once cleaned up.
+  async stabilizeVapiMessageTimes() {
+    const mismatched = `
+      m.source = 'vapi'
+      AND (m.message_key LIKE '%:summary' OR m.message_key LIKE '%:recording')
+      AND s.source = 'vapi'
+      AND s.conversation_id = m.conversation_id
+      AND s.message_key = regexp_replace(m.message_key, ':[a-z]+$', ':started')
+      AND m.created_at <> s.created_at`;
+    await withTransaction(this.mainDb, async (db) => {
+      const removed = await db.query(`
+        DELETE FROM unified_messages m
+        USING unified_messages s, unified_messages k
+        WHERE ${mismatched}
+          AND k.source = 'vapi' AND k.message_key = m.message_key AND k.created_at = s.created_at
+      `);
+      const moved = await db.query(`
+        UPDATE unified_messages m
+        SET created_at = s.created_at,
+            function_data = COALESCE(m.function_data, '{}') || jsonb_build_object('displayed_at', m.created_at)
+        FROM unified_messages s
+        WHERE ${mismatched}
+      `);
+      if (removed.rowCount + moved.rowCount > 0) {
+        console.log(`🔑 unified_messages: ${removed.rowCount} duplicate call summaries removed, ${moved.rowCount} re-stamped`);
+      }
+    });
+  }
+  
+  // Set-based idempotent insert: rows = [{ conversation_id, message_key?, content, role, created_at, source, function_data }].
+  // Rows without a message_key are keyed by content hash. Re-running a sync is a no-op; a keyed
+  // message whose content changed upstream (e.g. a VAPI summary) is updated in place. created_at
+  // is part of the key because unique indexes on a partitioned table must include it, so keyed
+  // messages must always be written with the same created_at.
+  async bulkUpsertMessages(rows, db = this.mainDb) {
+    let inserted = 0;
+    for (const part of chunk(rows, BULK_CHUNK_ROWS)) {
+      const result = await db.query(`
+        WITH written AS (
+          INSERT INTO unified_messages (
+            conversation_id, message_key, message_content, message_role, created_at, source, function_data
+          )
+          SELECT DISTINCT ON (source, message_key, created_at)
+            conversation_id, message_key, message_content, message_role, created_at, source, function_data
+          FROM (
+            SELECT m.conversation_id, COALESCE(m.message_key, ${messageHashSql('m')}) AS message_key,
+                   m.message_content, m.message_role, m.created_at, m.source, m.function_data
+            FROM unnest($1::text[], $2::text[], $3::text[], $4::text[], $5::timestamp[], $6::text[], $7::jsonb[])
+              AS m(conversation_id, message_key, message_content, message_role, created_at, source, function_data)
+          ) incoming
+          ON CONFLICT (source, message_key, created_at) DO UPDATE SET
+            message_content = EXCLUDED.message_content,
+            function_data = EXCLUDED.function_data
+          WHERE (unified_messages.message_content, unified_messages.function_data)
+            IS DISTINCT FROM (EXCLUDED.message_content, EXCLUDED.function_data)
+          RETURNING tableoid
+        )
+        SELECT COUNT(*)::int AS written,
+               COUNT(*) FILTER (WHERE tableoid = 'unified_messages_default'::regclass)::int AS defaulted
+        FROM written
+      `, [
+        part.map(row => row.conversation_id),
+        part.map(row => row.message_key ?? null),
+        part.map(row => row.content ?? ''),
+        part.map(row => row.role),
+        part.map(row => row.created_at),
+        part.map(row => row.source),
+        part.map(row => JSON.stringify(row.function_data || {}))
+      ]);
+      inserted += result.rows[0].written;
+      // Outside the prepared months: the next sync runs maintenance to give them a partition
+      if (result.rows[0].defaulted > 0) this.defaultPartitionDirty = true;
+    }
+    return inserted;
+  }
+  
   // ===== WOODSTOCK SYNC =====
   
+  async getSyncWatermark(source) {
+    const result = await this.mainDb.query(
+      'SELECT watermark_at, watermark_id FROM unified_sync_state WHERE source = $1',
+      [source]
+    );
+    return result.rows[0] || null;
+  }
+  
+  async setSyncWatermark(source, watermarkAt, watermarkId, rowsSynced, db = this.mainDb) {
+    await db.query(`
+      INSERT INTO unified_sync_state (source, watermark_at, watermark_id, rows_synced, updated_at)
+      VALUES ($1, $2, $3, $4, NOW())
+      ON CONFLICT (source) DO UPDATE SET
+        watermark_at = EXCLUDED.watermark_at,
+        watermark_id = EXCLUDED.watermark_id,
+        rows_synced = unified_sync_state.rows_synced + EXCLUDED.rows_synced,
+        updated_at = EXCLUDED.updated_at
+    `, [source, watermarkAt, watermarkId, rowsSynced]);
+  }
+  
+  // Pulls only conversations whose last_message_at moved past the stored high-water mark
+  // (last_message_at, conversation_id), in batches, so nothing is dropped and idle cycles
+  // cost one empty query. The watermark is stored as Postgres' own text rendering of the
+  // timestamp so it compares exactly on the next run.
   async syncWoodstockConversations() {
     console.log('🌲 Syncing Woodstock conversations...');
     
     try {
-      // Get recent conversations from Woodstock
-      const conversations = await this.woodstockDb.query(`
-          SELECT 
-              conversation_id,
-              user_identifier,
-              platform_type,
-              conversation_started_at,
-              last_message_at,
-              is_active
-          FROM chatbot_conversations 
-          WHERE is_active = true
-          AND last_message_at > NOW() - INTERVAL '30 days'
-          ORDER BY last_message_at DESC
-          LIMIT 50
-      `);
+      const watermark = await this.getSyncWatermark('woodstock');
+      let afterAt = watermark?.watermark_at || null;
+      let afterId = watermark?.watermark_id || '';
+      let total = 0;
       
-      console.log(`📊 Found ${conversations.rows.length} Woodstock conversations`);
+      if (!afterAt) {
+        // First run: backfill a bounded window instead of the whole history
+        const start = await this.woodstockDb.query(
+          `SELECT (NOW() - make_interval(days => $1::int))::text AS since`,
+          [WOODSTOCK_BACKFILL_DAYS]
+        );
+        afterAt = start.rows[0].since;
+        console.log(`🌲 No Woodstock watermark yet - backfilling since ${afterAt}`);
+      }
       
-      for (const conv of conversations.rows) {
-          // Get last message for this conversation
-          const lastMessage = await this.woodstockDb.query(`
-              SELECT message_content, message_role
-              FROM chatbot_messages 
-              WHERE conversation_id = $1
-              ORDER BY message_created_at DESC
-              LIMIT 1
-          `, [conv.conversation_id]);
-          
-          const lastMessageContent = lastMessage.rows.length > 0 ? 
-              lastMessage.rows[0].message_content : 'No messages';
-          
-          // Upsert into unified table
-          await this.mainDb.query(`
-              INSERT INTO unified_conversations (
-                  conversation_id, source, customer_name, customer_phone, customer_email,
-                  last_message_content, last_message_at, updated_at, metadata
-              ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-              ON CONFLICT (conversation_id) DO UPDATE SET
-                  customer_name = EXCLUDED.customer_name,
-                  last_message_content = EXCLUDED.last_message_content,
-                  last_message_at = EXCLUDED.last_message_at,
-                  updated_at = EXCLUDED.updated_at,
-                  metadata = EXCLUDED.metadata
-          `, [
-              `woodstock_${conv.conversation_id}`,
-              'woodstock',
-              `AI Customer ${conv.user_identifier}`,
-              conv.user_identifier.includes('@') ? '' : conv.user_identifier, // phone if not email
-              conv.user_identifier.includes('@') ? conv.user_identifier : '', // email if contains @
-              lastMessageContent,
-              conv.last_message_at,
-              new Date(),
-              JSON.stringify({
-                  original_id: conv.conversation_id,
-                  platform_type: conv.platform_type,
-                  started_at: conv.conversation_started_at
-              })
-          ]);
-          
-          // Sync recent messages
-          await this.syncConversationMessages(conv.conversation_id);
+      while (true) {
+        // Last message via LATERAL instead of one LIMIT 1 query per conversation
+        const conversations = await this.woodstockDb.query(`
+            SELECT 
+                c.conversation_id,
+                c.user_identifier,
+                c.platform_type,
+                c.conversation_started_at,
+                c.last_message_at,
+                c.last_message_at::text AS watermark_at,
+                c.conversation_id::text AS watermark_id,
+                lm.message_content AS last_message_content
+            FROM chatbot_conversations c
+            LEFT JOIN LATERAL (
+                SELECT message_content
+                FROM chatbot_messages m
+                WHERE m.conversation_id = c.conversation_id
+                ORDER BY m.message_created_at DESC
+                LIMIT 1
+            ) lm ON true
+            WHERE c.is_active = true
+            AND c.last_message_at IS NOT NULL
+            AND (c.last_message_at, c.conversation_id::text) > ($1, $2)
+            ORDER BY c.last_message_at ASC, c.conversation_id::text ASC
+            LIMIT $3
+        `, [afterAt, afterId, WOODSTOCK_SYNC_BATCH]);
+        
+        const rows = conversations.rows;
+        if (rows.length === 0) break;
+        
+        const last = rows[rows.length - 1];
+        // One pooled client per batch; inbox reads keep using the rest of the pool
+        await withTransaction(this.mainDb, async (db) => {
+          await this.upsertWoodstockConversations(rows, db);
+          await this.syncConversationMessages(rows.map(conv => conv.conversation_id), db);
+          // Advance the watermark in the same transaction as the rows it covers
+          await this.setSyncWatermark('woodstock', last.watermark_at, last.watermark_id, rows.length, db);
+        });
+        // Only after commit, so clients never refetch ahead of the data
+        publishConversationChanges('woodstock', rows.map(conv => ({
+          conversation_id: `woodstock_${conv.conversation_id}`,
+          customer_name: `AI Customer ${conv.user_identifier || ''}`,
+          last_message_at: conv.last_message_at,
+          last_message_content: conv.last_message_content ?? 'No messages'
+        })));
+        
+        total += rows.length;
+        afterAt = last.watermark_at;
+        afterId = last.watermark_id;
+        if (rows.length < WOODSTOCK_SYNC_BATCH) break;
       }
       
-      console.log(`✅ Synced ${conversations.rows.length} Woodstock conversations`);
+      console.log(`✅ Synced ${total} changed Woodstock conversations (watermark ${afterAt})`);
       
     } catch (error) {
       console.error('❌ Error syncing Woodstock conversations:', error);
     }
   }
   
-  async syncConversationMessages(conversationId) {
-      // Get recent messages
-      const messages = await this.woodstockDb.query(`
-          SELECT 
-              message_content,
-              message_role,
-              message_created_at,
-              executed_function_name,
-              function_input_parameters,
-              function_output_result
-          FROM chatbot_messages 
-          WHERE conversation_id = $1
-          AND message_created_at > NOW() - INTERVAL '7 days'
-          ORDER BY message_created_at ASC
-          LIMIT 20
-      `, [conversationId]);
+  async upsertWoodstockConversations(conversations, db = this.mainDb) {
+    const now = new Date();
+    const params = [];
+    for (const conv of conversations) {
+      const identifier = conv.user_identifier || '';
+      params.push(
+        `woodstock_${conv.conversation_id}`,
+        'woodstock',
+        `AI Customer ${identifier}`,
+        identifier.includes('@') ? '' : identifier, // phone if not email
+        identifier.includes('@') ? identifier : '', // email if contains @
+        conv.last_message_content ?? 'No messages',
+        conv.last_message_at,
+        now,
+        JSON.stringify({
+          original_id: conv.conversation_id,
+          platform_type: conv.platform_type,
+          started_at: conv.conversation_started_at
+        })
+      );
+    }
+    
+    await db.query(`
+        INSERT INTO unified_conversations (
+            conversation_id, source, customer_name, customer_phone, customer_email,
+            last_message_content, last_message_at, updated_at, metadata
+        ) VALUES ${valuesPlaceholders(conversations.length, 9)}
+        ON CONFLICT (conversation_id) DO UPDATE SET
+            customer_name = EXCLUDED.customer_name,
+            last_message_content = EXCLUDED.last_message_content,
+            last_message_at = EXCLUDED.last_message_at,
+            updated_at = EXCLUDED.updated_at,
+            metadata = EXCLUDED.metadata
+    `, params);
+  }
+  
+  // Latest messages for a batch of changed conversations: one read, one set-based insert
+  async syncConversationMessages(conversationIds, db = this.mainDb) {
+      if (conversationIds.length === 0) return;
       
-      const unifiedConversationId = `woodstock_${conversationId}`;
+      const messages = await this.woodstockDb.query(`
+          SELECT conversation_id, message_content, message_role, message_created_at,
+                 executed_function_name, function_input_parameters, function_output_result
+          FROM (
+              SELECT 
+                  conversation_id,
+                  message_content,
+                  message_role,
+                  message_created_at,
+                  executed_function_name,
+                  function_input_parameters,
+                  function_output_result,
+                  ROW_NUMBER() OVER (PARTITION BY conversation_id ORDER BY message_created_at DESC) AS rn
+              FROM chatbot_messages 
+              WHERE conversation_id = ANY($1)
+              AND message_created_at > NOW() - INTERVAL '7 days'
+          ) recent
+          WHERE rn <= $2
+          ORDER BY conversation_id, message_created_at ASC
+      `, [conversationIds, WOODSTOCK_MESSAGES_PER_CONVERSATION]);
       
-      // Clear existing messages for this conversation
-      await this.mainDb.query(`
-          DELETE FROM unified_messages WHERE conversation_id = $1
-      `, [unifiedConversationId]);
-      
-      // Insert messages
-      for (const message of messages.rows) {
-          const functionData = {};
-          if (message.executed_function_name) {
-              functionData.function_name = message.executed_function_name;
-              functionData.input_parameters = message.function_input_parameters;
-              functionData.output_result = message.function_output_result;
-          }
-          
-          await this.mainDb.query(`
-              INSERT INTO unified_messages (
-                  conversation_id, message_content, message_role, created_at, source, function_data
-              ) VALUES ($1, $2, $3, $4, $5, $6)
-          `, [
-              unifiedConversationId,
-              message.message_content,
-              message.message_role,
-              message.message_created_at,
-              'woodstock',
-              JSON.stringify(functionData)
-          ]);
-      }
+      await this.bulkUpsertMessages(messages.rows.map(message => ({
+          conversation_id: `woodstock_${message.conversation_id}`,
+          content: message.message_content,
+          role: message.message_role,
+          created_at: message.message_created_at,
+          source: 'woodstock',
+          function_data: woodstockFunctionData(message)
+      })), db);
   }
   
   async syncWoodstockConversation(conversation) {
@@ -293,35 +802,14 @@ class DatabaseBridgeIntegration {
       ORDER BY created_at ASC
     `, [conversationId]);
     
-    const unifiedConversationId = `woodstock_${conversationId}`;
-    
-    // Clear existing messages for this conversation
-    await this.mainDb.query(`
-      DELETE FROM unified_messages WHERE conversation_id = $1
-    `, [unifiedConversationId]);
-    
-    // Insert messages
-    for (const message of messages.rows) {
-      const functionData = {};
-      if (message.executed_function_name) {
-        functionData.function_name = message.executed_function_name;
-        functionData.input_parameters = message.function_input_parameters;
-        functionData.output_result = message.function_output_result;
-      }
-      
-      await this.mainDb.query(`
-        INSERT INTO unified_messages (
-          conversation_id, message_content, message_role, created_at, source, function_data
-        ) VALUES ($1, $2, $3, $4, $5, $6)
-      `, [
-        unifiedConversationId,
-        message.message_content,
-        message.message_role,
-        message.created_at,
-        'woodstock',
-        JSON.stringify(functionData)
-      ]);
-    }
+    await this.bulkUpsertMessages(messages.rows.map(message => ({
+      conversation_id: `woodstock_${conversationId}`,
+      content: message.message_content,
+      role: message.message_role,
+      created_at: message.created_at,
+      source: 'woodstock',
+      function_data: woodstockFunctionData(message)
+    })));
   }
   
   // ===== VAPI SYNC =====
@@ -347,11 +835,9 @@ class DatabaseBridgeIntegration {
         ORDER BY call_started_at DESC
       `);
       
-      for (const call of calls.rows) {
-        await this.syncVAPICall(call);
-      }
+      const { synced, failed } = await this.syncVAPICalls(calls.rows);
       
-      console.log(`✅ Synced ${calls.rows.length} VAPI calls`);
+      console.log(`✅ Synced ${synced} VAPI calls${failed ? ` (${failed} failed)` : ''}`);
       
     } catch (error) {
       console.error('❌ Error syncing VAPI calls:', error);
@@ -360,102 +846,104 @@ class DatabaseBridgeIntegration {
   
   async syncVAPICall(call) {
     try {
-      const conversationId = `vapi_${call.call_id}`;
-      
-      // Upsert conversation
-      await this.mainDb.query(`
-        INSERT INTO unified_conversations (
-          conversation_id, source, customer_name, customer_phone, customer_email,
-          last_message_content, last_message_at, updated_at, metadata
-        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-        ON CONFLICT (conversation_id) DO UPDATE SET
-          customer_name = EXCLUDED.customer_name,
-          customer_phone = EXCLUDED.customer_phone,
-          last_message_content = EXCLUDED.last_message_content,
-          last_message_at = EXCLUDED.last_message_at,
-          updated_at = EXCLUDED.updated_at,
-          metadata = EXCLUDED.metadata
-      `, [
-        conversationId,
-        'vapi',
-        call.customer_name || 'Phone Customer',
-        call.customer_phone || '',
-        '', // No email for phone calls
-        call.summary || 'Phone call completed',
-        call.call_ended_at || call.call_started_at,
-        call.created_at,
-        JSON.stringify({
-          call_id: call.call_id,
-          recording_url: call.recording_url,
-          call_duration: call.call_ended_at ? 
-            (new Date(call.call_ended_at) - new Date(call.call_started_at)) / 1000 : null
-        })
-      ]);
-      
-      // Create messages for the call
-      const messages = [
-        {
-          content: `📞 Phone call started`,
-          role: 'assistant',
-          timestamp: call.call_started_at
-        }
-      ];
-      
-      if (call.transcript) {
-        messages.push({
-          content: call.transcript,
-          role: 'user',
-          timestamp: call.call_started_at
-        });
-      }
-      
-      if (call.summary) {
-        messages.push({
-          content: `📋 Call Summary: ${call.summary}`,
-          role: 'assistant', 
-          timestamp: call.call_ended_at || call.call_started_at
-        });
-      }
-      
-      if (call.recording_url) {
-        messages.push({
-          content: `🎵 Recording: ${call.recording_url}`,
-          role: 'assistant',
-          timestamp: call.call_ended_at || call.call_started_at
-        });
-      }
-      
-      // Clear existing messages
-      await this.mainDb.query(`
-        DELETE FROM unified_messages WHERE conversation_id = $1
-      `, [conversationId]);
-      
-      // Insert messages
-      for (const message of messages) {
-        await this.mainDb.query(`
-          INSERT INTO unified_messages (
-            conversation_id, message_content, message_role, created_at, source, function_data
-          ) VALUES ($1, $2, $3, $4, $5, $6)
-        `, [
-          conversationId,
-          message.content,
-          message.role,
-          message.timestamp,
-          'vapi',
-          JSON.stringify({})
-        ]);
-      }
-      
+      await this.syncVAPICalls([call]);
     } catch (error) {
       console.error(`Error syncing VAPI call ${call.call_id}:`, error);
     }
   }
   
+  // Calls are written in chunks of two statements each: one unnest upsert for the conversations,
+  // one bulk upsert for their messages. Each chunk runs in a savepoint; if it fails, its calls are
+  // retried one by one so a bad row only costs that call. Unchanged calls (re-read every sync)
+  // write nothing and publish nothing.
+  async syncVAPICalls(calls) {
+    const byId = new Map();
+    for (const call of calls) {
+      if (!byId.has(call.call_id)) byId.set(call.call_id, call);
+    }
+    const unique = [...byId.values()];
+    if (unique.length === 0) return { synced: 0, failed: 0 };
+    
+    const changed = [];
+    let failed = 0;
+    await withTransaction(this.mainDb, async (db) => {
+      for (const part of chunk(unique, VAPI_CHUNK_CALLS)) {
+        if (part.length > 1) {
+          try {
+            changed.push(...await withSavepoint(db, 'vapi_chunk', () => this.writeVAPICalls(part, db)));
+            continue;
+          } catch (error) {
+            console.error(`⚠️ VAPI chunk of ${part.length} calls failed, retrying call by call:`, error.message);
+          }
+        }
+        for (const call of part) {
+          try {
+            changed.push(...await withSavepoint(db, 'vapi_call', () => this.writeVAPICalls([call], db)));
+          } catch (error) {
+            console.error(`❌ Error syncing VAPI call ${call.call_id}:`, error.message);
+            failed += 1;
+          }
+        }
+      }
+    });
+    
+    // Only after commit, so clients never refetch ahead of the data
+    publishConversationChanges('vapi', changed);
+    return { synced: unique.length - failed, failed };
+  }
+  
+  // Conversations and messages for a set of calls; returns the conversations that changed
+  async writeVAPICalls(calls, db) {
+    const upserted = await db.query(`
+      INSERT INTO unified_conversations (
+        conversation_id, source, customer_name, customer_phone, customer_email,
+        last_message_content, last_message_at, updated_at, metadata
+      )
+      SELECT c.conversation_id, 'vapi', c.customer_name, c.customer_phone, '', -- No email for phone calls
+             c.last_message_content, c.last_message_at, c.updated_at, c.metadata
+      FROM unnest($1::text[], $2::text[], $3::text[], $4::text[], $5::timestamp[], $6::timestamp[], $7::jsonb[])
+        AS c(conversation_id, customer_name, customer_phone, last_message_content, last_message_at, updated_at, metadata)
+      ON CONFLICT (conversation_id) DO UPDATE SET
+        customer_name = EXCLUDED.customer_name,
+        customer_phone = EXCLUDED.customer_phone,
+        last_message_content = EXCLUDED.last_message_content,
+        last_message_at = EXCLUDED.last_message_at,
+        updated_at = EXCLUDED.updated_at,
+        metadata = EXCLUDED.metadata
+      WHERE (unified_conversations.customer_name, unified_conversations.customer_phone,
+             unified_conversations.last_message_content, unified_conversations.last_message_at,
+             unified_conversations.metadata)
+        IS DISTINCT FROM
+            (EXCLUDED.customer_name, EXCLUDED.customer_phone, EXCLUDED.last_message_content,
+             EXCLUDED.last_message_at, EXCLUDED.metadata)
+      RETURNING conversation_id, customer_name, last_message_at, last_message_content
+    `, [
+      calls.map(call => `vapi_${call.call_id}`),
+      calls.map(call => call.customer_name || 'Phone Customer'),
+      calls.map(call => call.customer_phone || ''),
+      calls.map(call => call.summary || 'Phone call completed'),
+      calls.map(call => call.call_ended_at || vapiCallTime(call)),
+      calls.map(call => call.created_at),
+      calls.map(call => JSON.stringify({
+        call_id: call.call_id,
+        recording_url: call.recording_url,
+        call_duration: call.call_ended_at && call.call_started_at ?
+          (new Date(call.call_ended_at) - new Date(call.call_started_at)) / 1000 : null
+      }))
+    ]);
+    
+    await this.bulkUpsertMessages(calls.flatMap(call => vapiCallMessages(call)), db);
+    return upserted.rows;
+  }
+  
   // ===== API ENDPOINTS FOR UNIFIED INBOX =====
   
-  async getUnifiedConversations(platform = null, limit = 50, offset = 0) {
+  // Passing `after` switches to keyset pagination: `{}` for the first page, then the
+  // `_keyset` of the last row consumed. Rows are read straight off the keyset index,
+  // so deep pages cost the same as page one.
+  async getUnifiedConversations(platform = null, limit = 50, offset = 0, after = null) {
     try {
-      console.log(`📊 getUnifiedConversations called - platform: ${platform}, limit: ${limit}, offset: ${offset}`);
+      console.log(`📊 getUnifiedConversations called - platform: ${platform}, limit: ${limit}, offset: ${offset}, after: ${after ? JSON.stringify(after) : 'none'}`);
       
       let query = `
         SELECT 
@@ -467,20 +955,35 @@ class DatabaseBridgeIntegration {
           last_message_content,
           last_message_at,
           created_at,
-          metadata
+          metadata,
+          ${KEYSET_MS} AS keyset_ms
         FROM unified_conversations
       `;
       
       const params = [];
+      const where = [];
       
       if (platform && platform !== 'all') {
-        query += ` WHERE source = $${params.length + 1}`;
         params.push(platform);
+        where.push(`source = $${params.length}`);
         console.log(`🔍 Filtering by source: ${platform}`);
       }
       
-      query += ` ORDER BY last_message_at DESC LIMIT $${params.length + 1} OFFSET $${params.length + 2}`;
-      params.push(limit, offset);
+      if (after && after.id !== undefined) {
+        params.push(String(after.t ?? 0), String(after.id));
+        where.push(`(${KEYSET_MS}, ${KEYSET_ID}) < ($${params.length - 1}::bigint, $${params.length} COLLATE "C")`);
+      }
+      
+      if (where.length > 0) {
+        query += ` WHERE ${where.join(' AND ')}`;
+      }
+      
+      query += ` ORDER BY ${KEYSET_MS} DESC, ${KEYSET_ID} DESC LIMIT $${params.length + 1}`;
+      params.push(limit);
+      if (!after && offset > 0) {
+        query += ` OFFSET $${params.length + 1}`;
+        params.push(offset);
+      }
       
       console.log('🔎 Executing query...');
       const result = await this.mainDb.query(query, params);
@@ -494,12 +997,14 @@ class DatabaseBridgeIntegration {
         user_identifier: row.conversation_id,
         avatar_url: `https://api.dicebear.com/7.x/identicon/svg?seed=${encodeURIComponent(row.conversation_id)}`,
         last_message_at: row.last_message_at,
+        last_message_ts: row.last_message_at ? new Date(row.last_message_at).getTime() : 0,
         last_message_content: row.last_message_content,
         _platform: this.getPlatformName(row.source),
         hash: '',
         channel: this.getChannelNumber(row.source),
         source: row.source,
-        metadata: row.metadata
+        metadata: row.metadata,
+        ...(after ? { _keyset: { t: String(row.keyset_ms), id: row.conversation_id } } : {})
       }));
     } catch (error) {
       console.error('🚨 Error in getUnifiedConversations:', error);
@@ -673,19 +1178,22 @@ class DatabaseBridgeIntegration {
         function_data
       FROM unified_messages
       WHERE conversation_id = $1
-      ORDER BY created_at ASC
+      ORDER BY created_at ASC, id ASC
       LIMIT $2
     `, [conversationId, limit]);
     
     console.log(`📞 Found ${result.rows.length} unified messages`);
     
-    return result.rows.map(row => ({
-      message_created_at: new Date(row.created_at).getTime(),
-      message_content: row.message_content,
-      message_role: row.message_role,
-      function_execution_status: 'read',
-      function_data: row.function_data
-    }));
+    // Call summaries/recordings are stored at the call's start but shown when it ended
+    return result.rows
+      .map(row => ({
+        message_created_at: new Date(row.function_data?.displayed_at ?? row.created_at).getTime(),
+        message_content: row.message_content,
+        message_role: row.message_role,
+        function_execution_status: 'read',
+        function_data: row.function_data
+      }))
+      .sort((a, b) => a.message_created_at - b.message_created_at);
   }
   
   async syncVAPIRuralKingConversations() {
@@ -718,8 +1226,8 @@ class DatabaseBridgeIntegration {
     try {
       const conversationId = conversation.conversation_id;
       
-      // Upsert conversation
-      await this.mainDb.query(`
+      // Upsert conversation; only real changes are written and published
+      const upserted = await this.mainDb.query(`
         INSERT INTO unified_conversations (
           conversation_id, source, customer_name, customer_phone, customer_email,
           last_message_content, last_message_at, updated_at, metadata
@@ -731,6 +1239,13 @@ class DatabaseBridgeIntegration {
           last_message_at = EXCLUDED.last_message_at,
           updated_at = EXCLUDED.updated_at,
           metadata = EXCLUDED.metadata
+        WHERE (unified_conversations.customer_name, unified_conversations.customer_phone,
+               unified_conversations.last_message_content, unified_conversations.last_message_at,
+               unified_conversations.metadata)
+          IS DISTINCT FROM
+              (EXCLUDED.customer_name, EXCLUDED.customer_phone, EXCLUDED.last_message_content,
+               EXCLUDED.last_message_at, EXCLUDED.metadata)
+        RETURNING conversation_id, customer_name, last_message_at, last_message_content
       `, [
         conversationId,
         'vapi_rural',
@@ -747,11 +1262,17 @@ class DatabaseBridgeIntegration {
         })
       ]);
       
+      publishConversationChanges('vapi_rural', upserted.rows);
+      
     } catch (error) {
       console.error(`Error syncing Rural King conversation ${conversation.conversation_id}:`, error);
     }
   }
 
+  getPoolStats() {
+    return poolStats();
+  }
+
   async runSync() {
     console.log('🔄 Starting unified conversation sync...');
     
@@ -761,6 +1282,7 @@ class DatabaseBridgeIntegration {
         this.syncVAPIConversations(),
         this.syncVAPIRuralKingConversations() // RESTORED: Rural King integration
       ]);
+      await this.maintainMessagePartitions({ force: this.defaultPartitionDirty });
       
       console.log('✅ Unified sync completed successfully');
     } catch (error) {
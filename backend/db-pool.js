@@ -0,0 +1,156 @@
+// db-pool.js
+// Instrumented pg pools: acquire-wait metrics, background health checks and a transaction helper.
+// pg.Pool already drops broken clients and reconnects on the next checkout; this adds visibility.
+
+import pg from 'pg';
+
+const HEALTH_CHECK_INTERVAL_MS = Number(process.env.DB_HEALTH_CHECK_INTERVAL_MS || 30000);
+
+const pools = new Map(); // name -> pool
+
+function createPool(name, options = {}) {
+  const pool = new pg.Pool({
+    max: Number(process.env.DB_POOL_MAX || 10),
+    idleTimeoutMillis: 30000,
+    ...options
+  });
+
+  pool.metrics = {
+    acquires: 0,
+    acquireTimeouts: 0,
+    acquireWaitMsTotal: 0,
+    acquireWaitMsMax: 0,
+    errors: 0,
+    healthy: null,
+    lastHealthCheckAt: null,
+    lastError: null
+  };
+
+  // Idle client errors (dropped sockets, server restarts) must not crash the process
+  pool.on('error', (err) => {
+    pool.metrics.errors += 1;
+    pool.metrics.lastError = err?.message || String(err);
+    console.error(`❌ Postgres pool "${name}" client error:`, err?.message || err);
+  });
+
+  // pool.query() checks out through connect(callback), so both forms are timed
+  const connect = pool.connect.bind(pool);
+  const recordAcquire = (start, error) => {
+    if (error) {
+      if (/timeout/i.test(error.message || '')) pool.metrics.acquireTimeouts += 1;
+      return;
+    }
+    const waited = Date.now() - start;
+    pool.metrics.acquires += 1;
+    pool.metrics.acquireWaitMsTotal += waited;
+    if (waited > pool.metrics.acquireWaitMsMax) pool.metrics.acquireWaitMsMax = waited;
+  };
+  pool.connect = function (callback) {
+    const start = Date.now();
+    if (typeof callback === 'function') {
+      return connect((error, client, release) => {
+        recordAcquire(start, error);
+        callback(error, client, release);
+      });
+    }
+    return connect().then(
+      (client) => {
+        recordAcquire(start, null);
+        return client;
+      },
+      (error) => {
+        recordAcquire(start, error);
+        throw error;
+      }
+    );
+  };
+
+  pool.healthCheck = async () => {
+    try {
+      await pool.query('SELECT 1');
+      pool.metrics.healthy = true;
+    } catch (error) {
+      pool.metrics.healthy = false;
+      pool.metrics.lastError = error.message;
+      console.error(`❌ Postgres pool "${name}" health check failed:`, error.message);
+    }
+    pool.metrics.lastHealthCheckAt = new Date().toISOString();
+    return pool.metrics.healthy;
+  };
+
+  if (HEALTH_CHECK_INTERVAL_MS > 0) {
+    const timer = setInterval(() => pool.healthCheck(), HEALTH_CHECK_INTERVAL_MS);
+    timer.unref();
+    pool.stopHealthCheck = () => clearInterval(timer);
+  }
+
+  pools.set(name, pool);
+  return pool;
+}
+
+// Runs fn(client) inside BEGIN/COMMIT on a single checked-out client
+async function withTransaction(pool, fn) {
+  const client = await pool.connect();
+  try {
+    await client.query('BEGIN');
+    const result = await fn(client);
+    await client.query('COMMIT');
+    return result;
+  } catch (error) {
+    await client.query('ROLLBACK').catch(() => {});
+    throw error;
+  } finally {
+    client.release();
+  }
+}
+
+// Shutdown: stop the health checks and close every pool once its checked-out clients are released
+async function closePools() {
+  await Promise.all([...pools].map(async ([name, pool]) => {
+    pool.stopHealthCheck?.();
+    pools.delete(name);
+    try {
+      await pool.end();
+    } catch (error) {
+      console.error(`❌ Postgres pool "${name}" failed to close:`, error.message);
+    }
+  }));
+}
+
+// Runs fn() inside a savepoint of an open transaction: a failure rolls back only fn's writes
+// and rethrows, leaving the transaction usable
+async function withSavepoint(client, name, fn) {
+  await client.query(`SAVEPOINT ${name}`);
+  try {
+    const result = await fn();
+    await client.query(`RELEASE SAVEPOINT ${name}`);
+    return result;
+  } catch (error) {
+    await client.query(`ROLLBACK TO SAVEPOINT ${name}`);
+    throw error;
+  }
+}
+
+function poolStats() {
+  const stats = {};
+  for (const [name, pool] of pools) {
+    const m = pool.metrics;
+    stats[name] = {
+      total: pool.totalCount,
+      idle: pool.idleCount,
+      waiting: pool.waitingCount,
+      max: pool.options.max,
+      acquires: m.acquires,
+      acquire_wait_avg_ms: m.acquires ? +(m.acquireWaitMsTotal / m.acquires).toFixed(2) : 0,
+      acquire_wait_max_ms: m.acquireWaitMsMax,
+      acquire_timeouts: m.acquireTimeouts,
+      errors: m.errors,
+      healthy: m.healthy,
+      last_health_check_at: m.lastHealthCheckAt,
+      last_error: m.lastError
+    };
+  }
+  return stats;
+}
+
+export { createPool, withTransaction, withSavepoint, poolStats, closePools };
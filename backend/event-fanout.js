@@ -0,0 +1,219 @@
+// event-fanout.js
+// Cross-replica delivery of inbox events over Postgres LISTEN/NOTIFY. Events published locally
+// are batched into NOTIFY payloads (a WriteBatcher gives the queue bound and retries); events
+// from other replicas are re-published on the local bus, tagged with their origin so they are
+// never sent back out.
+
+import crypto from 'crypto';
+import pg from 'pg';
+import { WriteBatcher } from './write-batcher.js';
+import { EVENT_TYPES } from './inbox-events.js';
+
+const CHANNEL = process.env.INBOX_FANOUT_CHANNEL || 'inbox_events';
+// NOTIFY payloads must stay under 8000 bytes
+const MAX_PAYLOAD_BYTES = 7500;
+const RECONNECT_MIN_MS = 500;
+const RECONNECT_MAX_MS = 30000;
+
+// Pack events into as few JSON payloads as fit; an event too large on its own loses its
+// free-text message first, and is skipped if it still doesn't fit
+function packPayloads(origin, events) {
+  const payloads = [];
+  const oversized = [];
+  let batch = [];
+  let size = 0;
+  const envelope = (items) => JSON.stringify({ o: origin, e: items });
+  const baseSize = Buffer.byteLength(envelope([]));
+
+  for (const event of events) {
+    let json = JSON.stringify(event);
+    if (baseSize + Buffer.byteLength(json) > MAX_PAYLOAD_BYTES) {
+      const { message, last_message_content, ...slim } = event;
+      json = JSON.stringify({ ...slim, truncated: true });
+      if (baseSize + Buffer.byteLength(json) > MAX_PAYLOAD_BYTES) {
+        oversized.push(event);
+        continue;
+      }
+    }
+    const bytes = Buffer.byteLength(json) + 1; // + separating comma
+    if (batch.length > 0 && baseSize + size + bytes > MAX_PAYLOAD_BYTES) {
+      payloads.push(`{"o":${JSON.stringify(origin)},"e":[${batch.join(',')}]}`);
+      batch = [];
+      size = 0;
+    }
+    batch.push(json);
+    size += bytes;
+  }
+  if (batch.length > 0) payloads.push(`{"o":${JSON.stringify(origin)},"e":[${batch.join(',')}]}`);
+  return { payloads, oversized };
+}
+
+class EventFanout {
+  constructor({
+    bus,
+    pool, // sends NOTIFY
+    connectionString,
+    ssl,
+    channel = CHANNEL,
+    maxBatch = Number(process.env.INBOX_FANOUT_BATCH || 200),
+    maxDelayMs = Number(process.env.INBOX_FANOUT_DELAY_MS || 20),
+    maxQueue = Number(process.env.INBOX_FANOUT_MAX_QUEUE || 10000),
+    createClient = () => new pg.Client({ connectionString, ssl })
+  }) {
+    this.bus = bus;
+    this.pool = pool;
+    this.channel = channel;
+    this.createClient = createClient;
+    this.origin = crypto.randomBytes(6).toString('hex');
+    this.listener = null;
+    this.stopped = false;
+    this.reconnectMs = RECONNECT_MIN_MS;
+    this.stats = {
+      sentEvents: 0,
+      sentPayloads: 0,
+      oversized: 0,
+      receivedEvents: 0,
+      receivedPayloads: 0,
+      badPayloads: 0,
+      reconnects: 0,
+      lastLatencyMs: null,
+      maxLatencyMs: 0,
+      latencyMsTotal: 0
+    };
+
+    this.outbox = new WriteBatcher({
+      name: 'Inbox fan-out',
+      flush: (events) => this.send(events),
+      maxBatch,
+      maxDelayMs,
+      maxQueue
+    });
+
+    // Only events that originated here go out; relayed ones carry their origin
+    this.unsubscribe = bus.subscribe((event) => {
+      if (!event.origin) this.outbox.add(event);
+    });
+  }
+
+  // Never throws: if Postgres is unreachable the listener keeps retrying in the background
+  async start() {
+    this.stopped = false;
+    try {
+      await this.listen();
+    } catch (error) {
+      console.error('❌ Inbox fan-out listener failed to connect:', error.message);
+      this.retry();
+    }
+    return this;
+  }
+
+  async listen() {
+    const client = this.createClient();
+    client.on('notification', (msg) => this.receive(msg));
+    client.on('error', (error) => {
+      console.error('❌ Inbox fan-out listener error:', error.message);
+      this.reconnect(client);
+    });
+    client.on('end', () => this.reconnect(client));
+
+    try {
+      await client.connect();
+      await client.query(`LISTEN ${this.channel}`);
+    } catch (error) {
+      client.removeAllListeners();
+      client.end().catch(() => {});
+      throw error;
+    }
+    this.listener = client;
+    this.reconnectMs = RECONNECT_MIN_MS;
+    console.log(`✅ Inbox fan-out listening on "${this.channel}" (origin ${this.origin})`);
+  }
+
+  reconnect(client) {
+    if (this.stopped || client !== this.listener) return;
+    this.listener = null;
+    client.removeAllListeners();
+    client.end().catch(() => {});
+    this.stats.reconnects += 1;
+    this.retry();
+  }
+
+  retry() {
+    const delay = this.reconnectMs;
+    this.reconnectMs = Math.min(this.reconnectMs * 2, RECONNECT_MAX_MS);
+    const timer = setTimeout(async () => {
+      if (this.stopped) return;
+      try {
+        await this.listen();
+        // Notifications sent while we were away are gone: tell local clients to refetch once
+        this.bus.publish({ type: EVENT_TYPES.RESYNC, reason: 'fanout_reconnect', origin: this.origin });
+      } catch (error) {
+        console.error('❌ Inbox fan-out reconnect failed:', error.message);
+        this.retry();
+      }
+    }, delay);
+    timer.unref?.();
+  }
+
+  async send(events) {
+    const { payloads, oversized } = packPayloads(this.origin, events.map(({ id, ...event }) => event));
+    if (oversized.length) {
+      this.stats.oversized += oversized.length;
+      console.error(`❌ Inbox fan-out skipped ${oversized.length} oversized event(s)`);
+    }
+    if (payloads.length === 0) return;
+    // One round trip for the whole batch
+    await this.pool.query('SELECT pg_notify($1, p) FROM unnest($2::text[]) AS p', [this.channel, payloads]);
+    this.stats.sentPayloads += payloads.length;
+    this.stats.sentEvents += events.length - oversized.length;
+  }
+
+  receive(msg) {
+    let body;
+    try {
+      body = JSON.parse(msg.payload);
+    } catch {
+      this.stats.badPayloads += 1;
+      return;
+    }
+    if (!body || body.o === this.origin || !Array.isArray(body.e)) return;
+
+    this.stats.receivedPayloads += 1;
+    const now = Date.now();
+    for (const event of body.e) {
+      this.stats.receivedEvents += 1;
+      if (typeof event.t === 'number') {
+        const latency = now - event.t;
+        this.stats.lastLatencyMs = latency;
+        this.stats.latencyMsTotal += latency;
+        if (latency > this.stats.maxLatencyMs) this.stats.maxLatencyMs = latency;
+      }
+      this.bus.publish({ ...event, origin: body.o });
+    }
+  }
+
+  async stop() {
+    this.stopped = true;
+    this.unsubscribe();
+    await this.outbox.drain();
+    const client = this.listener;
+    this.listener = null;
+    if (client) {
+      client.removeAllListeners();
+      await client.end().catch(() => {});
+    }
+  }
+
+  metrics() {
+    const { latencyMsTotal, ...stats } = this.stats;
+    return {
+      ...stats,
+      origin: this.origin,
+      listening: Boolean(this.listener),
+      avgLatencyMs: stats.receivedEvents ? +(latencyMsTotal / stats.receivedEvents).toFixed(2) : 0,
+      outbox: this.outbox.metrics()
+    };
+  }
+}
+
+export { EventFanout, packPayloads, MAX_PAYLOAD_BYTES };
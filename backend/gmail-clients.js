@@ -0,0 +1,113 @@
+// gmail-clients.js
+// Per-(business, mailbox) cache of Gmail API clients. Tokens are read from the database once,
+// access tokens are refreshed shortly before they expire, and concurrent sends for the same
+// mailbox share one refresh instead of racing each other on the token endpoint and the UPDATE.
+
+import { TtlCache } from './ttl-cache.js';
+
+const clientKey = (businessId, userEmail) => `${businessId}\u0000${userEmail}`;
+
+class GmailClientCache {
+  // loadTokens(businessId, email) -> row | null, saveTokens(businessId, email, credentials),
+  // refreshTokens(refreshToken) -> credentials, createClient() -> { auth, gmail }
+  constructor({
+    loadTokens,
+    saveTokens,
+    refreshTokens,
+    createClient,
+    refreshSkewMs = 5 * 60 * 1000,
+    ttlMs = 30 * 60 * 1000,
+    maxEntries = 500
+  }) {
+    this.loadTokens = loadTokens;
+    this.saveTokens = saveTokens;
+    this.refreshTokens = refreshTokens;
+    this.createClient = createClient;
+    this.refreshSkewMs = refreshSkewMs;
+    // Entries are re-read from the database after ttlMs, so a revoked or re-consented
+    // mailbox is picked up even if it was changed on another replica
+    this.cache = new TtlCache({ name: 'gmail_clients', ttlMs, maxEntries });
+    this.stats = { refreshes: 0, backgroundRefreshes: 0, adopted: 0, refreshFailures: 0 };
+  }
+
+  async get(businessId, userEmail) {
+    const entry = await this.cache.getOrLoad(clientKey(businessId, userEmail), () => this.load(businessId, userEmail));
+    const remaining = entry.expiresAt - Date.now();
+    if (remaining > this.refreshSkewMs) return entry.gmail;
+
+    // Token still good for a while: refresh behind this send rather than in front of it
+    if (remaining > 30000) {
+      if (!entry.refreshing) this.stats.backgroundRefreshes += 1;
+      this.refresh(entry).catch(error => console.error(`❌ Gmail token refresh failed for ${userEmail}:`, error.message));
+      return entry.gmail;
+    }
+    await this.refresh(entry);
+    return entry.gmail;
+  }
+
+  async load(businessId, userEmail) {
+    const row = await this.loadTokens(businessId, userEmail);
+    if (!row) throw new Error('No OAuth tokens found');
+    const { auth, gmail } = this.createClient();
+    const entry = { businessId, userEmail, auth, gmail, refreshToken: null, expiresAt: 0, refreshing: null };
+    this.apply(entry, row.access_token, row.refresh_token, new Date(row.expires_at).getTime());
+    return entry;
+  }
+
+  // The client only ever gets the access token: with a refresh token (or an expiry inside its
+  // eager window) googleapis would refresh on its own, racing refresh() and never saving it
+  apply(entry, accessToken, refreshToken, expiresAt) {
+    entry.refreshToken = refreshToken || entry.refreshToken;
+    entry.expiresAt = expiresAt;
+    entry.auth.setCredentials({ access_token: accessToken });
+  }
+
+  // Single-flight per mailbox: every caller awaits the same promise
+  refresh(entry) {
+    if (!entry.refreshing) {
+      entry.refreshing = this.doRefresh(entry)
+        .catch((error) => {
+          this.stats.refreshFailures += 1;
+          throw error;
+        })
+        .finally(() => {
+          entry.refreshing = null;
+        });
+    }
+    return entry.refreshing;
+  }
+
+  async doRefresh(entry) {
+    const { businessId, userEmail } = entry;
+
+    // Another replica (or a fresh sign-in) may already have stored a newer token
+    const row = await this.loadTokens(businessId, userEmail);
+    if (!row) {
+      this.invalidate(businessId, userEmail);
+      throw new Error('No OAuth tokens found');
+    }
+    const storedExpiry = new Date(row.expires_at).getTime();
+    if (storedExpiry - Date.now() > this.refreshSkewMs) {
+      this.stats.adopted += 1;
+      this.apply(entry, row.access_token, row.refresh_token, storedExpiry);
+      return;
+    }
+
+    const refreshToken = row.refresh_token || entry.refreshToken;
+    if (!refreshToken) throw new Error('Token expired and no refresh token');
+    const credentials = await this.refreshTokens(refreshToken);
+    this.stats.refreshes += 1;
+    await this.saveTokens(businessId, userEmail, credentials);
+    this.apply(entry, credentials.access_token, credentials.refresh_token || refreshToken, credentials.expiry_date);
+  }
+
+  invalidate(businessId, userEmail) {
+    this.cache.delete(clientKey(businessId, userEmail));
+  }
+
+  metrics() {
+    return { ...this.cache.metrics(), ...this.stats };
+  }
+}
+
+export { GmailClientCache };
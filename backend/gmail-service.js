@@ -7,84 +7,93 @@
 import { google } from 'googleapis';
 import { Pool } from 'pg';
 import dotenv from 'dotenv';
+import { composeRaw, mimeStream, estimatedSize } from './mime-stream.js';
+import { GmailClientCache } from './gmail-clients.js';
 
 dotenv.config();
 
 const pool = new Pool({ connectionString: process.env.DATABASE_URL });
 
+// Above this estimated size (body and attachments base64-encoded once, see estimatedSize) the
+// message is streamed through the media upload endpoint instead of being inlined as base64url
+// in the JSON `raw` field
+const RAW_MAX_BYTES = Number(process.env.GMAIL_RAW_MAX_BYTES || 4 * 1024 * 1024);
+
+const googleClientId = process.env.GOOGLE_CLIENT_ID;
+const googleClientSecret = process.env.GOOGLE_CLIENT_SECRET;
+
+// One Gmail client per (business, mailbox), refreshed ahead of expiry; bulk sends reuse it
+// without touching google_oauth_tokens or the token endpoint
+const gmailClients = new GmailClientCache({
+  refreshSkewMs: Number(process.env.GMAIL_REFRESH_SKEW_MS || 5 * 60 * 1000),
+  ttlMs: Number(process.env.GMAIL_CLIENT_TTL_MS || 30 * 60 * 1000),
+  loadTokens: async (businessId, userEmail) => {
+    const result = await pool.query(
+      'SELECT access_token, refresh_token, expires_at FROM google_oauth_tokens WHERE business_id = $1 AND user_email = $2',
+      [businessId, userEmail]
+    );
+    return result.rows[0] || null;
+  },
+  // Never overwrite a token that another replica refreshed more recently
+  saveTokens: (businessId, userEmail, credentials) => pool.query(
+    'UPDATE google_oauth_tokens SET access_token = $1, expires_at = $2, updated_at = NOW() WHERE business_id = $3 AND user_email = $4 AND expires_at < $2',
+    [credentials.access_token, new Date(credentials.expiry_date), businessId, userEmail]
+  ),
+  refreshTokens: async (refreshToken) => {
+    const oauth2Client = new google.auth.OAuth2(googleClientId, googleClientSecret);
+    oauth2Client.setCredentials({ refresh_token: refreshToken });
+    const { credentials } = await oauth2Client.refreshAccessToken();
+    return credentials;
+  },
+  // No refresh token and no eager window: every refresh goes through the cache's single flight
+  createClient: () => {
+    const auth = new google.auth.OAuth2({
+      clientId: googleClientId,
+      clientSecret: googleClientSecret,
+      eagerRefreshThresholdMillis: 0
+    });
+    return { auth, gmail: google.gmail({ version: 'v1', auth }) };
+  }
+});
+
 /**
  * Get Gmail client for a user
  */
-async function getGmailClient(businessId, userEmail) {
-  const result = await pool.query(
-    'SELECT access_token, refresh_token, expires_at FROM google_oauth_tokens WHERE business_id = $1 AND user_email = $2',
-    [businessId, userEmail]
-  );
-  
-  if (!result.rows[0]) throw new Error('No OAuth tokens found');
-  
-  const { access_token, refresh_token, expires_at } = result.rows[0];
-  
-  // Check if token expired
-  if (new Date(expires_at) < new Date()) {
-    if (!refresh_token) throw new Error('Token expired and no refresh token');
-    
-    // Refresh token
-    const oauth2Client = new google.auth.OAuth2(
-      process.env.GOOGLE_CLIENT_ID,
-      process.env.GOOGLE_CLIENT_SECRET
-    );
-    
-    oauth2Client.setCredentials({ refresh_token });
-    const { credentials } = await oauth2Client.refreshAccessToken();
-    
-    // Update DB
-    await pool.query(
-      'UPDATE google_oauth_tokens SET access_token = $1, expires_at = $2, updated_at = NOW() WHERE business_id = $3 AND user_email = $4',
-      [credentials.access_token, new Date(credentials.expiry_date), businessId, userEmail]
-    );
-    
-    oauth2Client.setCredentials(credentials);
-    return google.gmail({ version: 'v1', auth: oauth2Client });
+function getGmailClient(businessId, userEmail) {
+  return gmailClients.get(businessId, userEmail);
+}
+
+/**
+ * Drop a cached client, e.g. after new tokens were stored for the mailbox
+ */
+export function invalidateGmailClient(businessId, userEmail) {
+  gmailClients.invalidate(businessId, userEmail);
+}
+
+export function gmailClientMetrics() {
+  return gmailClients.metrics();
+}
+
+// A 401 means the cached token was revoked; the next send reloads from the database
+async function sendWithClient(businessId, fromEmail, request) {
+  const gmail = await getGmailClient(businessId, fromEmail);
+  try {
+    return await gmail.users.messages.send(request);
+  } catch (error) {
+    if (error.code === 401 || error.response?.status === 401) invalidateGmailClient(businessId, fromEmail);
+    throw error;
   }
-  
-  // Token still valid
-  const oauth2Client = new google.auth.OAuth2();
-  oauth2Client.setCredentials({ access_token, refresh_token });
-  return google.gmail({ version: 'v1', auth: oauth2Client });
 }
 
 /**
  * Send email
  */
 export async function sendEmail({ businessId, fromEmail, to, subject, body, html }) {
-  const gmail = await getGmailClient(businessId, fromEmail);
-  
-  const emailContent = html ? 
-    [
-      'Content-Type: text/html; charset="UTF-8"\n',
-      'MIME-Version: 1.0\n',
-      `To: ${to}\n`,
-      `Subject: ${subject}\n\n`,
-      html
-    ].join('') :
-    [
-      'Content-Type: text/plain; charset="UTF-8"\n',
-      'MIME-Version: 1.0\n',
-      `To: ${to}\n`,
-      `Subject: ${subject}\n\n`,
-      body
-    ].join('');
-
-  const encoded = Buffer.from(emailContent)
-    .toString('base64')
-    .replace(/\+/g, '-')
-    .replace(/\//g, '_')
-    .replace(/=+$/, '');
-
-  const res = await gmail.users.messages.send({
+  const raw = await composeRaw({ to, subject, body, html });
+
+  const res = await sendWithClient(businessId, fromEmail, {
     userId: 'me',
-    requestBody: { raw: encoded }
+    requestBody: { raw }
   });
 
   return { messageId: res.data.id, threadId: res.data.threadId };
@@ -92,47 +101,28 @@ export async function sendEmail({ businessId, fromEmail, to, subject, body, html
 
 /**
  * Send email with attachment
+ *
+ * Each attachment is { filename, mimeType } plus one of: content (Buffer or Readable),
+ * path (file on disk) or data (base64 string). The MIME body is composed as a stream;
+ * large messages go up as message/rfc822 media so they are never held in memory.
  */
-export async function sendEmailWithAttachment({ businessId, fromEmail, to, subject, body, attachments }) {
-  const gmail = await getGmailClient(businessId, fromEmail);
-  
-  const boundary = 'boundary_chatrace_' + Date.now();
-  let email = [
-    'MIME-Version: 1.0\n',
-    `To: ${to}\n`,
-    `Subject: ${subject}\n`,
-    `Content-Type: multipart/mixed; boundary="${boundary}"\n\n`,
-    `--${boundary}\n`,
-    'Content-Type: text/plain; charset="UTF-8"\n\n',
-    body + '\n\n'
-  ].join('');
-
-  // Add attachments
-  for (const att of attachments) {
-    email += `--${boundary}\n`;
-    email += `Content-Type: ${att.mimeType}\n`;
-    email += `Content-Disposition: attachment; filename="${att.filename}"\n`;
-    email += 'Content-Transfer-Encoding: base64\n\n';
-    email += att.data + '\n\n';
-  }
-
-  email += `--${boundary}--`;
-
-  const encoded = Buffer.from(email)
-    .toString('base64')
-    .replace(/\+/g, '-')
-    .replace(/\//g, '_')
-    .replace(/=+$/, '');
-
-  const res = await gmail.users.messages.send({
-    userId: 'me',
-    requestBody: { raw: encoded }
-  });
+export async function sendEmailWithAttachment({ businessId, fromEmail, to, subject, body, attachments = [] }) {
+  const message = { to, subject, body, attachments };
+  const res = estimatedSize(message) > RAW_MAX_BYTES
+    ? await sendWithClient(businessId, fromEmail, {
+      userId: 'me',
+      requestBody: {},
+      media: { mimeType: 'message/rfc822', body: mimeStream(message) }
+    })
+    : await sendWithClient(businessId, fromEmail, {
+      userId: 'me',
+      requestBody: { raw: await composeRaw(message) }
+    });
 
   return { messageId: res.data.id, threadId: res.data.threadId };
 }
 
-export default { sendEmail, sendEmailWithAttachment };
+export default { sendEmail, sendEmailWithAttachment, invalidateGmailClient, gmailClientMetrics };
 
 
 
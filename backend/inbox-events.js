@@ -0,0 +1,112 @@
+// inbox-events.js
+// Typed inbox change events. Sync jobs, the VAPI webhook and the inbox endpoints publish here;
+// SSE streams and the conversation index subscribe. A bounded ring buffer of recent events
+// lets a reconnecting client resume from its Last-Event-ID instead of re-polling.
+
+const EVENT_BUFFER_SIZE = Number(process.env.INBOX_EVENT_BUFFER || 1000);
+
+const EVENT_TYPES = {
+  CONVERSATION_UPSERTED: 'conversation_upserted', // new thread or changed metadata/last message
+  MESSAGE_APPENDED: 'message_appended', // a message was added to a conversation
+  RESYNC: 'resync', // too much changed (or replay is impossible): refetch the list once
+  REFERENCE_CHANGED: 'reference_changed' // saved replies/custom fields/... of an account were edited
+};
+
+// Events without account_id come from shared sources (Woodstock, VAPI, Rural King) and go to
+// everyone; account-scoped events only to streams of that account
+function visibleTo(event, accountId) {
+  if (!event.account_id) return true;
+  return accountId != null && String(event.account_id) === String(accountId);
+}
+
+function formatSse(event) {
+  return `id: ${event.id}\ndata: ${JSON.stringify(event)}\n\n`;
+}
+
+class InboxEventBus {
+  constructor({ bufferSize = EVENT_BUFFER_SIZE } = {}) {
+    this.bufferSize = bufferSize;
+    this.buffer = new Array(bufferSize);
+    this.head = 0; // index of the oldest entry
+    this.size = 0;
+    // Ids are "<epoch>-<seq>": the epoch is unique per process, so an id from a restarted or
+    // different replica is recognised as foreign instead of being replayed from the wrong place
+    this.epoch = `${Date.now().toString(36)}${Math.random().toString(36).slice(2, 6)}`;
+    this.seq = 0;
+    this.listeners = new Set();
+    this.stats = { published: 0, replayed: 0, resyncs: 0 };
+  }
+
+  get lastId() {
+    return `${this.epoch}-${this.seq}`;
+  }
+
+  publish(event) {
+    const seq = ++this.seq;
+    const stamped = { ...event, id: `${this.epoch}-${seq}`, t: event.t ?? Date.now() };
+    const entry = { seq, event: stamped };
+
+    if (this.size < this.bufferSize) {
+      this.buffer[(this.head + this.size) % this.bufferSize] = entry;
+      this.size += 1;
+    } else {
+      this.buffer[this.head] = entry;
+      this.head = (this.head + 1) % this.bufferSize;
+    }
+    this.stats.published += 1;
+
+    for (const listener of this.listeners) {
+      try {
+        listener(stamped);
+      } catch (error) {
+        console.error('❌ Inbox event listener failed:', error.message);
+      }
+    }
+    return stamped;
+  }
+
+  subscribe(listener) {
+    this.listeners.add(listener);
+    return () => this.listeners.delete(listener);
+  }
+
+  // Events after lastEventId visible to accountId, oldest first; null when the id is unknown
+  // or already evicted, in which case the client has to refetch instead
+  since(lastEventId, accountId) {
+    const match = String(lastEventId).match(/^([a-z0-9]+)-(\d+)$/);
+    const after = match ? Number(match[2]) : NaN;
+    if (!match || match[1] !== this.epoch || after > this.seq) {
+      this.stats.resyncs += 1;
+      return null;
+    }
+    if (after === this.seq) return [];
+
+    const oldest = this.size ? this.buffer[this.head].seq : this.seq + 1;
+    if (after < oldest - 1) {
+      this.stats.resyncs += 1;
+      return null;
+    }
+
+    const events = [];
+    for (let i = 0; i < this.size; i++) {
+      const { seq, event } = this.buffer[(this.head + i) % this.bufferSize];
+      if (seq > after && visibleTo(event, accountId)) events.push(event);
+    }
+    this.stats.replayed += events.length;
+    return events;
+  }
+
+  metrics() {
+    return {
+      ...this.stats,
+      buffered: this.size,
+      bufferSize: this.bufferSize,
+      lastId: this.lastId,
+      listeners: this.listeners.size
+    };
+  }
+}
+
+const inboxEvents = new InboxEventBus();
+
+export { InboxEventBus, inboxEvents, EVENT_TYPES, visibleTo, formatSse };
@@ -0,0 +1,130 @@
+// mime-stream.js
+// Streaming MIME composer for outgoing Gmail messages. The message is produced chunk by chunk:
+// attachments are base64-encoded 57 bytes per 76-char line as they are read, so no full-size
+// copy of the message (or of an attachment) is ever built. base64url for the Gmail `raw` field
+// is done in one pass by Node's own encoder instead of regex replaces over the whole string.
+
+import fs from 'fs';
+import { Readable, Transform } from 'stream';
+
+const CRLF = '\r\n';
+const LINE_BYTES = 57; // 57 bytes -> one 76-char base64 line (RFC 2045)
+const ENCODE_BLOCK_BYTES = LINE_BYTES * 1024; // ~57 KB of input per emitted chunk
+
+// RFC 2047 for non-ASCII subjects and filenames
+function encodeHeaderValue(value) {
+  const text = String(value ?? '');
+  return /^[\x20-\x7e]*$/.test(text) ? text : `=?UTF-8?B?${Buffer.from(text, 'utf8').toString('base64')}?=`;
+}
+
+function wrapBase64(base64) {
+  let out = '';
+  for (let i = 0; i < base64.length; i += 76) out += base64.slice(i, i + 76) + CRLF;
+  return out;
+}
+
+// Bytes of an attachment, in chunks: Buffer, Readable, file path, or `data` already in base64
+async function* attachmentBase64Lines(att) {
+  if (typeof att.data === 'string') {
+    // Legacy callers pass base64 text; re-wrap it without decoding
+    const clean = att.data.replace(/\s+/g, '');
+    const step = 76 * 1024;
+    for (let i = 0; i < clean.length; i += step) yield wrapBase64(clean.slice(i, i + step));
+    return;
+  }
+
+  const source = Buffer.isBuffer(att.content)
+    ? [att.content]
+    : att.content || fs.createReadStream(att.path, { highWaterMark: ENCODE_BLOCK_BYTES });
+
+  let carry = Buffer.alloc(0);
+  for await (const piece of source) {
+    const chunk = carry.length ? Buffer.concat([carry, piece]) : piece;
+    const whole = chunk.length - (chunk.length % LINE_BYTES);
+    for (let i = 0; i < whole; i += ENCODE_BLOCK_BYTES) {
+      yield wrapBase64(chunk.subarray(i, Math.min(i + ENCODE_BLOCK_BYTES, whole)).toString('base64'));
+    }
+    carry = Buffer.from(chunk.subarray(whole));
+  }
+  if (carry.length) yield wrapBase64(carry.toString('base64'));
+}
+
+// -> AsyncGenerator<string> of the complete RFC 822 message
+async function* composeMime({ to, from, subject, body = '', html, attachments = [], boundary }) {
+  const headers = ['MIME-Version: 1.0', `To: ${to}`];
+  if (from) headers.push(`From: ${from}`);
+  headers.push(`Subject: ${encodeHeaderValue(subject)}`);
+  const textPart = html
+    ? `Content-Type: text/html; charset="UTF-8"${CRLF}${CRLF}${html}`
+    : `Content-Type: text/plain; charset="UTF-8"${CRLF}${CRLF}${body}`;
+
+  if (attachments.length === 0) {
+    yield headers.join(CRLF) + CRLF + textPart;
+    return;
+  }
+
+  const mark = boundary || `boundary_chatrace_${Date.now()}_${Math.random().toString(36).slice(2, 10)}`;
+  headers.push(`Content-Type: multipart/mixed; boundary="${mark}"`);
+  yield headers.join(CRLF) + CRLF + CRLF + `--${mark}${CRLF}${textPart}${CRLF}${CRLF}`;
+
+  for (const att of attachments) {
+    const filename = encodeHeaderValue(att.filename).replace(/"/g, '');
+    yield [
+      `--${mark}`,
+      `Content-Type: ${att.mimeType || 'application/octet-stream'}`,
+      `Content-Disposition: attachment; filename="${filename}"`,
+      'Content-Transfer-Encoding: base64',
+      ''
+    ].join(CRLF) + CRLF;
+    yield* attachmentBase64Lines(att);
+    yield CRLF;
+  }
+  yield `--${mark}--${CRLF}`;
+}
+
+function mimeStream(message) {
+  return Readable.from(composeMime(message));
+}
+
+// Streaming base64url: holds back at most 2 bytes between chunks so padding only ever
+// appears at the very end (and is omitted, as Gmail accepts)
+function base64UrlEncoder() {
+  let carry = Buffer.alloc(0);
+  return new Transform({
+    transform(chunk, _encoding, callback) {
+      const bytes = carry.length ? Buffer.concat([carry, chunk]) : chunk;
+      const whole = bytes.length - (bytes.length % 3);
+      carry = Buffer.from(bytes.subarray(whole));
+      callback(null, whole ? bytes.subarray(0, whole).toString('base64url') : undefined);
+    },
+    flush(callback) {
+      callback(null, carry.length ? carry.toString('base64url') : undefined);
+    }
+  });
+}
+
+// Whole message as one base64url string, for the `raw` field of small messages; the only
+// full-size copy is the encoded string itself
+async function composeRaw(message) {
+  const parts = [];
+  for await (const part of mimeStream(message).pipe(base64UrlEncoder())) parts.push(part);
+  return parts.join('');
+}
+
+// Encoded size of an attachment without reading it (base64 + CRLF per 76 chars)
+function attachmentSize(att) {
+  if (typeof att.data === 'string') return att.data.length;
+  if (Buffer.isBuffer(att.content)) return Math.ceil(att.content.length / 3) * 4 * (78 / 76);
+  if (att.size != null) return Math.ceil(att.size / 3) * 4 * (78 / 76);
+  if (att.path) return Math.ceil(fs.statSync(att.path).size / 3) * 4 * (78 / 76);
+  return Infinity; // unknown stream length: treat as large
+}
+
+// Estimated encoded size of a message for the raw/media decision: the body as base64 plus the
+// attachments, whose size above is already encoded (each byte counted as encoded once)
+function estimatedSize({ body, attachments = [] }) {
+  const bodyBytes = Buffer.byteLength(body || '');
+  return Math.ceil(bodyBytes / 3) * 4 + attachments.reduce((sum, att) => sum + attachmentSize(att), 0);
+}
+
+export { composeMime, mimeStream, composeRaw, base64UrlEncoder, attachmentSize, estimatedSize, encodeHeaderValue };
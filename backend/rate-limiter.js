@@ -0,0 +1,183 @@
+// rate-limiter.js
+// Token-bucket rate limiting per client IP and per account, with limits per route class.
+// Buckets live in a bounded LRU map (idle keys fall off the end, and an evicted bucket was
+// full anyway), or in Postgres when several replicas must share one budget.
+
+const DEFAULT_MAX_KEYS = Number(process.env.RATE_LIMIT_MAX_KEYS || 50000);
+const PG_SWEEP_INTERVAL_MS = 10 * 60 * 1000;
+
+// Per-replica buckets: key -> { tokens, updatedAt }; Map order doubles as LRU order
+class MemoryBucketStore {
+  constructor({ maxKeys = DEFAULT_MAX_KEYS } = {}) {
+    this.maxKeys = maxKeys;
+    this.buckets = new Map();
+    this.evicted = 0;
+  }
+
+  take(key, { capacity, refillPerSec }, cost = 1, now = Date.now()) {
+    const bucket = this.buckets.get(key);
+    let tokens = capacity;
+    if (bucket) {
+      tokens = Math.min(capacity, bucket.tokens + ((now - bucket.updatedAt) / 1000) * refillPerSec);
+      this.buckets.delete(key);
+    }
+    const allowed = tokens >= cost;
+    if (allowed) tokens -= cost;
+    this.buckets.set(key, { tokens, updatedAt: now });
+
+    if (this.buckets.size > this.maxKeys) {
+      this.buckets.delete(this.buckets.keys().next().value);
+      this.evicted += 1;
+    }
+    return { allowed, remaining: Math.floor(tokens), retryAfterMs: allowed ? 0 : Math.ceil(((cost - tokens) / refillPerSec) * 1000) };
+  }
+
+  metrics() {
+    return { store: 'memory', keys: this.buckets.size, maxKeys: this.maxKeys, evicted: this.evicted };
+  }
+}
+
+const RATE_LIMIT_DDL = `
+  CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+    key TEXT PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+  );
+
+  -- Refill, then spend if there is enough; one row lock per call so replicas can't double-spend
+  CREATE OR REPLACE FUNCTION rate_limit_take(p_key TEXT, p_capacity DOUBLE PRECISION, p_refill DOUBLE PRECISION, p_cost DOUBLE PRECISION)
+  RETURNS TABLE (allowed BOOLEAN, tokens DOUBLE PRECISION) AS $$
+  #variable_conflict use_column
+  DECLARE
+    v_tokens DOUBLE PRECISION;
+  BEGIN
+    INSERT INTO rate_limit_buckets AS b (key, tokens, updated_at)
+    VALUES (p_key, p_capacity, clock_timestamp())
+    ON CONFLICT (key) DO UPDATE
+      SET tokens = LEAST(p_capacity, b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * p_refill),
+          updated_at = clock_timestamp()
+    RETURNING b.tokens INTO v_tokens;
+
+    allowed := v_tokens >= p_cost;
+    IF allowed THEN
+      v_tokens := v_tokens - p_cost;
+      UPDATE rate_limit_buckets SET tokens = v_tokens WHERE key = p_key;
+    END IF;
+    tokens := v_tokens;
+    RETURN NEXT;
+  END;
+  $$ LANGUAGE plpgsql;
+`;
+
+// Shared buckets for multi-replica deployments; idle rows are swept every 10 minutes
+class PgBucketStore {
+  constructor(db) {
+    this.db = db;
+    this.ready = null;
+    this.lastSweep = Date.now();
+    this.stats = { queries: 0 };
+  }
+
+  ensureSchema() {
+    if (!this.ready) {
+      this.ready = this.db.query(RATE_LIMIT_DDL).catch((error) => {
+        this.ready = null;
+        throw error;
+      });
+    }
+    return this.ready;
+  }
+
+  async take(key, { capacity, refillPerSec }, cost = 1) {
+    await this.ensureSchema();
+    const result = await this.db.query('SELECT allowed, tokens FROM rate_limit_take($1, $2, $3, $4)', [key, capacity, refillPerSec, cost]);
+    this.stats.queries += 1;
+    this.sweep();
+    const { allowed, tokens } = result.rows[0];
+    return { allowed, remaining: Math.floor(tokens), retryAfterMs: allowed ? 0 : Math.ceil(((cost - tokens) / refillPerSec) * 1000) };
+  }
+
+  // A row idle for an hour has refilled completely, so dropping it changes nothing
+  sweep() {
+    if (Date.now() - this.lastSweep < PG_SWEEP_INTERVAL_MS) return;
+    this.lastSweep = Date.now();
+    this.db.query(`DELETE FROM rate_limit_buckets WHERE updated_at < NOW() - INTERVAL '1 hour'`)
+      .catch(error => console.error('❌ Rate limit sweep failed:', error.message));
+  }
+
+  metrics() {
+    return { store: 'postgres', ...this.stats };
+  }
+}
+
+// First x-forwarded-for hop (the client, behind Railway's proxy) without splitting the header
+function clientIp(req) {
+  const forwarded = req.headers['x-forwarded-for'];
+  if (forwarded) {
+    const value = String(forwarded);
+    const comma = value.indexOf(',');
+    return (comma === -1 ? value : value.slice(0, comma)).trim();
+  }
+  return req.socket?.remoteAddress || 'unknown';
+}
+
+class RateLimiter {
+  // classes: { name: { ip: { capacity, refillPerSec }, account: { capacity, refillPerSec } } }
+  // accountOf(req) -> the authenticated account, or null: unauthenticated requests only get the
+  // IP bucket, since an account the client merely names could be someone else's
+  constructor({ classes, store = new MemoryBucketStore(), accountOf = req => req.accountId || null }) {
+    this.classes = classes;
+    this.store = store;
+    this.accountOf = accountOf;
+    this.fallback = store instanceof MemoryBucketStore ? null : new MemoryBucketStore();
+    this.stats = { allowed: 0, limited: 0, storeErrors: 0 };
+  }
+
+  async take(key, limits) {
+    if (!this.fallback) return this.store.take(key, limits);
+    try {
+      return await this.store.take(key, limits);
+    } catch (error) {
+      // Shared store unavailable: keep limiting per replica rather than failing requests
+      this.stats.storeErrors += 1;
+      return this.fallback.take(key, limits);
+    }
+  }
+
+  // IP first: a caller already over its own limit must not drain the shared account budget
+  async check(routeClass, req) {
+    const limits = this.classes[routeClass];
+    const byIp = await this.take(`${routeClass}:ip:${clientIp(req)}`, limits.ip);
+    const account = limits.account && this.accountOf(req);
+    if (!byIp.allowed || !account) return byIp;
+    const byAccount = await this.take(`${routeClass}:acct:${account}`, limits.account);
+    return byAccount.allowed && byIp.remaining < byAccount.remaining ? byIp : byAccount;
+  }
+
+  middleware(routeClass) {
+    if (!this.classes[routeClass]) throw new Error(`Unknown rate limit class: ${routeClass}`);
+    return (req, res, next) => {
+      this.check(routeClass, req).then((result) => {
+        res.setHeader('RateLimit-Remaining', String(Math.max(0, result.remaining)));
+        if (result.allowed) {
+          this.stats.allowed += 1;
+          return next();
+        }
+        this.stats.limited += 1;
+        res.setHeader('Retry-After', String(Math.ceil(result.retryAfterMs / 1000)));
+        return res.status(429).json({ status: 'ERROR', message: 'Too many requests' });
+      }, () => next()); // never block traffic because the limiter itself broke
+    };
+  }
+
+  metrics() {
+    return { ...this.stats, ...this.store.metrics(), fallback: this.fallback ? this.fallback.metrics() : null };
+  }
+}
+
+// Bucket sized for `max` requests per `windowMs`, refilled continuously
+function perWindow(max, windowMs) {
+  return { capacity: max, refillPerSec: max / (windowMs / 1000) };
+}
+
+export { RateLimiter, MemoryBucketStore, PgBucketStore, perWindow, clientIp, RATE_LIMIT_DDL };
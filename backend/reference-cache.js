@@ -0,0 +1,150 @@
+// reference-cache.js
+// Read-through cache for ChatRace reference data (admins, teams, flows, tags, saved replies...).
+// Entries are per account and caller token, with a TTL per op; past the TTL the cached body is
+// still served for up to staleMs while one background request refreshes it. Total size is
+// bounded in bytes (LRU), and every body carries an ETag so browsers can revalidate with 304s.
+
+import crypto from 'crypto';
+
+// Freshness per ChatRace op; anything not listed uses `default`
+const DEFAULT_TTLS_MS = {
+  default: 60000,
+  tags: 60000,
+  inbox_saved_reply: 120000,
+  'custom-fields': 300000,
+  admins: 300000,
+  inbox_team: 300000,
+  flows: 300000,
+  products: 300000,
+  sequences: 300000,
+  calendars: 600000,
+  wt: 3600000
+};
+const DEFAULT_MAX_BYTES = Number(process.env.REFERENCE_CACHE_MAX_BYTES || 16 * 1024 * 1024);
+const DEFAULT_STALE_MS = Number(process.env.REFERENCE_CACHE_STALE_MS || 600000);
+
+function etagFor(body) {
+  return `W/"${crypto.createHash('sha1').update(body).digest('base64').slice(0, 27)}"`;
+}
+
+// Only successful ChatRace answers are worth keeping
+function isCacheable(body) {
+  try {
+    return JSON.parse(body)?.status === 'OK';
+  } catch {
+    return false;
+  }
+}
+
+class ReferenceCache {
+  constructor({ ttls = DEFAULT_TTLS_MS, maxBytes = DEFAULT_MAX_BYTES, staleMs = DEFAULT_STALE_MS } = {}) {
+    this.ttls = { ...DEFAULT_TTLS_MS, ...ttls };
+    this.maxBytes = maxBytes;
+    this.staleMs = staleMs;
+    this.entries = new Map(); // key -> { accountId, op, body, etag, bytes, fetchedAt }; LRU order
+    this.refreshing = new Map(); // key -> in-flight load (single-flight)
+    this.bytes = 0;
+    this.stats = { hits: 0, stale: 0, misses: 0, refreshes: 0, refreshErrors: 0, evictions: 0, invalidations: 0 };
+  }
+
+  // token is hashed into the key so one caller's answer is never served to another token
+  key(accountId, token, payload) {
+    const hash = crypto.createHash('sha1').update(String(token || '')).update('\0').update(JSON.stringify(payload)).digest('base64');
+    return `${accountId ?? ''}\u0000${payload.op}\u0000${hash}`;
+  }
+
+  // -> { body, etag, state: 'hit' | 'stale' | 'miss' | 'uncacheable' }
+  async get({ accountId, token, payload }, load) {
+    const key = this.key(accountId, token, payload);
+    const ttlMs = this.ttls[payload.op] ?? this.ttls.default;
+    const entry = this.entries.get(key);
+    const age = entry ? Date.now() - entry.fetchedAt : Infinity;
+
+    if (entry && age <= ttlMs + this.staleMs) {
+      this.touch(key, entry);
+      if (age <= ttlMs) {
+        this.stats.hits += 1;
+        return { body: entry.body, etag: entry.etag, state: 'hit' };
+      }
+      this.stats.stale += 1;
+      this.refresh(key, { accountId, op: payload.op }, load).catch(() => {});
+      return { body: entry.body, etag: entry.etag, state: 'stale' };
+    }
+
+    this.stats.misses += 1;
+    const body = await this.refresh(key, { accountId, op: payload.op }, load);
+    const cached = this.entries.get(key);
+    return cached && cached.body === body
+      ? { body, etag: cached.etag, state: 'miss' }
+      : { body, etag: etagFor(body), state: 'uncacheable' };
+  }
+
+  refresh(key, meta, load) {
+    if (this.refreshing.has(key)) return this.refreshing.get(key);
+    const promise = Promise.resolve()
+      .then(load)
+      .then((body) => {
+        this.stats.refreshes += 1;
+        // An invalidation while this was in flight removed the key from `refreshing`
+        if (this.refreshing.get(key) === promise && isCacheable(body)) this.store(key, meta, body);
+        return body;
+      }, (error) => {
+        this.stats.refreshErrors += 1;
+        throw error;
+      })
+      .finally(() => {
+        if (this.refreshing.get(key) === promise) this.refreshing.delete(key);
+      });
+    this.refreshing.set(key, promise);
+    return promise;
+  }
+
+  store(key, meta, body) {
+    this.remove(key);
+    const bytes = Buffer.byteLength(body);
+    if (bytes > this.maxBytes) return;
+    this.entries.set(key, { ...meta, body, etag: etagFor(body), bytes, fetchedAt: Date.now() });
+    this.bytes += bytes;
+    while (this.bytes > this.maxBytes) {
+      this.remove(this.entries.keys().next().value);
+      this.stats.evictions += 1;
+    }
+  }
+
+  touch(key, entry) {
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+  }
+
+  remove(key) {
+    const entry = this.entries.get(key);
+    if (!entry) return;
+    this.entries.delete(key);
+    this.bytes -= entry.bytes;
+  }
+
+  // After a write: drop the account's entries for one op (or all of them)
+  invalidate(accountId, op) {
+    this.stats.invalidations += 1;
+    const prefix = op ? `${accountId ?? ''}\u0000${op}\u0000` : `${accountId ?? ''}\u0000`;
+    for (const key of [...this.entries.keys()]) {
+      if (key.startsWith(prefix)) this.remove(key);
+    }
+    for (const key of [...this.refreshing.keys()]) {
+      if (key.startsWith(prefix)) this.refreshing.delete(key);
+    }
+  }
+
+  metrics() {
+    return { ...this.stats, entries: this.entries.size, bytes: this.bytes, maxBytes: this.maxBytes };
+  }
+}
+
+// True when the browser's If-None-Match already names this representation
+function isNotModified(req, etag) {
+  const header = req.headers['if-none-match'];
+  if (!header) return false;
+  return header.split(',').some(tag => tag.trim() === etag || tag.trim() === '*');
+}
+
+export { ReferenceCache, etagFor, isNotModified, DEFAULT_TTLS_MS };
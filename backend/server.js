@@ -1,6 +1,6 @@
 import { config } from 'dotenv';
 import express from 'express';
-import { sendEmail, sendEmailWithAttachment } from './gmail-service.js';
+import { sendEmail, sendEmailWithAttachment, invalidateGmailClient, gmailClientMetrics } from './gmail-service.js';
 import fs from 'fs';
 import path from 'path';
 import { fileURLToPath } from 'url';
@@ -11,9 +11,6 @@ const __dirname = path.dirname(__filename);
 config({ path: path.join(__dirname, '..', '.env') });
 import fetch from 'node-fetch';
 import cookieParser from 'cookie-parser';
-import pg from 'pg';
-import Busboy from 'busboy';
-import FormData from 'form-data';
 import {
   initializeAuth,
   verifyGoogleToken,
@@ -31,19 +28,34 @@ import {
   loginWithEmailPassword,
   changePassword,
   createUserWithPassword,
+  // Shared Postgres pool
+  pool,
   // User management functions
   getUserById,
   updateUser,
   updateUserStatus,
-  deleteUser
+  deleteUser,
+  authCacheMetrics
 } from './auth.js';
 
 // 🚀 UNIFIED INBOX INTEGRATION - IMPORT UNIFIED ENDPOINTS
 import { 
   getUnifiedConversations, 
   getUnifiedMessages,
-  triggerUnifiedSync 
+  triggerUnifiedSync,
+  getCustomerProfile,
+  syncVAPICallsToInbox,
+  stopUnifiedInbox
 } from './unified-inbox-endpoints.js';
+import { inboxEvents, EVENT_TYPES, formatSse } from './inbox-events.js';
+import { EventFanout } from './event-fanout.js';
+import { SseHub } from './sse-hub.js';
+import { RateLimiter, MemoryBucketStore, PgBucketStore, perWindow } from './rate-limiter.js';
+import { postUpstream, upstreamAgent, upstreamMetrics } from './upstream-client.js';
+import { ReferenceCache, isNotModified } from './reference-cache.js';
+import { proxyUpload, uploadMetrics } from './upload-proxy.js';
+import { poolStats, closePools } from './db-pool.js';
+import { WriteBatcher } from './write-batcher.js';
 
 const app = express();
 
@@ -101,32 +113,77 @@ app.use((req, res, next) => {
   next();
 });
 
-// Simple auth gate for mutating endpoints
-function requireAuth(req, res, next) {
+function requestToken(req) {
   const headerToken = req.headers['x-access-token'] || (req.headers.authorization?.toString().replace(/^Bearer\s+/i, ''));
   const cookieToken = req.cookies?.user_token;
-  const token = headerToken || cookieToken || null;
+  return headerToken || cookieToken || null;
+}
+
+const validTokens = () => [process.env.USER_TOKEN, process.env.API_TOKEN].filter(Boolean);
+
+// The server tokens belong to this deployment's business: that is the caller's account,
+// whatever x-business-id / account_id the request claims. null when not authenticated.
+function authenticatedAccount(req) {
+  const token = requestToken(req);
+  return token && validTokens().includes(token) ? (process.env.BUSINESS_ID || null) : null;
+}
+
+// Simple auth gate for mutating endpoints
+function requireAuth(req, res, next) {
+  const token = requestToken(req);
   
   if (!token) {
     return res.status(401).json({ status: 'ERROR', message: 'Missing authentication token' });
   }
   
   // Validate token against environment variables
-  const validTokens = [process.env.USER_TOKEN, process.env.API_TOKEN].filter(Boolean);
-  if (!validTokens.includes(token)) {
+  if (!validTokens().includes(token)) {
     console.log('🔐 Token validation failed:', {
       provided: token?.substring(0, 20) + '...',
-      validTokens: validTokens.map(t => t?.substring(0, 20) + '...')
+      validTokens: validTokens().map(t => t?.substring(0, 20) + '...')
     });
     return res.status(401).json({ status: 'ERROR', message: 'Invalid authentication token' });
   }
   
+  req.accountId = authenticatedAccount(req);
+  next();
+}
+
+// EventSource can't send headers: the stream also takes its token as ?access_token=
+function tokenFromQuery(req, _res, next) {
+  if (!req.headers['x-access-token'] && typeof req.query.access_token === 'string') {
+    req.headers['x-access-token'] = req.query.access_token;
+  }
   next();
 }
 
 // Basic health endpoints
 app.get('/health', (_req, res) => res.status(200).json({ ok: true }));
 app.get('/healthz', (_req, res) => res.status(200).send('ok'));
+// Postgres pool sizes, acquire waits/timeouts and last health check per pool, plus write queues,
+// rate limiter buckets, the auth lookup caches and cached Gmail clients
+app.get('/health/db', (_req, res) => res.status(200).json({
+  ok: true,
+  pools: poolStats(),
+  batchers: { vapi_calls: vapiCallBatcher.metrics() },
+  rateLimit: rateLimiter.metrics(),
+  caches: { ...authCacheMetrics(), gmailClients: gmailClientMetrics() }
+}));
+// Local event bus (replay buffer, subscribers) and cross-instance fan-out counters
+app.get('/health/events', (_req, res) => res.status(200).json({
+  ok: true,
+  bus: inboxEvents.metrics(),
+  sse: sseHub.metrics(),
+  fanout: eventFanout ? eventFanout.metrics() : null
+}));
+// ChatRace API: keep-alive sockets in use/free/queued, coalesced read calls, the reference cache
+// and upload throughput
+app.get('/health/upstream', (_req, res) => res.status(200).json({
+  ok: true,
+  ...upstreamMetrics(),
+  referenceCache: referenceCache.metrics(),
+  uploads: uploadMetrics()
+}));
 
 // ========================================
 // MULTITENANT AUTH ENDPOINTS
@@ -166,6 +223,7 @@ app.post('/api/auth/google-login', async (req, res) => {
               scope = $6,
               updated_at = NOW()
           `, [businessId, userInfo.email, accessToken, refreshToken, expiresAt, scope]);
+          invalidateGmailClient(businessId, userInfo.email);
           
           console.log(`✅ OAuth tokens saved for ${userInfo.email}`);
         } catch (err) {
@@ -638,6 +696,11 @@ function resolveAccountId(req, payload) {
   return process.env.BUSINESS_ID;
 }
 
+// Token sent upstream: explicit override, then the caller's, then the server's
+function upstreamToken(req, tokenOverride) {
+  return tokenOverride || (req && (req.headers['x-access-token'] || (req.headers.authorization?.toString().replace(/^Bearer\s+/i, '')))) || process.env.USER_TOKEN || process.env.API_TOKEN || '';
+}
+
 // Helper to call upstream API
 async function callUpstream(payload, tokenOverride, req) {
   const apiUrl = process.env.API_URL || 'https://app.aiprlassist.com/php/user';
@@ -645,45 +708,82 @@ async function callUpstream(payload, tokenOverride, req) {
   const headers = {
     'Content-Type': 'application/json',
     'User-Agent': 'mobile-app',
-    'X-ACCESS-TOKEN': tokenOverride || (req && (req.headers['x-access-token'] || (req.headers.authorization?.toString().replace(/^Bearer\s+/i, '')))) || process.env.USER_TOKEN || process.env.API_TOKEN || '',
+    'X-ACCESS-TOKEN': upstreamToken(req, tokenOverride),
   };
 
-  const response = await fetch(apiUrl, {
-    method: 'POST',
-    headers,
-    body: JSON.stringify(payload),
-  });
-  return response;
+  // Pooled keep-alive connection; identical concurrent reads share one upstream request
+  return postUpstream(apiUrl, headers, payload);
 }
 
-// SSE clients registry and broadcaster
-const sseClients = new Set();
+// Open SSE streams; every published inbox event fans out to the streams of its account
+// (or to all, for shared sources). Slow clients are queued, coalesced or evicted by the hub.
+const sseHub = new SseHub();
+inboxEvents.subscribe((event) => sseHub.broadcast(event));
+
 function broadcastEvent(event) {
-  const payload = `data: ${JSON.stringify({ ...event, t: Date.now() })}\n\n`;
-  for (const client of sseClients) {
-    try { client.write(payload); } catch (_) { /* ignore */ }
-  }
+  return inboxEvents.publish(event);
+}
+
+// ChatRace reference data (admins, teams, flows, tags, saved replies...) rarely changes: serve it
+// from a per-account cache with stale-while-revalidate. Edits publish REFERENCE_CHANGED, which
+// also reaches the other replicas through the fan-out and tells open inboxes to refetch.
+const referenceCache = new ReferenceCache();
+inboxEvents.subscribe((event) => {
+  if (event.type === EVENT_TYPES.REFERENCE_CHANGED) referenceCache.invalidate(event.account_id, event.op);
+});
+
+function referenceChanged(req, op) {
+  broadcastEvent({ type: EVENT_TYPES.REFERENCE_CHANGED, account_id: resolveAccountId(req), op });
+}
+
+// Cached GET of one reference op; answers 304 when the browser already has this body
+async function sendReference(req, res, payload) {
+  const { body, etag, state } = await referenceCache.get(
+    { accountId: payload.account_id, token: upstreamToken(req), payload },
+    async () => (await callUpstream(payload, undefined, req)).text()
+  );
+  res.setHeader('ETag', etag);
+  res.setHeader('Cache-Control', 'private, no-cache');
+  res.setHeader('X-Cache', state);
+  if (isNotModified(req, etag)) return res.status(304).end();
+  try { return res.status(200).json(JSON.parse(body)); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(body); }
+}
+
+// With more than one replica, events published here are relayed to the others over
+// LISTEN/NOTIFY and theirs are published on our bus (INBOX_FANOUT=off to disable)
+let eventFanout = null;
+if (process.env.DATABASE_URL && process.env.INBOX_FANOUT !== 'off') {
+  eventFanout = new EventFanout({
+    bus: inboxEvents,
+    pool,
+    connectionString: process.env.DATABASE_URL,
+    ssl: { rejectUnauthorized: false }
+  });
+  eventFanout.start();
 }
 
 // Simple validators
 function ensureArray(val) { return Array.isArray(val) ? val : []; }
 function isNonEmptyString(s) { return typeof s === 'string' && s.trim().length > 0; }
 
-// Very light rate limiter (per IP)
+// Token-bucket rate limits per IP and, for authenticated callers, per account, per route class.
+// RATE_LIMIT_STORE=postgres shares the buckets between replicas.
 const rateWindowMs = Number(process.env.RATE_WINDOW_MS || 60000);
 const rateMax = Number(process.env.RATE_MAX || 600);
-const ipHits = new Map();
-function rateLimit(req, res, next) {
-  try {
-    const ip = req.headers['x-forwarded-for']?.toString().split(',')[0].trim() || req.socket.remoteAddress || 'unknown';
-    const now = Date.now();
-    const rec = ipHits.get(ip) || { t: now, n: 0 };
-    if (now - rec.t > rateWindowMs) { rec.t = now; rec.n = 0; }
-    rec.n += 1; ipHits.set(ip, rec);
-    if (rec.n > rateMax) return res.status(429).json({ status: 'ERROR', message: 'Too many requests' });
-  } catch {}
-  next();
-}
+const rateSendMax = Number(process.env.RATE_SEND_MAX || rateMax); // same 600/min per IP as before unless set
+const rateAccountFactor = Number(process.env.RATE_ACCOUNT_FACTOR || 5); // an account has several agents
+const rateLimiter = new RateLimiter({
+  classes: {
+    send: { ip: perWindow(rateSendMax, rateWindowMs), account: perWindow(rateSendMax * rateAccountFactor, rateWindowMs) },
+    read: { ip: perWindow(rateMax, rateWindowMs), account: perWindow(rateMax * rateAccountFactor, rateWindowMs) }
+  },
+  store: process.env.RATE_LIMIT_STORE === 'postgres' ? new PgBucketStore(pool) : new MemoryBucketStore(),
+  // Never the caller-chosen x-business-id: anyone could drain another account's budget
+  accountOf: authenticatedAccount
+});
+const rateLimit = rateLimiter.middleware('send');
+const readRateLimit = rateLimiter.middleware('read');
+app.use('/api/inbox', (req, res, next) => (req.method === 'GET' ? readRateLimit(req, res, next) : next()));
 
 // Inbox API: Get whitelabel info for WebSocket
 app.get('/api/whitelabel', async (req, res) => {
@@ -704,13 +804,19 @@ app.get('/api/whitelabel', async (req, res) => {
     
     // Según Postman, la operación correcta es wt/get y requiere USER_TOKEN
     const tokenToUse = process.env.USER_TOKEN || process.env.API_TOKEN || '';
-    const upstream = await callUpstream({
-      op: 'wt',
-      op1: 'get'
-    }, tokenToUse, req);
+    const payload = { op: 'wt', op1: 'get' };
+    const { body, etag, state } = await referenceCache.get(
+      { accountId: null, token: tokenToUse, payload },
+      async () => (await callUpstream(payload, tokenToUse, req)).text()
+    );
 
-    const data = await upstream.json().catch(() => null);
+    let data = null;
+    try { data = JSON.parse(body); } catch {}
     if (data && data.status === 'OK') {
+      res.setHeader('ETag', etag);
+      res.setHeader('Cache-Control', 'private, no-cache');
+      res.setHeader('X-Cache', state);
+      if (isNotModified(req, etag)) return res.status(304).end();
       return res.json(data);
     }
     return res.status(500).json({ status: 'error', message: 'Failed to get whitelabel info' });
@@ -732,6 +838,9 @@ app.get('/api/inbox/conversations/:id/messages', (req, res) => {
   return getUnifiedMessages(req, res, callUpstream, resolveAccountId);
 });
 
+// Inbox API: customer_360 profile for the contact panel (?phone=, ?email= or ?conversation_id=)
+app.get('/api/inbox/customers/lookup', requireAuth, (req, res) => getCustomerProfile(req, res));
+
 // Inbox API: Dedup preview (stub)
 app.get('/api/inbox/conversations/:id/dedup-preview', async (_req, res) => {
   return res.json({ status: 'success', data: [] });
@@ -779,25 +888,34 @@ app.get('/api/inbox/conversations/:id/contact', async (req, res) => {
   }
 });
 
-// Inbox API: SSE stream (heartbeat stub)
-app.get('/api/inbox/stream', (req, res) => {
+// Inbox API: SSE stream of typed inbox events for the authenticated account.
+// Reconnects send Last-Event-ID (or ?last_event_id=) and get the missed events replayed;
+// if they fell out of the buffer the client gets one 'resync' and should refetch.
+app.get('/api/inbox/stream', tokenFromQuery, requireAuth, (req, res) => {
   res.setHeader('Content-Type', 'text/event-stream');
   res.setHeader('Cache-Control', 'no-cache');
   res.setHeader('Connection', 'keep-alive');
   res.setHeader('X-Accel-Buffering', 'no');
   if (typeof res.flushHeaders === 'function') res.flushHeaders();
 
-  res.write(`data: ${JSON.stringify({ type: 'hello', t: Date.now() })}\n\n`);
-  sseClients.add(res);
+  const accountId = req.accountId;
+  const lastEventId = req.headers['last-event-id'] || req.query.last_event_id;
 
-  const interval = setInterval(() => {
-    try { res.write(`data: ${JSON.stringify({ type: 'heartbeat', t: Date.now() })}\n\n`); } catch (_) {}
-  }, 15000);
+  // Replay and registration happen in the same tick, so nothing published in between is lost
+  const client = sseHub.add(res, { accountId });
 
-  req.on('close', () => {
-    clearInterval(interval);
-    sseClients.delete(res);
-  });
+  // hello carries the current id so a client that has seen no events yet can still resume
+  sseHub.send(client, `retry: 3000\nid: ${inboxEvents.lastId}\ndata: ${JSON.stringify({ type: 'hello', t: Date.now() })}\n\n`);
+  if (lastEventId) {
+    const missed = inboxEvents.since(lastEventId, accountId);
+    if (missed === null) {
+      sseHub.send(client, `data: ${JSON.stringify({ type: EVENT_TYPES.RESYNC, reason: 'replay_unavailable', t: Date.now() })}\n\n`);
+    } else {
+      for (const event of missed) sseHub.send(client, formatSse(event));
+    }
+  }
+
+  req.on('close', () => sseHub.remove(client));
 });
 
 // Inbox API: Send message/flow/step/products to a conversation
@@ -938,7 +1056,7 @@ app.post('/api/inbox/conversations/:id/send', rateLimit, requireAuth, async (req
       }
       // Broadcast event on success
       if (json && json.status === 'OK') {
-        broadcastEvent({ type: 'message_sent', conversation_id: conversationId, channel: ch });
+        broadcastEvent({ type: EVENT_TYPES.MESSAGE_APPENDED, direction: 'outbound', account_id: accountId, conversation_id: conversationId, channel: ch, message: typeof body.message === 'string' ? body.message.slice(0, 100) : undefined });
       }
       return res.status(200).json(json);
     } catch (parseError) {
@@ -1025,7 +1143,7 @@ app.post('/api/inbox/conversations/:id/update', rateLimit, requireAuth, async (r
     try {
       const json = JSON.parse(text);
       if (json && json.status === 'OK') {
-        broadcastEvent({ type: 'conversation_updated', conversation_id: conversationId, action, op2 });
+        broadcastEvent({ type: EVENT_TYPES.CONVERSATION_UPSERTED, account_id: accountId, conversation_id: conversationId, action, op2 });
       }
       return res.status(200).json(json);
     } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(text); }
@@ -1039,7 +1157,7 @@ const PORT = Number(process.env.PORT || 3001);
 // Initialize auth module
 initializeAuth().catch(console.error);
 
-app.listen(PORT, () => {
+const server = app.listen(PORT, () => {
   // eslint-disable-next-line no-console
   console.log(`Server listening on http://localhost:${PORT}`);
 });
@@ -1066,11 +1184,7 @@ app.post('/api/chatrace', async (req, res) => {
       'X-ACCESS-TOKEN': tokenToUse || '',
     };
 
-    const upstream = await fetch(apiUrl, {
-      method: 'POST',
-      headers,
-      body: JSON.stringify(body),
-    });
+    const upstream = await postUpstream(apiUrl, headers, body);
 
     // Stream back raw body if not JSON
     const text = await upstream.text();
@@ -1249,6 +1363,7 @@ app.post('/api/auth/google-callback', async (req, res) => {
       new Date(tokens.expiry_date),
       tokens.scope
     ]);
+    invalidateGmailClient(businessId, payload.email);
     
     res.json({ 
       status: 'success', 
@@ -1266,67 +1381,51 @@ app.post('/api/auth/google-callback', async (req, res) => {
 // Lists
 app.get('/api/inbox/admins', async (req, res) => {
   try {
-    const upstream = await callUpstream({ op: 'admins', op1: 'get', account_id: resolveAccountId(req), basic_info: true }, undefined, req);
-    const text = await upstream.text();
-    try { return res.status(200).json(JSON.parse(text)); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(text); }
+    return await sendReference(req, res, { op: 'admins', op1: 'get', account_id: resolveAccountId(req), basic_info: true });
   } catch (error) { return res.status(200).json({ status: 'error', message: error.message }); }
 });
 
 app.get('/api/inbox/teams', async (req, res) => {
   try {
-    const upstream = await callUpstream({ op: 'inbox_team', op1: 'get', account_id: resolveAccountId(req) }, undefined, req);
-    const text = await upstream.text();
-    try { return res.status(200).json(JSON.parse(text)); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(text); }
+    return await sendReference(req, res, { op: 'inbox_team', op1: 'get', account_id: resolveAccountId(req) });
   } catch (error) { return res.status(200).json({ status: 'error', message: error.message }); }
 });
 
 app.get('/api/inbox/flows', async (req, res) => {
   try {
-    const upstream = await callUpstream({ op: 'flows', op1: 'get', account_id: resolveAccountId(req) }, undefined, req);
-    const text = await upstream.text();
-    try { return res.status(200).json(JSON.parse(text)); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(text); }
+    return await sendReference(req, res, { op: 'flows', op1: 'get', account_id: resolveAccountId(req) });
   } catch (error) { return res.status(200).json({ status: 'error', message: error.message }); }
 });
 
 app.get('/api/inbox/flows/:id/steps', async (req, res) => {
   try {
     const flowID = String(req.params.id);
-    const upstream = await callUpstream({ op: 'flows', op1: 'get', account_id: resolveAccountId(req), steps: true, data: { flowID } }, undefined, req);
-    const text = await upstream.text();
-    try { return res.status(200).json(JSON.parse(text)); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(text); }
+    return await sendReference(req, res, { op: 'flows', op1: 'get', account_id: resolveAccountId(req), steps: true, data: { flowID } });
   } catch (error) { return res.status(200).json({ status: 'error', message: error.message }); }
 });
 
 app.get('/api/inbox/products', async (req, res) => {
   try {
-    const upstream = await callUpstream({ op: 'products', op1: 'get', account_id: resolveAccountId(req) }, undefined, req);
-    const text = await upstream.text();
-    try { return res.status(200).json(JSON.parse(text)); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(text); }
+    return await sendReference(req, res, { op: 'products', op1: 'get', account_id: resolveAccountId(req) });
   } catch (error) { return res.status(200).json({ status: 'error', message: error.message }); }
 });
 
 app.get('/api/inbox/tags', async (req, res) => {
   try {
-    const upstream = await callUpstream({ op: 'tags', op1: 'get', account_id: resolveAccountId(req) }, undefined, req);
-    const text = await upstream.text();
-    try { return res.status(200).json(JSON.parse(text)); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(text); }
+    return await sendReference(req, res, { op: 'tags', op1: 'get', account_id: resolveAccountId(req) });
   } catch (error) { return res.status(200).json({ status: 'error', message: error.message }); }
 });
 
 app.get('/api/inbox/sequences', async (req, res) => {
   try {
-    const upstream = await callUpstream({ op: 'sequences', op1: 'get', account_id: resolveAccountId(req) }, undefined, req);
-    const text = await upstream.text();
-    try { return res.status(200).json(JSON.parse(text)); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(text); }
+    return await sendReference(req, res, { op: 'sequences', op1: 'get', account_id: resolveAccountId(req) });
   } catch (error) { return res.status(200).json({ status: 'error', message: error.message }); }
 });
 
 // Custom fields (account-level)
 app.get('/api/inbox/custom-fields', async (req, res) => {
   try {
-    const upstream = await callUpstream({ op: 'custom-fields', op1: 'get', account_id: resolveAccountId(req) }, undefined, req);
-    const text = await upstream.text();
-    try { return res.status(200).json(JSON.parse(text)); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(text); }
+    return await sendReference(req, res, { op: 'custom-fields', op1: 'get', account_id: resolveAccountId(req) });
   } catch (error) { return res.status(200).json({ status: 'error', message: error.message }); }
 });
 
@@ -1335,6 +1434,7 @@ app.post('/api/inbox/custom-fields', async (req, res) => {
     const { name, type } = req.body || {};
     const upstream = await callUpstream({ op: 'custom-fields', op1: 'add', account_id: resolveAccountId(req), name, type }, undefined, req);
     const text = await upstream.text();
+    referenceChanged(req, 'custom-fields');
     try { return res.status(200).json(JSON.parse(text)); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(text); }
   } catch (error) { return res.status(200).json({ status: 'error', message: error.message }); }
 });
@@ -1342,9 +1442,7 @@ app.post('/api/inbox/custom-fields', async (req, res) => {
 // Saved replies
 app.get('/api/inbox/saved-replies', async (req, res) => {
   try {
-    const upstream = await callUpstream({ op: 'inbox_saved_reply', op1: 'get', account_id: resolveAccountId(req) }, undefined, req);
-    const text = await upstream.text();
-    try { return res.status(200).json(JSON.parse(text)); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(text); }
+    return await sendReference(req, res, { op: 'inbox_saved_reply', op1: 'get', account_id: resolveAccountId(req) });
   } catch (error) { return res.status(200).json({ status: 'error', message: error.message }); }
 });
 
@@ -1353,6 +1451,7 @@ app.post('/api/inbox/saved-replies', async (req, res) => {
     const { shortcode, value } = req.body || {};
     const upstream = await callUpstream({ op: 'inbox_saved_reply', op1: 'add', account_id: resolveAccountId(req), data: { shortcode, value } }, undefined, req);
     const text = await upstream.text();
+    referenceChanged(req, 'inbox_saved_reply');
     try { return res.status(200).json(JSON.parse(text)); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(text); }
   } catch (error) { return res.status(200).json({ status: 'error', message: error.message }); }
 });
@@ -1363,6 +1462,7 @@ app.put('/api/inbox/saved-replies/:id', async (req, res) => {
     const { shortcode, value } = req.body || {};
     const upstream = await callUpstream({ op: 'inbox_saved_reply', op1: 'update', account_id: resolveAccountId(req), data: { id, shortcode, value } }, undefined, req);
     const text = await upstream.text();
+    referenceChanged(req, 'inbox_saved_reply');
     try { return res.status(200).json(JSON.parse(text)); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(text); }
   } catch (error) { return res.status(200).json({ status: 'error', message: error.message }); }
 });
@@ -1372,6 +1472,7 @@ app.delete('/api/inbox/saved-replies/:id', async (req, res) => {
     const id = req.params.id;
     const upstream = await callUpstream({ op: 'inbox_saved_reply', op1: 'delete', account_id: resolveAccountId(req), id }, undefined, req);
     const text = await upstream.text();
+    referenceChanged(req, 'inbox_saved_reply');
     try { return res.status(200).json(JSON.parse(text)); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(text); }
   } catch (error) { return res.status(200).json({ status: 'error', message: error.message }); }
 });
@@ -1388,7 +1489,7 @@ app.post('/api/inbox/conversations/:id/notes', rateLimit, requireAuth, async (re
     const responseText = await upstream.text();
     try {
       const json = JSON.parse(responseText);
-      if (json && json.status === 'OK') broadcastEvent({ type: 'note_added', conversation_id: contact_id });
+      if (json && json.status === 'OK') broadcastEvent({ type: 'note_added', account_id: resolveAccountId(req), conversation_id: contact_id });
       return res.status(200).json(json);
     } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(responseText); }
   } catch (error) { return res.status(200).json({ status: 'error', message: error.message }); }
@@ -1404,7 +1505,7 @@ app.put('/api/inbox/conversations/:id/notes/:noteId', rateLimit, requireAuth, as
     }
     const upstream = await callUpstream({ op: 'conversations', op1: 'notes', op2: 'update', account_id: resolveAccountId(req), contact_id, id: noteId, data: { text } }, undefined, req);
     const responseText = await upstream.text();
-    try { const json = JSON.parse(responseText); if (json && json.status === 'OK') broadcastEvent({ type: 'note_updated', conversation_id: contact_id, note_id: noteId }); return res.status(200).json(json); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(responseText); }
+    try { const json = JSON.parse(responseText); if (json && json.status === 'OK') broadcastEvent({ type: 'note_updated', account_id: resolveAccountId(req), conversation_id: contact_id, note_id: noteId }); return res.status(200).json(json); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(responseText); }
   } catch (error) { return res.status(200).json({ status: 'error', message: error.message }); }
 });
 
@@ -1414,7 +1515,7 @@ app.delete('/api/inbox/conversations/:id/notes/:noteId', rateLimit, requireAuth,
     const noteId = String(req.params.noteId);
     const upstream = await callUpstream({ op: 'conversations', op1: 'notes', op2: 'delete', account_id: resolveAccountId(req), contact_id, id: noteId }, undefined, req);
     const responseText = await upstream.text();
-    try { const json = JSON.parse(responseText); if (json && json.status === 'OK') broadcastEvent({ type: 'note_deleted', conversation_id: contact_id, note_id: noteId }); return res.status(200).json(json); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(responseText); }
+    try { const json = JSON.parse(responseText); if (json && json.status === 'OK') broadcastEvent({ type: 'note_deleted', account_id: resolveAccountId(req), conversation_id: contact_id, note_id: noteId }); return res.status(200).json(json); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(responseText); }
   } catch (error) { return res.status(200).json({ status: 'error', message: error.message }); }
 });
 
@@ -1452,9 +1553,7 @@ app.post('/api/inbox/users/:ms_id/tags/remove', rateLimit, requireAuth, async (r
 // Calendars & Appointments
 app.get('/api/inbox/calendars', async (req, res) => {
   try {
-    const upstream = await callUpstream({ op: 'calendars', op1: 'get', account_id: resolveAccountId(req) }, undefined, req);
-    const text = await upstream.text();
-    try { return res.status(200).json(JSON.parse(text)); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(text); }
+    return await sendReference(req, res, { op: 'calendars', op1: 'get', account_id: resolveAccountId(req) });
   } catch (error) { return res.status(200).json({ status: 'error', message: error.message }); }
 });
 
@@ -1562,48 +1661,25 @@ app.get('/api/session/account', async (req, res) => {
 });
 
 // Upload file (multipart)
-app.post('/api/inbox/upload', rateLimit, requireAuth, (req, res) => {
-  try {
-    const bb = new Busboy({ headers: req.headers });
-    let jsonParam = null;
-    let fileBuffer = null;
-    let fileName = 'upload.bin';
+// Streamed straight through to ChatRace (never buffered); UPLOAD_MAX_BYTES caps the file size
+app.post('/api/inbox/upload', rateLimit, requireAuth, async (req, res) => {
+  const apiUrl = process.env.API_URL;
+  if (!apiUrl) return res.status(500).json({ status: 'error', message: 'Missing API_URL' });
+  const tokenToUse = req.headers['x-access-token'] || process.env.USER_TOKEN || process.env.API_TOKEN || '';
 
-    bb.on('field', (name, val) => {
-      if (name === 'param') jsonParam = val;
-    });
-
-    bb.on('file', (_name, file, filename) => {
-      fileName = filename || fileName;
-      const chunks = [];
-      file.on('data', d => chunks.push(d));
-      file.on('end', () => { fileBuffer = Buffer.concat(chunks); });
-    });
-
-    bb.on('finish', async () => {
-      try {
-        const apiUrl = process.env.API_URL;
-        if (!apiUrl) return res.status(500).json({ status: 'error', message: 'Missing API_URL' });
-        const tokenToUse = req.headers['x-access-token'] || process.env.USER_TOKEN || process.env.API_TOKEN || '';
-
-        const form = new FormData();
-        if (jsonParam) form.append('param', jsonParam);
-        if (fileBuffer) form.append('file', fileBuffer, { filename: fileName });
-
-        const upstream = await fetch(apiUrl, {
-          method: 'POST',
-          headers: { 'X-ACCESS-TOKEN': tokenToUse, 'User-Agent': 'mobile-app', ...form.getHeaders() },
-          body: form,
-        });
-        const text = await upstream.text();
-        try { return res.status(200).json(JSON.parse(text)); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(text); }
-      } catch (e) {
-        return res.status(200).json({ status: 'error', message: e.message });
-      }
+  try {
+    const { text } = await proxyUpload(req, {
+      url: apiUrl,
+      headers: { 'X-ACCESS-TOKEN': tokenToUse, 'User-Agent': 'mobile-app' },
+      agent: upstreamAgent
     });
-
-    req.pipe(bb);
+    try { return res.status(200).json(JSON.parse(text)); } catch { res.setHeader('Content-Type','text/plain'); return res.status(200).send(text); }
   } catch (error) {
+    if (error.statusCode) {
+      // Don't wait for the rest of a body we are refusing
+      res.setHeader('Connection', 'close');
+      return res.status(error.statusCode).json({ status: 'error', message: error.message });
+    }
     return res.status(200).json({ status: 'error', message: error.message });
   }
 });
@@ -1623,51 +1699,108 @@ app.post('/api/inbox/sync', requireAuth, (req, res) => {
   return triggerUnifiedSync(req, res);
 });
 
-// Helper function to store VAPI calls
-async function storeVAPICall(callData) {
-  const db = new pg.Client({
-    connectionString: process.env.DATABASE_URL
-  });
+// VAPI call writes: webhooks enqueue and ack immediately; the batcher upserts through the
+// shared pool every VAPI_BATCH_SIZE calls or VAPI_BATCH_DELAY_MS, whichever comes first
+async function storeVAPICalls(calls) {
+  // One row per call_id per statement (ON CONFLICT can't touch a row twice); last event wins
+  const byId = new Map(calls.map(call => [call.call_id, call]));
+  const rows = [...byId.values()];
+  
+  // RETURNING the stored rows: the upsert keeps the first call_started_at, and the inbox must be
+  // keyed on that (not on this event's) or the periodic sync would write duplicate messages
+  const stored = await pool.query(`
+    INSERT INTO vapi_calls (
+      call_id, customer_phone, customer_name, transcript, summary,
+      call_started_at, call_ended_at, recording_url, created_at, synced_to_chatrace
+    )
+    SELECT c.*, false
+    FROM unnest(
+      $1::text[], $2::text[], $3::text[], $4::text[], $5::text[],
+      $6::timestamp[], $7::timestamp[], $8::text[], $9::timestamp[]
+    ) AS c(call_id, customer_phone, customer_name, transcript, summary,
+           call_started_at, call_ended_at, recording_url, created_at)
+    ON CONFLICT (call_id) DO UPDATE SET
+      transcript = EXCLUDED.transcript,
+      summary = EXCLUDED.summary,
+      call_ended_at = EXCLUDED.call_ended_at,
+      recording_url = EXCLUDED.recording_url
+    RETURNING call_id, customer_phone, customer_name, transcript, summary,
+              call_started_at, call_ended_at, recording_url, created_at
+  `, [
+    rows.map(r => r.call_id),
+    rows.map(r => r.customer_phone),
+    rows.map(r => r.customer_name),
+    rows.map(r => r.transcript),
+    rows.map(r => r.summary),
+    rows.map(r => r.call_started_at),
+    rows.map(r => r.call_ended_at),
+    rows.map(r => r.recording_url),
+    rows.map(r => r.created_at)
+  ]);
+  console.log(`✅ Stored ${rows.length} VAPI call(s) (${calls.length} events)`);
   
+  // Push the calls into the unified inbox now (publishing their events) instead of waiting for
+  // the next periodic sync; a failure here only delays them until that sync
   try {
-    await db.connect();
-    
-    const query = `
-      INSERT INTO vapi_calls (
-        call_id, customer_phone, customer_name, transcript, summary,
-        call_started_at, call_ended_at, recording_url, created_at, synced_to_chatrace
-      ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-      ON CONFLICT (call_id) DO UPDATE SET
-        transcript = EXCLUDED.transcript,
-        summary = EXCLUDED.summary,
-        call_ended_at = EXCLUDED.call_ended_at,
-        recording_url = EXCLUDED.recording_url
-    `;
-    
-    const values = [
-      callData.call_id,
-      callData.customer_phone,
-      callData.customer_name,
-      callData.transcript,
-      callData.summary,
-      callData.call_started_at,
-      callData.call_ended_at,
-      callData.recording_url,
-      callData.created_at,
-      false // synced_to_chatrace
-    ];
-    
-    await db.query(query, values);
-    console.log(`✅ VAPI call ${callData.call_id} stored successfully`);
-    
+    await syncVAPICallsToInbox(stored.rows);
+  } catch (error) {
+    console.error('❌ Unified inbox update for VAPI calls failed:', error.message);
+  }
+}
+
+const vapiCallBatcher = new WriteBatcher({
+  name: 'VAPI calls',
+  flush: storeVAPICalls,
+  // A call that keeps failing on its own is logged whole so it can be replayed into vapi_calls
+  onDrop: (call, reason) => {
+    console.error(`❌ Dropped VAPI call ${call.call_id} (${reason}) - payload for replay:`, JSON.stringify(call));
+  },
+  maxBatch: Number(process.env.VAPI_BATCH_SIZE || 50),
+  maxDelayMs: Number(process.env.VAPI_BATCH_DELAY_MS || 250)
+});
+
+// Helper function to store VAPI calls
+function storeVAPICall(callData) {
+  vapiCallBatcher.add(callData);
+}
+
+// Graceful shutdown: stop taking requests and let in-flight ones finish, flush queued webhook
+// writes (which may still publish events), then close the LISTEN clients and the pools so the
+// process exits on its own. SHUTDOWN_TIMEOUT_MS is only a backstop for a step that hangs.
+let shuttingDown = false;
+async function shutdown(signal) {
+  if (shuttingDown) return;
+  shuttingDown = true;
+  console.log(`🛑 ${signal} - shutting down...`);
+  setTimeout(() => {
+    console.error('❌ Shutdown timed out - exiting');
+    process.exit(1);
+  }, Number(process.env.SHUTDOWN_TIMEOUT_MS || 30000)).unref();
+
+  try {
+    const closed = new Promise(resolve => server.close(resolve));
+    server.closeIdleConnections?.();
+    // Open SSE streams would keep server.close() waiting forever
+    sseHub.closeAll();
+    await closed;
+    console.log('✅ HTTP server closed');
+
+    await vapiCallBatcher.drain();
+    console.log('✅ VAPI call queue drained');
+
+    await stopUnifiedInbox();
+    await eventFanout?.stop();
+    await closePools();
+    console.log('✅ Database pools closed');
   } catch (error) {
-    console.error('❌ Error storing VAPI call:', error);
-    throw error;
-  } finally {
-    await db.end();
+    console.error('❌ Shutdown step failed:', error.message);
+    process.exitCode = 1;
   }
 }
 
+process.once('SIGTERM', () => shutdown('SIGTERM'));
+process.once('SIGINT', () => shutdown('SIGINT'));
+
 // VAPI Webhook endpoint - receives call events
 app.post('/webhook/vapi', async (req, res) => {
   console.log('🔔 VAPI Webhook received:', JSON.stringify(req.body, null, 2));
@@ -1700,9 +1833,9 @@ app.post('/webhook/vapi', async (req, res) => {
       if (call.summary) {
         console.log('📋 Summary:', call.summary);
       }
-      // Store call data for unified inbox
+      // Queue call data for unified inbox (written in the next batch, not on this request)
       try {
-        await storeVAPICall({
+        storeVAPICall({
           call_id: call.id,
           customer_phone: call.customer?.number || '',
           customer_name: call.customer?.name || '',
@@ -1714,9 +1847,9 @@ app.post('/webhook/vapi', async (req, res) => {
           created_at: new Date()
         });
         
-        console.log(`✅ Stored VAPI call ${call.id} for unified inbox`);
+        console.log(`✅ Queued VAPI call ${call.id} for unified inbox`);
       } catch (error) {
-        console.error('❌ Error storing VAPI call:', error);
+        console.error('❌ Error queueing VAPI call:', error);
       }
       break;
     case 'transcript':
@@ -0,0 +1,160 @@
+// sse-hub.js
+// Registry of open SSE streams with backpressure. Writes go straight to the socket while it
+// keeps up; once res.write() returns false the client is paused and further events wait in a
+// bounded per-client queue until 'drain'. A client whose queue overflows gets its backlog
+// replaced by a single resync (it refetches once instead of replaying everything), and a client
+// that stays stalled is disconnected. One shared timer sends heartbeats and does the eviction.
+
+import { visibleTo, formatSse, EVENT_TYPES } from './inbox-events.js';
+
+const HEARTBEAT_MS = Number(process.env.SSE_HEARTBEAT_MS || 15000);
+const MAX_QUEUE_BYTES = Number(process.env.SSE_MAX_QUEUE_BYTES || 256 * 1024);
+const EVICT_AFTER_MS = Number(process.env.SSE_EVICT_AFTER_MS || 60000);
+
+class SseHub {
+  constructor({ heartbeatMs = HEARTBEAT_MS, maxQueueBytes = MAX_QUEUE_BYTES, evictAfterMs = EVICT_AFTER_MS } = {}) {
+    this.heartbeatMs = heartbeatMs;
+    this.maxQueueBytes = maxQueueBytes;
+    this.evictAfterMs = evictAfterMs;
+    this.clients = new Set();
+    this.timer = null;
+    this.stats = { connected: 0, sent: 0, queued: 0, coalesced: 0, dropped: 0, evicted: 0 };
+  }
+
+  // Register a response; returns the client handle used by send()/remove()
+  add(res, { accountId } = {}) {
+    const client = {
+      res,
+      accountId,
+      queue: [], // payloads waiting for 'drain'
+      queuedBytes: 0,
+      pausedAt: null, // set while the socket buffer is full
+      coalesced: false, // backlog already collapsed into a resync
+      onDrain: null
+    };
+    client.onDrain = () => this.drain(client);
+    res.on('drain', client.onDrain);
+    this.clients.add(client);
+    this.stats.connected += 1;
+    this.startTimer();
+    return client;
+  }
+
+  remove(client) {
+    if (!this.clients.delete(client)) return;
+    client.res.off?.('drain', client.onDrain);
+    client.queue = [];
+    client.queuedBytes = 0;
+    if (this.clients.size === 0) this.stopTimer();
+  }
+
+  broadcast(event) {
+    let payload = null; // formatted once, only if someone can see it
+    for (const client of this.clients) {
+      if (!visibleTo(event, client.accountId)) continue;
+      payload = payload || formatSse(event);
+      this.send(client, payload);
+    }
+  }
+
+  send(client, payload) {
+    if (client.pausedAt === null) {
+      this.write(client, payload);
+      return;
+    }
+    if (client.coalesced) {
+      // The pending resync already covers this event
+      this.stats.dropped += 1;
+      return;
+    }
+    client.queue.push(payload);
+    client.queuedBytes += Buffer.byteLength(payload);
+    this.stats.queued += 1;
+
+    if (client.queuedBytes > this.maxQueueBytes) {
+      this.stats.dropped += client.queue.length;
+      this.stats.coalesced += 1;
+      const resync = `data: ${JSON.stringify({ type: EVENT_TYPES.RESYNC, reason: 'slow_client', t: Date.now() })}\n\n`;
+      client.queue = [resync];
+      client.queuedBytes = Buffer.byteLength(resync);
+      client.coalesced = true;
+    }
+  }
+
+  write(client, payload) {
+    let ok;
+    try {
+      ok = client.res.write(payload);
+    } catch (_) {
+      this.remove(client);
+      return false;
+    }
+    this.stats.sent += 1;
+    if (!ok && client.pausedAt === null) client.pausedAt = Date.now();
+    return ok;
+  }
+
+  // Socket buffer emptied: flush the queue until it fills up again
+  drain(client) {
+    if (!this.clients.has(client)) return;
+    client.pausedAt = null;
+    while (client.queue.length > 0) {
+      const payload = client.queue.shift();
+      client.queuedBytes -= Buffer.byteLength(payload);
+      if (!this.write(client, payload)) return;
+    }
+    client.coalesced = false;
+  }
+
+  // Shared heartbeat: keeps proxies from closing idle streams and disconnects stalled clients
+  tick(now = Date.now()) {
+    const heartbeat = `data: ${JSON.stringify({ type: 'heartbeat', t: now })}\n\n`;
+    for (const client of this.clients) {
+      if (client.pausedAt !== null) {
+        if (now - client.pausedAt >= this.evictAfterMs) this.evict(client);
+        continue;
+      }
+      this.write(client, heartbeat);
+    }
+  }
+
+  evict(client) {
+    this.stats.evicted += 1;
+    this.remove(client);
+    // destroy() rather than end(): end() would wait behind the same full buffer
+    try { client.res.destroy(); } catch (_) { /* already gone */ }
+  }
+
+  // Shutdown: end every open stream so server.close() can finish; browsers reconnect elsewhere
+  closeAll() {
+    for (const client of [...this.clients]) {
+      this.remove(client);
+      try { client.res.end(); } catch (_) { /* already gone */ }
+    }
+  }
+
+  startTimer() {
+    if (this.timer) return;
+    this.timer = setInterval(() => this.tick(), this.heartbeatMs);
+    this.timer.unref?.();
+  }
+
+  stopTimer() {
+    clearInterval(this.timer);
+    this.timer = null;
+  }
+
+  metrics() {
+    let bufferedBytes = 0;
+    let queuedBytes = 0;
+    let paused = 0;
+    for (const client of this.clients) {
+      bufferedBytes += client.res.writableLength || 0;
+      queuedBytes += client.queuedBytes;
+      if (client.pausedAt !== null) paused += 1;
+    }
+    return { ...this.stats, clients: this.clients.size, paused, bufferedBytes, queuedBytes };
+  }
+}
+
+export { SseHub };
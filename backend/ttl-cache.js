@@ -0,0 +1,97 @@
+// ttl-cache.js
+// Small in-process LRU with per-entry TTL and single-flight loads, for hot lookups whose
+// writes all go through this process (or can tolerate ttlMs of staleness on other replicas).
+
+class TtlCache {
+  constructor({ name, ttlMs = 30000, maxEntries = 1000 } = {}) {
+    this.name = name;
+    this.ttlMs = ttlMs;
+    this.maxEntries = maxEntries;
+    this.entries = new Map(); // key -> { value, expiresAt }; Map order doubles as LRU order
+    this.pending = new Map(); // key -> in-flight load
+    this.generation = 0; // bumped on invalidation so in-flight loads don't store stale rows
+    this.stats = { hits: 0, misses: 0, loads: 0, invalidations: 0 };
+  }
+
+  get(key) {
+    const entry = this.entries.get(key);
+    if (!entry) return undefined;
+    if (entry.expiresAt <= Date.now()) {
+      this.entries.delete(key);
+      return undefined;
+    }
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+    return entry.value;
+  }
+
+  set(key, value) {
+    this.entries.delete(key);
+    this.entries.set(key, { value, expiresAt: Date.now() + this.ttlMs });
+    while (this.entries.size > this.maxEntries) {
+      this.entries.delete(this.entries.keys().next().value);
+    }
+  }
+
+  // Cached value (null included) or loader() once for all concurrent callers; a loader that
+  // throws caches nothing
+  async getOrLoad(key, loader) {
+    const cached = this.get(key);
+    if (cached !== undefined) {
+      this.stats.hits += 1;
+      return cached;
+    }
+    this.stats.misses += 1;
+    if (this.pending.has(key)) return this.pending.get(key);
+
+    const generation = this.generation;
+    const promise = Promise.resolve()
+      .then(loader)
+      .then((value) => {
+        this.stats.loads += 1;
+        if (generation === this.generation) this.set(key, value);
+        return value;
+      })
+      .finally(() => {
+        if (this.pending.get(key) === promise) this.pending.delete(key);
+      });
+    this.pending.set(key, promise);
+    return promise;
+  }
+
+  delete(key) {
+    this.generation += 1;
+    this.stats.invalidations += 1;
+    this.entries.delete(key);
+    this.pending.delete(key);
+  }
+
+  deleteWhere(predicate) {
+    this.generation += 1;
+    this.stats.invalidations += 1;
+    for (const key of this.entries.keys()) {
+      if (predicate(key)) this.entries.delete(key);
+    }
+    for (const key of this.pending.keys()) {
+      if (predicate(key)) this.pending.delete(key);
+    }
+  }
+
+  clear() {
+    this.generation += 1;
+    this.stats.invalidations += 1;
+    this.entries.clear();
+    this.pending.clear();
+  }
+
+  metrics() {
+    const lookups = this.stats.hits + this.stats.misses;
+    return {
+      ...this.stats,
+      entries: this.entries.size,
+      hitRate: lookups ? +(this.stats.hits / lookups).toFixed(3) : 0
+    };
+  }
+}
+
+export { TtlCache };
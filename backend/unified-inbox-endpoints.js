@@ -2,8 +2,14 @@
 // Enhanced endpoints that support both ChatRace + external sources
 
 import { DatabaseBridgeIntegration } from './database-bridge-integration.js';
+import { conversationIndex, toEpochMs, byRecency } from './conversation-index.js';
+import { encodeCursor, decodeCursor, mergeKeyset, stripKeyset } from './conversation-cursor.js';
+import { CustomerLookup, phoneFromConversationId } from './customer-360.js';
+import { inboxEvents } from './inbox-events.js';
 
 let dbBridge = null;
+let customerLookup = null;
+let syncTimer = null;
 
 // Initialize database bridge
 async function initializeUnifiedInbox() {
@@ -34,10 +40,11 @@ async function initializeUnifiedInbox() {
       }
       
       // Start periodic sync (every 5 minutes)
-      setInterval(async () => {
+      syncTimer = setInterval(async () => {
         try {
           console.log('🔄 Running periodic sync...');
           await dbBridge.runSync();
+          conversationIndex.invalidate();
           console.log('✅ Periodic sync completed');
         } catch (error) {
           console.error('❌ Periodic sync failed:', error);
@@ -54,6 +61,227 @@ async function initializeUnifiedInbox() {
   }
 }
 
+// ChatRace channel ids per platform filter
+const CHATRACE_CHANNELS = {
+  webchat: '9',
+  facebook: '0', 
+  instagram: '10'
+};
+
+function includesChatrace(platform) {
+  return platform === 'all' || ['webchat', 'facebook', 'instagram'].includes(platform);
+}
+
+function includesUnifiedDb(platform) {
+  return platform === 'all' || ['woodstock', 'vapi', 'vapi_rural', 'rural_king', 'sms', 'calls'].includes(platform);
+}
+
+// Source filter for the unified table (null = every source)
+function dbPlatformFor(platform) {
+  if (platform === 'all') return null;
+  // Map special filters to vapi_rural for Rural King data
+  if (platform === 'rural_king' || platform === 'sms' || platform === 'calls') {
+    return 'vapi_rural'; // All these filters show Rural King data
+  }
+  return platform;
+}
+
+function mapChatraceConversation(row, idx, platform, filterChannel) {
+  const conversationId = String(row.ms_id || row.id || idx + 1);
+  const displayName = String(row.full_name || `Guest ${idx + 1}`);
+  const avatarUrl = row.profile_pic || '';
+  return {
+    conversation_id: conversationId,
+    display_name: displayName,
+    username: displayName,
+    user_identifier: conversationId,
+    avatar_url: avatarUrl,
+    last_message_at: row.timestamp || null,
+    last_message_ts: toEpochMs(row.timestamp),
+    last_message_content: row.last_msg || '',
+    _platform: platform.charAt(0).toUpperCase() + platform.slice(1),
+    hash: '',
+    channel: row.channel || filterChannel || '9',
+    source: 'chatrace'
+  };
+}
+
+// Fetch every source, merge and sort. Only runs when the conversation index is cold or stale.
+// A source that fails marks the result partial so the index rebuilds it soon instead of
+// serving the incomplete list for the full TTL.
+async function loadMergedConversations(req, callUpstream, resolvedAccountId, platform) {
+  console.log(`[UNIFIED CONVERSATIONS] Rebuilding index for platform: ${platform}`);
+  
+  let allConversations = [];
+  let partial = false;
+  
+  // 1. Get ChatRace conversations (existing logic)
+  if (includesChatrace(platform)) {
+    try {
+      const filterChannel = CHATRACE_CHANNELS[platform] || null;
+      
+      // Get ALL ChatRace conversations for proper unified sorting
+      const upstream = await callUpstream({
+        op: 'conversations',
+        op1: 'get',
+        account_id: resolvedAccountId,
+        offset: 0,
+        limit: 200, // Get more conversations for proper sorting
+      }, undefined, req);
+      
+      const chatraceData = await upstream.json().catch(() => null);
+      
+      if (chatraceData && chatraceData.status === 'OK' && Array.isArray(chatraceData.data)) {
+        const chatraceConversations = chatraceData.data
+          .filter(row => (filterChannel ? String(row.channel) === filterChannel : true))
+          .map((row, idx) => mapChatraceConversation(row, idx, platform, filterChannel));
+        
+        allConversations.push(...chatraceConversations);
+      } else {
+        partial = true;
+      }
+    } catch (error) {
+      partial = true;
+      console.error('❌ Error fetching ChatRace conversations:', error);
+    }
+  }
+  
+  // 2. Get unified conversations (Woodstock + VAPI + Rural King)  
+  if (includesUnifiedDb(platform)) {
+    try {
+      // Get ALL unified conversations for proper unified sorting  
+      const unifiedConversations = await dbBridge.getUnifiedConversations(
+        dbPlatformFor(platform),
+        200, // Get more conversations for proper sorting
+        0    // Start from beginning for unified sorting
+      );
+      
+      // Add source indicator (display_name already includes icon from database bridge)
+      const enhancedUnified = unifiedConversations.map(convo => ({
+        ...convo,
+        source: convo.source, // Keep original source
+        // Display name already has icon from database bridge
+      }));
+      
+      allConversations.push(...enhancedUnified);
+    } catch (error) {
+      partial = true;
+      console.error('❌ Error fetching unified conversations:', error);
+    }
+  }
+  
+  // 3. Sort all conversations by TRUE TIMESTAMP ORDER - most recent first.
+  // Every row already carries last_message_ts (epoch ms), so ChatRace unix-ms strings and
+  // Woodstock/VAPI timestamps compare as plain numbers.
+  allConversations.sort(byRecency);
+  
+  console.log(`📊 Total conversations indexed: ${allConversations.length}${partial ? ' (partial)' : ''}`);
+  
+  return { rows: allConversations, partial };
+}
+
+// ChatRace pages are capped upstream; channel filters may need a few pages to fill one of ours
+const CHATRACE_PAGE_SIZE = 200;
+const CHATRACE_MAX_SCAN_PAGES = 5;
+
+// Read `limit` matching ChatRace rows starting at raw upstream offset `from`
+async function readChatraceStream(req, callUpstream, resolvedAccountId, platform, from, limit) {
+  const filterChannel = CHATRACE_CHANNELS[platform] || null;
+  const rows = [];
+  let scanned = from;
+  let exhausted = false;
+
+  try {
+    for (let pageNo = 0; pageNo < CHATRACE_MAX_SCAN_PAGES && rows.length < limit; pageNo++) {
+      const pageSize = filterChannel ? CHATRACE_PAGE_SIZE : Math.min(CHATRACE_PAGE_SIZE, limit - rows.length);
+      const upstream = await callUpstream({
+        op: 'conversations',
+        op1: 'get',
+        account_id: resolvedAccountId,
+        offset: scanned,
+        limit: pageSize,
+      }, undefined, req);
+      const chatraceData = await upstream.json().catch(() => null);
+      // Upstream failure: serve what we have, keep the position so the next page retries
+      if (!chatraceData || chatraceData.status !== 'OK' || !Array.isArray(chatraceData.data)) break;
+
+      const pageStart = scanned;
+      chatraceData.data.forEach((row, idx) => {
+        if (rows.length >= limit) return;
+        if (filterChannel && String(row.channel) !== filterChannel) return;
+        const mapped = mapChatraceConversation(row, pageStart + idx, platform, filterChannel);
+        mapped._next = pageStart + idx + 1;
+        rows.push(mapped);
+      });
+      const pageEnd = pageStart + chatraceData.data.length;
+      scanned = rows.length >= limit ? rows[rows.length - 1]._next : pageEnd;
+      if (chatraceData.data.length < pageSize) {
+        // Short page = end of the list, unless we stopped before its last row
+        exhausted = scanned >= pageEnd;
+        break;
+      }
+    }
+  } catch (error) {
+    console.error('❌ Error fetching ChatRace conversations:', error);
+  }
+
+  return { rows, scanned, exhausted };
+}
+
+async function readUnifiedDbStream(platform, after, limit) {
+  try {
+    const rows = await dbBridge.getUnifiedConversations(dbPlatformFor(platform), limit, 0, after || {});
+    return { rows, exhausted: rows.length < limit };
+  } catch (error) {
+    console.error('❌ Error fetching unified conversations:', error);
+    return { rows: [], exhausted: false };
+  }
+}
+
+// Cursor pagination: each source resumes from its own position and the pages are k-way merged.
+// Cursor = { cr: raw ChatRace offset, db: keyset of the last DB row served, end: [finished sources] }
+async function getUnifiedConversationsPage(req, callUpstream, resolvedAccountId, platform, limit) {
+  const cursor = decodeCursor(req.query.cursor);
+  const end = new Set(Array.isArray(cursor.end) ? cursor.end : []);
+  const chatraceFrom = Math.max(0, Number(cursor.cr) || 0);
+  const streams = {};
+
+  const [chatrace, unified] = await Promise.all([
+    includesChatrace(platform) && !end.has('chatrace')
+      ? readChatraceStream(req, callUpstream, resolvedAccountId, platform, chatraceFrom, limit)
+      : null,
+    includesUnifiedDb(platform) && !end.has('db')
+      ? readUnifiedDbStream(platform, cursor.db, limit)
+      : null
+  ]);
+  if (chatrace) streams.chatrace = chatrace;
+  if (unified) streams.db = unified;
+  if (!includesChatrace(platform)) end.add('chatrace');
+  if (!includesUnifiedDb(platform)) end.add('db');
+
+  const { page, consumed } = mergeKeyset(streams, limit);
+  const next = { cr: chatraceFrom, db: cursor.db || null };
+
+  if (chatrace) {
+    const all = consumed.chatrace === chatrace.rows.length;
+    // Fully drained: skip past any non-matching rows we scanned too
+    next.cr = all ? chatrace.scanned : consumed.chatrace > 0 ? chatrace.rows[consumed.chatrace - 1]._next : chatraceFrom;
+    if (all && chatrace.exhausted) end.add('chatrace');
+  }
+  if (unified) {
+    if (consumed.db > 0) next.db = unified.rows[consumed.db - 1]._keyset;
+    if (consumed.db === unified.rows.length && unified.exhausted) end.add('db');
+  }
+  next.end = [...end];
+
+  const hasMore = !(end.has('chatrace') && end.has('db'));
+  return {
+    data: page.map(stripKeyset),
+    next_cursor: hasMore ? encodeCursor(next) : null,
+    has_more: hasMore
+  };
+}
+
 // Enhanced conversations endpoint
 export async function getUnifiedConversations(req, res, callUpstream, resolveAccountId) {
   try {
@@ -64,134 +292,36 @@ export async function getUnifiedConversations(req, res, callUpstream, resolveAcc
     const limit = Math.max(1, Math.min(500, Number(req.query.limit || 25)));
     const offset = Math.max(0, Number(req.query.offset || 0));
     
-    console.log(`[UNIFIED CONVERSATIONS] Loading for platform: ${platform}`);
-    
-    let allConversations = [];
-    
-    // 1. Get ChatRace conversations (existing logic)
-    if (platform === 'all' || ['webchat', 'facebook', 'instagram'].includes(platform)) {
+    // ?cursor= (empty for the first page) switches to keyset pagination over every source
+    if (req.query.cursor !== undefined) {
+      let page;
       try {
-        const channelMap = {
-          webchat: '9',
-          facebook: '0', 
-          instagram: '10'
-        };
-        const filterChannel = channelMap[platform] || null;
-        
-        // Get ALL ChatRace conversations for proper unified sorting
-        const upstream = await callUpstream({
-          op: 'conversations',
-          op1: 'get',
-          account_id: resolvedAccountId,
-          offset: 0,
-          limit: 200, // Get more conversations for proper sorting
-        }, undefined, req);
-        
-        const chatraceData = await upstream.json().catch(() => null);
-        
-        if (chatraceData && chatraceData.status === 'OK' && Array.isArray(chatraceData.data)) {
-          const chatraceConversations = chatraceData.data
-            .filter(row => (filterChannel ? String(row.channel) === filterChannel : true))
-            .map((row, idx) => {
-              const conversationId = String(row.ms_id || row.id || idx + 1);
-              const displayName = String(row.full_name || `Guest ${idx + 1}`);
-              const avatarUrl = row.profile_pic || '';
-              return {
-                conversation_id: conversationId,
-                display_name: displayName,
-                username: displayName,
-                user_identifier: conversationId,
-                avatar_url: avatarUrl,
-                last_message_at: row.timestamp || null,
-                last_message_content: row.last_msg || '',
-                _platform: platform.charAt(0).toUpperCase() + platform.slice(1),
-                hash: '',
-                channel: row.channel || filterChannel || '9',
-                source: 'chatrace'
-              };
-            });
-          
-          allConversations.push(...chatraceConversations);
-        }
+        page = await getUnifiedConversationsPage(req, callUpstream, resolvedAccountId, platform, limit);
       } catch (error) {
-        console.error('❌ Error fetching ChatRace conversations:', error);
-      }
-    }
-    
-    // 2. Get unified conversations (Woodstock + VAPI + Rural King)  
-    if (platform === 'all' || ['woodstock', 'vapi', 'vapi_rural', 'rural_king', 'sms', 'calls'].includes(platform)) {
-      try {
-        // Map special filters to vapi_rural for Rural King data
-        let dbPlatform = platform;
-        if (platform === 'rural_king' || platform === 'sms' || platform === 'calls') {
-          dbPlatform = 'vapi_rural'; // All these filters show Rural King data
+        if (error instanceof SyntaxError || error.message === 'Invalid cursor') {
+          return res.status(400).json({ status: 'error', message: 'Invalid cursor' });
         }
-        
-        // Get ALL unified conversations for proper unified sorting  
-        const unifiedConversations = await dbBridge.getUnifiedConversations(
-          platform === 'all' ? null : dbPlatform,
-          200, // Get more conversations for proper sorting
-          0    // Start from beginning for unified sorting
-        );
-        
-        // Add source indicator (display_name already includes icon from database bridge)
-        const enhancedUnified = unifiedConversations.map(convo => ({
-          ...convo,
-          source: convo.source, // Keep original source
-          // Display name already has icon from database bridge
-        }));
-        
-        allConversations.push(...enhancedUnified);
-      } catch (error) {
-        console.error('❌ Error fetching unified conversations:', error);
+        throw error;
       }
+      return res.json({ status: 'success', ...page });
     }
     
-    // 3. Sort all conversations by TRUE TIMESTAMP ORDER - most recent first
-    allConversations.sort((a, b) => {
-      // Handle different timestamp formats: Unix ms (ChatRace) vs ISO strings (Woodstock)
-      let timeA = a.last_message_at || 0;
-      let timeB = b.last_message_at || 0;
-      
-      // Convert Unix timestamp strings to numbers for ChatRace
-      if (typeof timeA === 'string' && /^\d+$/.test(timeA)) {
-        timeA = parseInt(timeA);
-      }
-      if (typeof timeB === 'string' && /^\d+$/.test(timeB)) {
-        timeB = parseInt(timeB);
-      }
-      
-      // Convert to Date objects for proper comparison
-      const dateA = new Date(timeA).getTime();
-      const dateB = new Date(timeB).getTime();
-      
-      // Debug logging to see what's happening
-      if (Math.random() < 0.01) { // Only log 1% of comparisons to avoid spam
-        console.log(`🔄 Sort compare: ${dateA} vs ${dateB} (${new Date(dateA).toISOString()} vs ${new Date(dateB).toISOString()})`);
-      }
-      
-      return dateB - dateA; // Most recent first - PURE CHRONOLOGICAL ORDER
-    });
-    
-    console.log(`📊 Total conversations before pagination: ${allConversations.length}`);
+    // 4. Serve the page from the cached merged index (O(limit) on a hit)
+    const page = await conversationIndex.getPage(
+      resolvedAccountId,
+      platform,
+      offset,
+      limit,
+      () => loadMergedConversations(req, callUpstream, resolvedAccountId, platform)
+    );
     
-    // 4. Apply pagination
-    const paginatedConversations = allConversations.slice(offset, offset + limit);
-    
-    console.log(`✅ Returning ${paginatedConversations.length} unified conversations`);
-    console.log(`📊 Sources: ${[...new Set(paginatedConversations.map(c => c.source))].join(', ')}`);
+    res.setHeader('X-Inbox-Index', page.partial ? `${page.state}; partial` : page.state);
     
     return res.json({ 
       status: 'success', 
-      data: paginatedConversations,
-      total: allConversations.length,
-      sources: {
-        chatrace: allConversations.filter(c => c.source === 'chatrace').length,
-        woodstock: allConversations.filter(c => c.source === 'woodstock').length,
-        vapi: allConversations.filter(c => c.source === 'vapi').length,
-        vapi_rural: allConversations.filter(c => c.source === 'vapi_rural').length,
-        rural_king: allConversations.filter(c => c.source === 'vapi_rural').length // Alias for frontend
-      }
+      data: page.data,
+      total: page.total,
+      sources: page.sources
     });
     
   } catch (error) {
@@ -337,11 +467,45 @@ function enhanceFunctionCallDisplay(content, functionData) {
   return enhanced;
 }
 
+// Cached conversation pages follow the same events the SSE clients are sent
+inboxEvents.subscribe((event) => conversationIndex.applyEvent(event));
+
+// VAPI webhook path: upsert freshly stored calls into the unified tables right away
+export async function syncVAPICallsToInbox(calls) {
+  await initializeUnifiedInbox();
+  await dbBridge.syncVAPICalls(calls);
+}
+
+// Contact panel: customer_360 profile by ?phone=, ?email= or a vapi conversation id
+export async function getCustomerProfile(req, res) {
+  try {
+    await initializeUnifiedInbox();
+    if (!customerLookup) {
+      customerLookup = new CustomerLookup(dbBridge.woodstockDb);
+      customerLookup.listenForChanges({ connectionString: dbBridge.woodstockUrl });
+    }
+    
+    const phone = req.query.phone || phoneFromConversationId(req.query.conversation_id);
+    const email = req.query.email;
+    if (!phone && !email) {
+      return res.status(400).json({ status: 'error', message: 'phone, email or conversation_id is required' });
+    }
+    
+    const customer = await customerLookup.lookup({ phone, email });
+    return res.json({ status: 'success', customer });
+  } catch (error) {
+    console.error('❌ Error in customer lookup:', error);
+    return res.status(200).json({ status: 'error', message: error.message });
+  }
+}
+
 // Sync endpoint for manual refresh
 export async function triggerUnifiedSync(req, res) {
   try {
     await initializeUnifiedInbox();
     await dbBridge.runSync();
+    conversationIndex.invalidate();
+    customerLookup?.invalidate();
     
     return res.json({ 
       status: 'success', 
@@ -356,3 +520,10 @@ export async function triggerUnifiedSync(req, res) {
   }
 }
 
+
+// Shutdown: stop the periodic sync and the customer_360 change listener (the pools are closed by the caller)
+export async function stopUnifiedInbox() {
+  clearInterval(syncTimer);
+  syncTimer = null;
+  await customerLookup?.stop();
+}
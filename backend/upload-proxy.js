@@ -0,0 +1,159 @@
+// upload-proxy.js
+// Streams a multipart upload from the browser straight into the multipart POST to ChatRace:
+// Busboy -> byte counter -> form-data -> node-fetch, with backpressure end to end, so a file
+// is never held in memory. Oversized uploads are refused from Content-Length when possible,
+// otherwise as soon as Busboy's fileSize limit trips, and the upstream request is aborted.
+
+import { Transform } from 'stream';
+import busboy from 'busboy';
+import FormData from 'form-data';
+import fetch from 'node-fetch';
+
+const MAX_UPLOAD_BYTES = Number(process.env.UPLOAD_MAX_BYTES || 100 * 1024 * 1024);
+// Room for boundaries, part headers and the param field on top of the file itself
+const MULTIPART_OVERHEAD_BYTES = 64 * 1024;
+
+const stats = {
+  started: 0,
+  completed: 0,
+  rejected: 0,
+  failed: 0,
+  aborted: 0,
+  inFlight: 0,
+  bytes: 0,
+  lastBytes: 0,
+  lastMs: 0,
+  lastMBps: 0,
+  maxMBps: 0
+};
+
+class UploadError extends Error {
+  constructor(message, statusCode) {
+    super(message);
+    this.name = 'UploadError';
+    this.statusCode = statusCode;
+  }
+}
+
+function byteCounter(onBytes) {
+  return new Transform({
+    transform(chunk, _encoding, callback) {
+      onBytes(chunk.length);
+      callback(null, chunk);
+    }
+  });
+}
+
+// Resolves with { status, text } from upstream. Rejects with an UploadError carrying an HTTP
+// status (413 too large, 400 malformed, 499 client went away) or with the upstream error.
+// The 'param' field has to come before the file, as the inbox client sends it.
+function proxyUpload(req, { url, headers = {}, maxBytes = MAX_UPLOAD_BYTES, agent } = {}) {
+  return new Promise((resolve, reject) => {
+    const declared = Number(req.headers['content-length']);
+    if (declared > maxBytes + MULTIPART_OVERHEAD_BYTES) {
+      stats.rejected += 1;
+      reject(new UploadError(`Upload exceeds ${maxBytes} bytes`, 413));
+      return;
+    }
+
+    let bb;
+    try {
+      bb = busboy({ headers: req.headers, limits: { files: 1, fileSize: maxBytes, fields: 20, fieldSize: 1024 * 1024 } });
+    } catch (error) {
+      stats.rejected += 1;
+      reject(new UploadError(error.message, 400));
+      return;
+    }
+
+    const controller = new AbortController();
+    const started = Date.now();
+    let param = null;
+    let upstream = null;
+    let bytes = 0;
+    let settled = false;
+    stats.started += 1;
+    stats.inFlight += 1;
+
+    const finish = () => {
+      settled = true;
+      stats.inFlight -= 1;
+      req.off('close', onClientClose);
+    };
+    const fail = (error, counter = 'failed') => {
+      if (settled) return;
+      finish();
+      stats[counter] += 1;
+      controller.abort();
+      req.unpipe(bb);
+      req.resume(); // discard the rest of the body so the 413/400 can be written
+      reject(error);
+    };
+    const onClientClose = () => {
+      if (!req.complete) fail(new UploadError('Client closed the upload', 499), 'aborted');
+    };
+    req.on('close', onClientClose);
+
+    const send = (form) => fetch(url, {
+      method: 'POST',
+      headers: { ...headers, ...form.getHeaders() },
+      body: form,
+      agent,
+      signal: controller.signal
+    }).then(async response => ({ status: response.status, text: await response.text() }));
+
+    bb.on('field', (name, value) => {
+      if (name === 'param') param = value;
+    });
+
+    bb.on('file', (_name, file, info) => {
+      if (upstream) {
+        file.resume();
+        return;
+      }
+      file.on('limit', () => fail(new UploadError(`File exceeds ${maxBytes} bytes`, 413), 'rejected'));
+      const form = new FormData();
+      if (param) form.append('param', param);
+      form.append('file', file.pipe(byteCounter((n) => { bytes += n; })), {
+        filename: info.filename || 'upload.bin',
+        contentType: info.mimeType
+      });
+      upstream = send(form);
+      // Upstream failing mid-stream must stop reading from the browser too
+      upstream.catch(error => fail(error));
+    });
+
+    bb.on('close', async () => {
+      if (settled) return;
+      if (!upstream) {
+        const form = new FormData();
+        if (param) form.append('param', param);
+        upstream = send(form);
+      }
+      try {
+        const result = await upstream;
+        if (settled) return;
+        finish();
+        const elapsed = Math.max(1, Date.now() - started);
+        const mbps = +((bytes / (1024 * 1024)) / (elapsed / 1000)).toFixed(2);
+        stats.completed += 1;
+        stats.bytes += bytes;
+        stats.lastBytes = bytes;
+        stats.lastMs = elapsed;
+        stats.lastMBps = mbps;
+        if (mbps > stats.maxMBps) stats.maxMBps = mbps;
+        resolve(result);
+      } catch (error) {
+        fail(error);
+      }
+    });
+
+    bb.on('error', error => fail(new UploadError(error.message, 400), 'rejected'));
+    req.pipe(bb);
+  });
+}
+
+function uploadMetrics() {
+  return { ...stats, maxBytes: MAX_UPLOAD_BYTES };
+}
+
+export { proxyUpload, uploadMetrics, UploadError, MAX_UPLOAD_BYTES };
@@ -0,0 +1,99 @@
+// upstream-client.js
+// HTTP plumbing for the ChatRace API: pooled keep-alive agents (one TLS handshake per socket
+// instead of per request, capped at UPSTREAM_MAX_SOCKETS) and coalescing of identical
+// in-flight read calls, so twenty agents opening the inbox cause one upstream "tags/get".
+
+import http from 'http';
+import https from 'https';
+import crypto from 'crypto';
+import fetch, { Response } from 'node-fetch';
+
+const agentOptions = {
+  keepAlive: true,
+  keepAliveMsecs: 15000,
+  maxSockets: Number(process.env.UPSTREAM_MAX_SOCKETS || 50),
+  maxFreeSockets: Number(process.env.UPSTREAM_MAX_FREE_SOCKETS || 10),
+  timeout: Number(process.env.UPSTREAM_SOCKET_TIMEOUT_MS || 60000)
+};
+const httpAgent = new http.Agent(agentOptions);
+const httpsAgent = new https.Agent(agentOptions);
+
+// node-fetch picks the agent per URL (API_URL may be plain http in development)
+function upstreamAgent(parsedUrl) {
+  return parsedUrl.protocol === 'http:' ? httpAgent : httpsAgent;
+}
+
+const stats = { requests: 0, coalesced: 0, inFlight: 0 };
+const inflight = new Map(); // key -> Promise<{ status, statusText, headers, body }>
+
+// Only reads are shared; sends, updates and OTP calls always go out on their own
+function isReadOp(payload) {
+  return Boolean(payload) && (payload.op1 === 'get' || payload.op2 === 'get');
+}
+
+// Same JSON for the same payload regardless of key order
+function stableStringify(value) {
+  if (Array.isArray(value)) return `[${value.map(stableStringify).join(',')}]`;
+  if (value && typeof value === 'object') {
+    return `{${Object.keys(value).sort().map(k => `${JSON.stringify(k)}:${stableStringify(value[k])}`).join(',')}}`;
+  }
+  return JSON.stringify(value);
+}
+
+// (token, account_id, op, op1, op2, args) -> key; the token is hashed so it isn't kept in memory
+function coalesceKey(url, headers, payload) {
+  return crypto.createHash('sha1')
+    .update(url)
+    .update('\0')
+    .update(stableStringify(headers))
+    .update('\0')
+    .update(stableStringify(payload))
+    .digest('base64');
+}
+
+async function send(url, headers, body) {
+  stats.requests += 1;
+  stats.inFlight += 1;
+  try {
+    return await fetch(url, { method: 'POST', headers, body, agent: upstreamAgent });
+  } finally {
+    stats.inFlight -= 1;
+  }
+}
+
+// POST a JSON payload upstream. Identical concurrent reads share one request; each waiter
+// gets its own Response over the buffered body, so callers can still .text()/.json() it.
+async function postUpstream(url, headers, payload) {
+  const body = JSON.stringify(payload);
+  if (!isReadOp(payload)) return send(url, headers, body);
+
+  const key = coalesceKey(url, headers, payload);
+  let shared = inflight.get(key);
+  if (shared) {
+    stats.coalesced += 1;
+  } else {
+    shared = send(url, headers, body)
+      .then(async (response) => ({
+        status: response.status,
+        statusText: response.statusText,
+        headers: Array.from(response.headers.entries()),
+        body: Buffer.from(await response.arrayBuffer())
+      }))
+      .finally(() => inflight.delete(key));
+    inflight.set(key, shared);
+  }
+
+  const result = await shared;
+  return new Response(result.body, { status: result.status, statusText: result.statusText, headers: result.headers });
+}
+
+function upstreamMetrics() {
+  const sockets = (agent) => ({
+    active: Object.values(agent.sockets).reduce((n, list) => n + list.length, 0),
+    free: Object.values(agent.freeSockets).reduce((n, list) => n + list.length, 0),
+    queued: Object.values(agent.requests).reduce((n, list) => n + list.length, 0)
+  });
+  return { ...stats, pendingKeys: inflight.size, https: sockets(httpsAgent), http: sockets(httpAgent) };
+}
+
+export { postUpstream, upstreamAgent, upstreamMetrics, isReadOp, coalesceKey };
@@ -0,0 +1,189 @@
+// write-batcher.js
+// In-memory micro-batcher for hot write paths: callers enqueue and return immediately,
+// and the queue is flushed as one statement every `maxBatch` items or `maxDelayMs`.
+// A failed batch is split in halves until the failing items are isolated, so one bad row
+// doesn't take the rest of its batch down; only those items are retried, with exponential
+// backoff, and handed to `onDrop` once they run out of attempts.
+
+const DEFAULT_MAX_ATTEMPTS = 3;
+
+class WriteBatcher {
+  constructor({
+    name,
+    flush,
+    onDrop,
+    maxBatch = 50,
+    maxDelayMs = 250,
+    maxQueue = 10000,
+    maxAttempts = DEFAULT_MAX_ATTEMPTS,
+    retryDelayMs = 500,
+    maxRetryDelayMs = 30000
+  }) {
+    this.name = name;
+    this.flushFn = flush; // async (items) => void; throws to retry the batch
+    // (item, reason) => void; default logs the payload so it can be replayed by hand
+    this.onDrop = onDrop || ((item, reason) => {
+      console.error(`❌ ${this.name} batcher dropped entry (${reason}):`, JSON.stringify(item));
+    });
+    this.maxBatch = maxBatch;
+    this.maxDelayMs = maxDelayMs;
+    this.maxQueue = maxQueue;
+    this.maxAttempts = maxAttempts;
+    this.retryDelayMs = retryDelayMs;
+    this.maxRetryDelayMs = maxRetryDelayMs;
+
+    this.queue = []; // { item, attempts }
+    this.timer = null;
+    this.flushing = null; // in-flight flush promise, one at a time
+    this.retrying = new Set(); // promises for entries waiting out their backoff
+    this.stats = {
+      enqueued: 0,
+      written: 0,
+      dropped: 0,
+      retried: 0,
+      flushes: 0,
+      failedFlushes: 0,
+      splits: 0,
+      lastFlushMs: 0,
+      maxFlushMs: 0,
+      totalFlushMs: 0,
+      lastBatchSize: 0,
+      lastError: null
+    };
+  }
+
+  add(item) {
+    if (this.queue.length >= this.maxQueue) {
+      // Shed the oldest entry rather than growing without bound while the DB is down
+      const { item: oldest } = this.queue.shift();
+      this.stats.dropped += 1;
+      this.drop(oldest, `queue full (${this.maxQueue})`);
+    }
+    this.queue.push({ item, attempts: 0 });
+    this.stats.enqueued += 1;
+
+    if (this.queue.length >= this.maxBatch) {
+      this.flush();
+    } else if (!this.timer) {
+      this.timer = setTimeout(() => this.flush(), this.maxDelayMs);
+      this.timer.unref?.();
+    }
+  }
+
+  flush() {
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.timer = null;
+    }
+    if (this.flushing || this.queue.length === 0) return this.flushing || Promise.resolve();
+
+    const batch = this.queue.splice(0, this.maxBatch);
+    const start = Date.now();
+
+    this.flushing = (async () => {
+      try {
+        const failed = await this.write(batch);
+        if (failed.length > 0) this.retry(failed);
+      } finally {
+        const elapsed = Date.now() - start;
+        this.stats.flushes += 1;
+        this.stats.lastFlushMs = elapsed;
+        this.stats.totalFlushMs += elapsed;
+        this.stats.lastBatchSize = batch.length;
+        if (elapsed > this.stats.maxFlushMs) this.stats.maxFlushMs = elapsed;
+        this.flushing = null;
+      }
+      // Whatever arrived meanwhile goes on the next tick of the timer
+      this.schedule();
+    })();
+
+    return this.flushing;
+  }
+
+  schedule() {
+    if (this.queue.length >= this.maxBatch) this.flush();
+    else if (this.queue.length > 0 && !this.timer) {
+      this.timer = setTimeout(() => this.flush(), this.maxDelayMs);
+      this.timer.unref?.();
+    }
+  }
+
+  // Writes the batch, bisecting on failure; resolves to the entries that still failed on their own
+  async write(batch) {
+    try {
+      await this.flushFn(batch.map(entry => entry.item));
+      this.stats.written += batch.length;
+      return [];
+    } catch (error) {
+      this.stats.failedFlushes += 1;
+      this.stats.lastError = error.message;
+      if (batch.length === 1) {
+        console.error(`❌ ${this.name} write failed:`, error.message);
+        batch[0].error = error.message;
+        return batch;
+      }
+      console.error(`❌ ${this.name} batch flush failed (${batch.length} items) - splitting:`, error.message);
+      this.stats.splits += 1;
+      const middle = Math.ceil(batch.length / 2);
+      const left = await this.write(batch.slice(0, middle));
+      const right = await this.write(batch.slice(middle));
+      return [...left, ...right];
+    }
+  }
+
+  // Requeue failed entries after an exponential backoff; entries out of attempts are dropped
+  retry(failed) {
+    const byDelay = new Map();
+    for (const entry of failed) {
+      entry.attempts += 1;
+      if (entry.attempts >= this.maxAttempts) {
+        this.stats.dropped += 1;
+        this.drop(entry.item, `${entry.attempts} failed attempts: ${entry.error}`);
+        continue;
+      }
+      const delay = Math.min(this.retryDelayMs * 2 ** (entry.attempts - 1), this.maxRetryDelayMs);
+      if (!byDelay.has(delay)) byDelay.set(delay, []);
+      byDelay.get(delay).push(entry);
+    }
+
+    for (const [delay, entries] of byDelay) {
+      this.stats.retried += entries.length;
+      const waiting = new Promise(resolve => setTimeout(resolve, delay)).then(() => {
+        this.retrying.delete(waiting);
+        this.queue.unshift(...entries);
+        this.schedule();
+      });
+      this.retrying.add(waiting);
+    }
+  }
+
+  drop(item, reason) {
+    try {
+      this.onDrop(item, reason);
+    } catch (error) {
+      console.error(`❌ ${this.name} onDrop failed:`, error.message);
+    }
+  }
+
+  // Flush everything still queued, waiting out pending retries (shutdown); gives up after
+  // maxAttempts per item
+  async drain() {
+    while (this.queue.length > 0 || this.flushing || this.retrying.size > 0) {
+      if (this.queue.length > 0 || this.flushing) await (this.flushing || this.flush());
+      else await Promise.race(this.retrying);
+    }
+  }
+
+  metrics() {
+    const { totalFlushMs, ...stats } = this.stats;
+    return {
+      ...stats,
+      queueDepth: this.queue.length,
+      inFlight: Boolean(this.flushing),
+      retryPending: this.retrying.size,
+      avgFlushMs: stats.flushes ? +(totalFlushMs / stats.flushes).toFixed(2) : 0
+    };
+  }
+}
+
+export { WriteBatcher };
@@ -0,0 +1,108 @@
+-- =====================================================
+-- Benchmark: customer_analytics maintenance during a bulk order load
+-- =====================================================
+--
+-- Loads the loftorders sample at 100x scale (every order copied 100 times under new
+-- orderids, same customers, so orders-per-customer grows 100x like a long history) as a
+-- single INSERT ... SELECT, the same shape as COPY, under three strategies:
+--
+--   A. legacy   - FOR EACH ROW trigger re-aggregating the customer on every order row
+--   B. statement - FOR EACH STATEMENT trigger with transition table, immediate refresh
+--   C. deferred  - statement trigger only queues; refresh_customer_analytics() once at the end
+--
+-- Run against a scratch database that has woodstock_outlet_database.sql applied:
+--   psql -d woodstock_bench -v csvdir="$PWD/data-samples" -f data-samples/bench_customer_analytics.sql
+-- Everything runs in one transaction that is rolled back at the end.
+
+\set ON_ERROR_STOP on
+\set scale 100
+\set customers_csv :csvdir '/loftcustomers_202507110919.csv'
+\set orders_csv :csvdir '/loftorders_202507110918.csv'
+
+BEGIN;
+
+-- Staging copies of the CSVs (same column order as the files)
+CREATE TEMP TABLE stage_customers (LIKE customers INCLUDING DEFAULTS) ON COMMIT DROP;
+ALTER TABLE stage_customers DROP COLUMN created_at;
+CREATE TEMP TABLE stage_orders (LIKE orders INCLUDING DEFAULTS) ON COMMIT DROP;
+ALTER TABLE stage_orders DROP COLUMN created_at;
+
+\copy stage_customers FROM :'customers_csv' WITH (FORMAT csv, HEADER true, NULL '')
+\copy stage_orders FROM :'orders_csv' WITH (FORMAT csv, HEADER true, NULL '')
+
+-- Customers are loaded once, outside the timed sections; orders reference a few
+-- customers missing from the sample, add them as stubs so the FK holds
+SET analytics.defer_refresh = 'on';
+INSERT INTO customers SELECT * FROM stage_customers ON CONFLICT DO NOTHING;
+INSERT INTO customers (customerid)
+SELECT DISTINCT customerid FROM stage_orders WHERE customerid IS NOT NULL
+ON CONFLICT DO NOTHING;
+SELECT refresh_customer_analytics() AS customers_seeded;
+RESET analytics.defer_refresh;
+
+-- The 100x load itself: one statement, like COPY
+CREATE TEMP VIEW scaled_orders AS
+SELECT (o.orderid || '-' || n)::VARCHAR(20) AS orderid, o.type, o.orderdate, o.ordertime, o.status,
+       o.customerid, o.ordersiteid, o.salesperson1, o.salesperson2, o.percentofsale1,
+       o.percentofsale2, o.fromsiteid, o.deliverytype, o.deliverydate, o.closeddate,
+       o.closedsiteid, o.promisedate, o.mainorderid, o.sequence, o.originalsaleid,
+       o.adjustedorderid, o.adjustmentreasonid, o.autoadjustment, o.autosequence, o.massclose,
+       o.discountid, o.setupcharge, o.tax, o.taxruleid, o.taxexemptionid, o.deliverycharge,
+       o.shipfirstname, o.shiplastname, o.shipcompanyname, o.shipaddress1, o.shipaddress2,
+       o.shipcity, o.shipstate, o.shipzipcode, o.shipcountryid, o.shipzoneid,
+       o.shipphonenumber, o.shipbusinessphone, o.shipextension, o.shipemail, o.closedby,
+       o.createdby, o.markerid, o.financecompanyid, o.layawaysale, o.takewithsale,
+       o.tentativefinancedamount, o.requestedfinancedamount, o.approvalcode, o.approvaldate,
+       o.printedby, o.printapprovedby, o.printedfrom, o.lastprinted, o.receiptprintcount,
+       o.printedbyscreen, o.reserveuntil, o.approvalcodesequence, o.voidreasonid, o.version,
+       o.interfacedforsalescube, o.interfacedforforecasting, o.deleteorder
+FROM stage_orders o
+CROSS JOIN generate_series(1, :scale) AS n;
+
+SELECT COUNT(*) AS orders_to_load, COUNT(DISTINCT customerid) AS customers_affected FROM scaled_orders;
+
+-- Legacy per-row trigger, kept here only for comparison
+CREATE OR REPLACE FUNCTION pg_temp.legacy_update_customer_analytics()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO customer_analytics_pending (customerid) VALUES (NEW.customerid)
+    ON CONFLICT DO NOTHING;
+    PERFORM refresh_customer_analytics();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+\timing on
+
+-- ---------- A. legacy: FOR EACH ROW ----------
+SAVEPOINT run_a;
+ALTER TABLE orders DISABLE TRIGGER trigger_update_customer_analytics;
+CREATE TRIGGER bench_legacy_customer_analytics
+    AFTER INSERT ON orders
+    FOR EACH ROW
+    EXECUTE FUNCTION pg_temp.legacy_update_customer_analytics();
+INSERT INTO orders SELECT * FROM scaled_orders;
+ROLLBACK TO SAVEPOINT run_a;
+
+-- ---------- B. statement-level, immediate refresh ----------
+SAVEPOINT run_b;
+INSERT INTO orders SELECT * FROM scaled_orders;
+ROLLBACK TO SAVEPOINT run_b;
+
+-- ---------- C. deferred: queue during load, refresh once ----------
+SAVEPOINT run_c;
+SET LOCAL analytics.defer_refresh = 'on';
+INSERT INTO orders SELECT * FROM scaled_orders;
+SELECT refresh_customer_analytics() AS customers_refreshed;
+
+\timing off
+
+-- Sanity check: analytics match a from-scratch aggregate
+SELECT COUNT(*) AS mismatched_customers
+FROM customer_analytics ca
+JOIN (
+    SELECT customerid, COUNT(*) AS total_orders FROM orders GROUP BY customerid
+) o ON o.customerid = ca.customerid
+WHERE ca.total_orders <> o.total_orders;
+
+ROLLBACK;
@@ -7,42 +7,42 @@
 -- =====================================================
 
 -- Get customer by phone number
+-- (customer_360 is pre-joined and keyed by E.164, so any input format hits idx_customer_360_phone)
 SELECT 
-    c.customerid,
-    c.firstname,
-    c.lastname,
-    c.email,
-    c.phonenumber,
-    c.address1,
-    c.city,
-    c.state,
-    c.zipcode,
-    ca.total_orders,
-    ca.total_spent,
-    ca.loyalty_tier,
-    ca.days_since_last_order
-FROM customers c
-LEFT JOIN customer_analytics ca ON c.customerid = ca.customerid
-WHERE c.phonenumber = '407-288-6040';
+    customerid,
+    full_name,
+    email_norm as email,
+    phone_e164,
+    city,
+    state,
+    zipcode,
+    total_orders,
+    total_spent,
+    loyalty_tier,
+    days_since_last_order,
+    open_orders,
+    last_order
+FROM customer_360
+WHERE phone_e164 = normalize_phone_e164('407-288-6040')
+   OR business_phone_e164 = normalize_phone_e164('407-288-6040');
 
 -- Get customer by email
 SELECT 
-    c.customerid,
-    c.firstname,
-    c.lastname,
-    c.email,
-    c.phonenumber,
-    c.address1,
-    c.city,
-    c.state,
-    c.zipcode,
-    ca.total_orders,
-    ca.total_spent,
-    ca.loyalty_tier,
-    ca.days_since_last_order
-FROM customers c
-LEFT JOIN customer_analytics ca ON c.customerid = ca.customerid
-WHERE c.email = 'jdan4sure@yahoo.com';
+    customerid,
+    full_name,
+    email_norm as email,
+    phone_e164,
+    city,
+    state,
+    zipcode,
+    total_orders,
+    total_spent,
+    loyalty_tier,
+    days_since_last_order,
+    open_orders,
+    last_order
+FROM customer_360
+WHERE email_norm = normalize_email('jdan4sure@yahoo.com');
 
 -- =====================================================
 -- ORDER HISTORY QUERIES
@@ -122,25 +122,20 @@ ORDER BY ca.days_since_last_order DESC;
 -- =====================================================
 
 -- Get products frequently bought together
+-- (reads the incremental pair counts via idx_product_pair_counts_top; no order_details rescan)
 SELECT 
-    od1.productid as main_product,
-    od1.description as main_product_name,
-    od2.productid as companion_product,
-    od2.description as companion_product_name,
-    COUNT(*) as frequency,
-    (COUNT(*) * 100.0 / total_orders.total_count) as confidence_percentage
-FROM order_details od1
-JOIN order_details od2 ON od1.orderid = od2.orderid 
-    AND od1.productid != od2.productid
-JOIN (
-    SELECT productid, COUNT(DISTINCT orderid) as total_count
-    FROM order_details
-    WHERE productid = '353192023'
-    GROUP BY productid
-) total_orders ON od1.productid = total_orders.productid
-WHERE od1.productid = '353192023'
-GROUP BY od1.productid, od1.description, od2.productid, od2.description, total_orders.total_count
-ORDER BY frequency DESC
+    ppc.productid as main_product,
+    pa1.product_name as main_product_name,
+    ppc.companion_productid as companion_product,
+    pa2.product_name as companion_product_name,
+    ppc.pair_count as frequency,
+    (ppc.pair_count * 100.0 / poc.order_count) as confidence_percentage
+FROM product_pair_counts ppc
+JOIN product_order_counts poc ON poc.productid = ppc.productid
+LEFT JOIN product_analytics pa1 ON pa1.productid = ppc.productid
+LEFT JOIN product_analytics pa2 ON pa2.productid = ppc.companion_productid
+WHERE ppc.productid = '353192023'
+ORDER BY ppc.pair_count DESC
 LIMIT 5;
 
 -- Get customer's favorite product categories
@@ -2,9 +2,16 @@
 -- CSV Data Import Script for Woodstock Outlet Database
 -- =====================================================
 
+-- For real exports prefer data-samples/ingest-loft.js: it streams and validates the CSVs,
+-- quarantines bad rows instead of aborting, and loads the three tables in parallel.
+
 -- Make sure you're connected to the database
 -- \c woodstock_outlet_chatbot;
 
+-- Analytics triggers only queue affected customers during the load;
+-- refresh_customer_analytics() below recomputes each of them once
+SET analytics.defer_refresh = 'on';
+
 -- =====================================================
 -- IMPORT CUSTOMERS DATA
 -- =====================================================
@@ -72,28 +79,13 @@ WITH (FORMAT csv, HEADER true, NULL '');
 -- POPULATE ANALYTICS TABLES
 -- =====================================================
 
--- Populate customer analytics
-INSERT INTO customer_analytics (
-    customerid, total_orders, total_spent, first_order_date, 
-    last_order_date, average_order_value, loyalty_tier, days_since_last_order
-)
-SELECT 
-    c.customerid,
-    COUNT(o.orderid) as total_orders,
-    COALESCE(SUM(o.sum::DECIMAL), 0) as total_spent,
-    MIN(o.orderdate) as first_order_date,
-    MAX(o.orderdate) as last_order_date,
-    COALESCE(AVG(o.sum::DECIMAL), 0) as average_order_value,
-    CASE 
-        WHEN COALESCE(SUM(o.sum::DECIMAL), 0) >= 5000 THEN 'PLATINUM'
-        WHEN COALESCE(SUM(o.sum::DECIMAL), 0) >= 2000 THEN 'GOLD'
-        WHEN COALESCE(SUM(o.sum::DECIMAL), 0) >= 500 THEN 'SILVER'
-        ELSE 'BRONZE'
-    END as loyalty_tier,
-    EXTRACT(DAY FROM (CURRENT_TIMESTAMP - MAX(o.orderdate))) as days_since_last_order
-FROM customers c
-LEFT JOIN orders o ON c.customerid = o.customerid
-GROUP BY c.customerid;
+-- Populate customer analytics (every customer queued by the loads above, once)
+SELECT refresh_customer_analytics() AS customers_refreshed;
+
+-- Build the customer_360 identification profiles queued by the analytics refresh
+SELECT refresh_customer_360() AS profiles_refreshed;
+
+RESET analytics.defer_refresh;
 
 -- Populate product analytics
 INSERT INTO product_analytics (
@@ -0,0 +1,298 @@
+#!/usr/bin/env node
+
+// ingest-loft.js
+// Streaming LOFT export loader: validate/normalize CSVs, COPY the three tables in parallel into
+// UNLOGGED staging tables, then merge into the live tables in one short transaction.
+//
+// Usage:
+//   DATABASE_URL=postgres://... node data-samples/ingest-loft.js --dir ./exports
+//   node data-samples/ingest-loft.js --customers c.csv --orders o.csv --details d.csv \
+//        [--quarantine rejects.csv] [--chunk-rows 5000] [--missing-customers stub|quarantine] [--dry-run]
+//
+// --dir picks the newest loftcustomers_*/loftorders_*/loftorderdetails_* file in the directory.
+// Rows that fail validation (and orphans found after staging) go to the quarantine CSV instead of
+// aborting the load. Live tables only take row locks during the merge, so readers are never blocked.
+
+import fs from 'fs';
+import path from 'path';
+import { Readable } from 'stream';
+import { pipeline } from 'stream/promises';
+import { performance } from 'perf_hooks';
+import pg from 'pg';
+import copyStreams from 'pg-copy-streams';
+import { loadTableSpecs, parseCsv, bindHeader, normalizeRecord, toCopyLine, toCsvLine } from './loft-csv.js';
+
+const TABLES = {
+  customers: { option: 'customers', prefix: 'loftcustomers_', key: ['customerid'] },
+  orders: { option: 'orders', prefix: 'loftorders_', key: ['orderid'] },
+  order_details: { option: 'details', prefix: 'loftorderdetails_', key: ['orderid', 'lineid'] }
+};
+
+const stageName = (table) => `loft_stage_${table}`;
+
+function parseArgs(argv) {
+  const args = { chunkRows: 5000, missingCustomers: 'stub', dryRun: false };
+  for (let i = 0; i < argv.length; i++) {
+    const [flag, inline] = argv[i].split('=');
+    const value = () => inline ?? argv[++i];
+    switch (flag) {
+      case '--dir': args.dir = value(); break;
+      case '--customers': args.customers = value(); break;
+      case '--orders': args.orders = value(); break;
+      case '--details': args.details = value(); break;
+      case '--quarantine': args.quarantine = value(); break;
+      case '--chunk-rows': args.chunkRows = Number(value()); break;
+      case '--missing-customers': args.missingCustomers = value(); break;
+      case '--dry-run': args.dryRun = true; break;
+      default: throw new Error(`Unknown option ${argv[i]}`);
+    }
+  }
+
+  if (args.dir) {
+    const files = fs.readdirSync(args.dir).sort();
+    for (const { option, prefix } of Object.values(TABLES)) {
+      const newest = files.filter(f => f.startsWith(prefix) && f.endsWith('.csv')).pop();
+      if (newest && !args[option]) args[option] = path.join(args.dir, newest);
+    }
+  }
+  if (!['stub', 'quarantine'].includes(args.missingCustomers)) {
+    throw new Error('--missing-customers must be "stub" or "quarantine"');
+  }
+  if (!Number.isInteger(args.chunkRows) || args.chunkRows < 1) throw new Error('--chunk-rows must be a positive integer');
+  args.quarantine ||= `loft-quarantine-${new Date().toISOString().replace(/[:.]/g, '-')}.csv`;
+  return args;
+}
+
+// Quarantine sink shared by all three loaders: table, line, reason, then the raw fields
+function openQuarantine(file) {
+  const out = fs.createWriteStream(file);
+  out.write(toCsvLine(['table', 'line', 'reason', 'fields']));
+  let count = 0;
+  return {
+    write(table, line, reason, fields = []) {
+      count += 1;
+      out.write(toCsvLine([table, line, reason, ...fields]));
+    },
+    get count() { return count; },
+    close: () => new Promise(resolve => out.end(resolve))
+  };
+}
+
+// COPY text chunks of up to chunkRows rows; each staged row carries its CSV line number in _line
+async function* copyChunks(table, spec, file, options, quarantine, stats) {
+  let columns = null;
+  let line = 0;
+  let buffer = [];
+
+  for await (const record of parseCsv(fs.createReadStream(file, { encoding: 'utf8', highWaterMark: 1 << 20 }))) {
+    line += 1;
+    if (!columns) {
+      columns = bindHeader(spec, record);
+      stats.columns = columns.map(c => c.name);
+      continue;
+    }
+    stats.read += 1;
+    const { values, error } = normalizeRecord(columns, record, stats);
+    if (error) {
+      stats.rejected += 1;
+      quarantine.write(table, line, error, record);
+      continue;
+    }
+    buffer.push(toCopyLine([...values, String(line)]));
+    if (buffer.length >= options.chunkRows) {
+      stats.staged += buffer.length;
+      yield buffer.join('');
+      buffer = [];
+    }
+  }
+
+  if (!columns) throw new Error(`${file}: empty file`);
+  if (buffer.length) {
+    stats.staged += buffer.length;
+    yield buffer.join('');
+  }
+}
+
+async function stageTable(pool, table, spec, file, options, quarantine) {
+  const stats = { file, read: 0, staged: 0, rejected: 0, sentinelDates: 0, ms: 0 };
+  const start = performance.now();
+  const client = await pool.connect();
+  try {
+    const stage = stageName(table);
+    await client.query(`DROP TABLE IF EXISTS ${stage}`);
+    await client.query(`CREATE UNLOGGED TABLE ${stage} (LIKE ${table} INCLUDING DEFAULTS)`);
+    await client.query(`ALTER TABLE ${stage} DROP COLUMN created_at${table === 'order_details' ? ', DROP COLUMN id' : ''}, ADD COLUMN _line BIGINT`);
+
+    const chunks = copyChunks(table, spec, file, options, quarantine, stats);
+    // The header has to be read before the COPY column list is known
+    const first = await chunks.next();
+    const columnList = [...stats.columns, '_line'].join(', ');
+    const copy = client.query(copyStreams.from(`COPY ${stage} (${columnList}) FROM STDIN`));
+    await pipeline(Readable.from((async function* () {
+      if (!first.done) yield first.value;
+      yield* chunks;
+    })(), { objectMode: false }), copy);
+
+    await client.query(`CREATE INDEX ON ${stage} (${TABLES[table].key.join(', ')}, _line)`);
+    await client.query(`ANALYZE ${stage}`);
+  } finally {
+    client.release();
+  }
+  stats.ms = Math.round(performance.now() - start);
+  console.log(`📥 ${table}: ${stats.staged}/${stats.read} rows staged, ${stats.rejected} rejected, ${stats.sentinelDates} sentinel dates nulled (${stats.ms}ms)`);
+  return stats;
+}
+
+// Later lines win for repeated keys, matching what a re-export means
+async function dedupeStage(client, table) {
+  const stage = stageName(table);
+  const on = TABLES[table].key.map(k => `d.${k} = s.${k}`).join(' AND ');
+  const { rowCount } = await client.query(
+    `DELETE FROM ${stage} s USING ${stage} d WHERE ${on} AND d._line > s._line`
+  );
+  return rowCount;
+}
+
+async function quarantineOrphans(client, options, quarantine) {
+  const orphans = { orders: 0, order_details: 0, stubCustomers: 0 };
+
+  const missingCustomers = `
+    o.customerid IS NOT NULL
+    AND NOT EXISTS (SELECT 1 FROM loft_stage_customers c WHERE c.customerid = o.customerid)
+    AND NOT EXISTS (SELECT 1 FROM customers c WHERE c.customerid = o.customerid)`;
+
+  if (options.missingCustomers === 'stub') {
+    // LOFT order exports routinely reference customers outside the customer export window;
+    // keep the order and add a key-only customer, as the analytics seed does
+    const { rowCount } = await client.query(`
+      INSERT INTO loft_stage_customers (customerid, _line)
+      SELECT DISTINCT o.customerid, 0 FROM loft_stage_orders o WHERE ${missingCustomers}`);
+    orphans.stubCustomers = rowCount;
+  } else {
+    const { rows } = await client.query(`
+      DELETE FROM loft_stage_orders o WHERE ${missingCustomers}
+      RETURNING o._line, o.orderid, o.customerid`);
+    for (const row of rows) quarantine.write('orders', row._line, `unknown customerid ${row.customerid}`, [row.orderid]);
+    orphans.orders = rows.length;
+  }
+
+  const { rows } = await client.query(`
+    DELETE FROM loft_stage_order_details d
+    WHERE NOT EXISTS (SELECT 1 FROM loft_stage_orders o WHERE o.orderid = d.orderid)
+      AND NOT EXISTS (SELECT 1 FROM orders o WHERE o.orderid = d.orderid)
+    RETURNING d._line, d.orderid, d.lineid`);
+  for (const row of rows) quarantine.write('order_details', row._line, `unknown orderid ${row.orderid}`, [row.orderid, row.lineid]);
+  orphans.order_details = rows.length;
+
+  return orphans;
+}
+
+function upsertSql(table, columns) {
+  const key = TABLES[table].key;
+  const updates = columns.filter(c => !key.includes(c)).map(c => `${c} = EXCLUDED.${c}`);
+  return `
+    INSERT INTO ${table} (${columns.join(', ')})
+    SELECT ${columns.join(', ')} FROM ${stageName(table)}
+    ON CONFLICT (${key.join(', ')}) DO UPDATE SET ${updates.join(', ')}`;
+}
+
+// One transaction: customers, orders, then replace the lines of every re-exported order
+async function publish(client, staged) {
+  await client.query('BEGIN');
+  try {
+    await client.query(`SET LOCAL analytics.defer_refresh = 'on'`);
+    const customers = await client.query(upsertSql('customers', staged.customers.columns));
+    const orders = await client.query(upsertSql('orders', staged.orders.columns));
+    // Co-purchase counters follow both statements incrementally (delete and insert triggers)
+    const removed = await client.query(`
+      DELETE FROM order_details od USING (SELECT DISTINCT orderid FROM loft_stage_order_details) s
+      WHERE od.orderid = s.orderid`);
+    const detailColumns = staged.order_details.columns.join(', ');
+    const details = await client.query(`
+      INSERT INTO order_details (${detailColumns})
+      SELECT ${detailColumns} FROM loft_stage_order_details ORDER BY orderid, lineid`);
+
+    const { rows: [refresh] } = await client.query('SELECT refresh_customer_analytics() AS customers');
+    const { rows: [profiles] } = await client.query('SELECT refresh_customer_360() AS customers');
+
+    await client.query('COMMIT');
+    return {
+      customers: customers.rowCount,
+      orders: orders.rowCount,
+      order_details: details.rowCount,
+      replacedLines: removed.rowCount,
+      analyticsRefreshed: refresh.customers,
+      profilesRefreshed: profiles.customers
+    };
+  } catch (error) {
+    await client.query('ROLLBACK').catch(() => {});
+    throw error;
+  }
+}
+
+async function dropStages(pool) {
+  await pool.query(Object.keys(TABLES).map(t => `DROP TABLE IF EXISTS ${stageName(t)};`).join('\n'));
+}
+
+async function main() {
+  const options = parseArgs(process.argv.slice(2));
+  for (const { option } of Object.values(TABLES)) {
+    if (!options[option]) throw new Error(`No ${option} CSV given (use --${option} or --dir)`);
+  }
+
+  const specs = loadTableSpecs();
+  const quarantine = openQuarantine(options.quarantine);
+  const started = performance.now();
+
+  if (options.dryRun) {
+    // Validate only: stream every file through the normalizer without touching the database
+    for (const [table, { option }] of Object.entries(TABLES)) {
+      const stats = { read: 0, staged: 0, rejected: 0, sentinelDates: 0 };
+      for await (const _ of copyChunks(table, specs[table], options[option], options, quarantine, stats)) { /* discard */ }
+      console.log(`🔍 ${table}: ${stats.staged}/${stats.read} rows valid, ${stats.rejected} rejected, ${stats.sentinelDates} sentinel dates nulled`);
+    }
+    await quarantine.close();
+    console.log(`✅ Dry run finished in ${Math.round(performance.now() - started)}ms; rejects in ${options.quarantine}`);
+    return;
+  }
+
+  const pool = new pg.Pool({
+    connectionString: process.env.DATABASE_URL,
+    ssl: process.env.PGSSLMODE === 'disable' ? false : { rejectUnauthorized: false },
+    max: Object.keys(TABLES).length
+  });
+
+  try {
+    const staged = Object.fromEntries(await Promise.all(Object.entries(TABLES).map(async ([table, { option }]) => (
+      [table, await stageTable(pool, table, specs[table], options[option], options, quarantine)]
+    ))));
+
+    const client = await pool.connect();
+    let result;
+    try {
+      for (const table of Object.keys(TABLES)) {
+        const duplicates = await dedupeStage(client, table);
+        if (duplicates) console.log(`🔄 ${table}: ${duplicates} duplicate keys collapsed (last line wins)`);
+      }
+      const orphans = await quarantineOrphans(client, options, quarantine);
+      console.log(`📊 Orphans: ${orphans.orders} orders, ${orphans.order_details} order lines quarantined; ${orphans.stubCustomers} stub customers`);
+
+      const publishStart = performance.now();
+      result = await publish(client, staged);
+      console.log(`✅ Published in ${Math.round(performance.now() - publishStart)}ms:`, result);
+    } finally {
+      client.release();
+    }
+
+    await dropStages(pool);
+    console.log(`✅ LOFT ingest finished in ${Math.round(performance.now() - started)}ms; ${quarantine.count} rows quarantined in ${options.quarantine}`);
+  } finally {
+    await quarantine.close();
+    await pool.end();
+  }
+}
+
+main().catch((error) => {
+  console.error('❌ LOFT ingest failed:', error.message);
+  process.exitCode = 1;
+});
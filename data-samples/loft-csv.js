@@ -0,0 +1,195 @@
+// loft-csv.js
+// Streaming CSV parsing + per-column validation/normalization for the LOFT exports.
+// Column types come from woodstock_outlet_database.sql, so the schema stays the single source of truth.
+
+import fs from 'fs';
+
+const SCHEMA_PATH = new URL('./woodstock_outlet_database.sql', import.meta.url);
+
+// LOFT uses far-future/far-past placeholders ("3333-03-03", "1900-01-01") for "no date"
+const MIN_REAL_YEAR = 1901;
+const MAX_REAL_YEAR = 2199;
+
+const TIMESTAMP_RE = /^(\d{4})-(\d{2})-(\d{2})(?:[ T](\d{2}):(\d{2})(?::(\d{2})(\.\d+)?)?)?$/;
+const TRUE_VALUES = new Set(['Y', 'YES', 'T', 'TRUE', '1']);
+const FALSE_VALUES = new Set(['N', 'NO', 'F', 'FALSE', '0']);
+
+// { table: { columns: [{ name, type, maxLength, precision, scale, required }] } } from CREATE TABLE blocks
+function loadTableSpecs(schemaSql = fs.readFileSync(SCHEMA_PATH, 'utf8'), tables = ['customers', 'orders', 'order_details']) {
+  const specs = {};
+  for (const table of tables) {
+    const match = schemaSql.match(new RegExp(`CREATE TABLE ${table} \\(([\\s\\S]*?)\\n\\);`));
+    if (!match) throw new Error(`Table ${table} not found in schema`);
+    const columns = [];
+    for (const rawLine of match[1].split('\n')) {
+      const line = rawLine.trim();
+      if (!line || line.startsWith('--') || /^(PRIMARY|UNIQUE|FOREIGN|CONSTRAINT)\b/i.test(line)) continue;
+      const [name, typeToken] = line.split(/\s+/);
+      const type = typeToken.toUpperCase();
+      if (type === 'SERIAL') continue; // generated
+      const column = { name, type: 'text', required: /PRIMARY KEY/i.test(line) };
+      let m;
+      if ((m = type.match(/^VARCHAR\((\d+)\)/))) column.maxLength = Number(m[1]);
+      else if (type.startsWith('INTEGER')) column.type = 'int';
+      else if ((m = type.match(/^DECIMAL\((\d+),(\d+)\)/))) Object.assign(column, { type: 'decimal', precision: Number(m[1]), scale: Number(m[2]) });
+      else if (type.startsWith('TIMESTAMP')) column.type = 'timestamp';
+      else if (type.startsWith('BOOLEAN')) column.type = 'bool';
+      columns.push(column);
+    }
+    specs[table] = { table, columns, primaryKey: columns.filter(c => c.required).map(c => c.name) };
+  }
+  return specs;
+}
+
+// RFC 4180 records from a text stream; chunk boundaries may fall anywhere, including inside quotes
+const FIELD_START = 0;
+const UNQUOTED = 1;
+const QUOTED = 2;
+const QUOTE_IN_QUOTED = 3;
+
+async function* parseCsv(input) {
+  let state = FIELD_START;
+  let field = '';
+  let record = [];
+
+  for await (const chunk of input) {
+    const text = typeof chunk === 'string' ? chunk : chunk.toString('utf8');
+    for (let i = 0; i < text.length; i++) {
+      const ch = text[i];
+      if (state === QUOTED) {
+        if (ch === '"') state = QUOTE_IN_QUOTED;
+        else field += ch;
+        continue;
+      }
+      if (state === QUOTE_IN_QUOTED && ch === '"') {
+        field += '"';
+        state = QUOTED;
+        continue;
+      }
+      if (ch === ',') {
+        record.push(field);
+        field = '';
+        state = FIELD_START;
+      } else if (ch === '\n') {
+        if (state !== FIELD_START || record.length > 0) {
+          record.push(field);
+          yield record;
+        }
+        record = [];
+        field = '';
+        state = FIELD_START;
+      } else if (ch === '\r') {
+        // CRLF line endings: the \n does the work
+      } else if (ch === '"' && state === FIELD_START) {
+        state = QUOTED;
+      } else {
+        field += ch;
+        state = UNQUOTED;
+      }
+    }
+  }
+
+  if (state !== FIELD_START || record.length > 0) {
+    record.push(field);
+    yield record;
+  }
+}
+
+class RowError extends Error {}
+
+function normalizeValue(column, raw, stats) {
+  const value = raw.trim();
+  if (value === '') {
+    if (column.required) throw new RowError(`${column.name} is required`);
+    return null;
+  }
+
+  switch (column.type) {
+    case 'timestamp': {
+      const m = value.match(TIMESTAMP_RE);
+      if (!m) throw new RowError(`${column.name}: invalid timestamp "${value}"`);
+      const year = Number(m[1]);
+      if (year < MIN_REAL_YEAR || year > MAX_REAL_YEAR) {
+        stats.sentinelDates = (stats.sentinelDates || 0) + 1;
+        return null;
+      }
+      const month = Number(m[2]);
+      const day = Number(m[3]);
+      const date = new Date(Date.UTC(year, month - 1, day));
+      if (date.getUTCMonth() !== month - 1 || date.getUTCDate() !== day) {
+        throw new RowError(`${column.name}: invalid date "${value}"`);
+      }
+      return value;
+    }
+    case 'bool': {
+      const upper = value.toUpperCase();
+      if (TRUE_VALUES.has(upper)) return 't';
+      if (FALSE_VALUES.has(upper)) return 'f';
+      throw new RowError(`${column.name}: invalid boolean "${value}"`);
+    }
+    case 'int': {
+      const n = Number(value.replace(/,/g, ''));
+      if (!Number.isInteger(n) || Math.abs(n) > 2147483647) {
+        throw new RowError(`${column.name}: invalid integer "${value}"`);
+      }
+      return String(n);
+    }
+    case 'decimal': {
+      const cleaned = value.replace(/[$,\s]/g, '');
+      if (!/^[-+]?(\d+\.?\d*|\.\d+)$/.test(cleaned)) {
+        throw new RowError(`${column.name}: invalid number "${value}"`);
+      }
+      const n = Number(cleaned);
+      if (Math.abs(n) >= 10 ** (column.precision - column.scale)) {
+        throw new RowError(`${column.name}: ${value} overflows DECIMAL(${column.precision},${column.scale})`);
+      }
+      return cleaned;
+    }
+    default:
+      if (column.maxLength && raw.length > column.maxLength) {
+        throw new RowError(`${column.name}: longer than ${column.maxLength} characters`);
+      }
+      return raw;
+  }
+}
+
+// Resolve the file's header against the table spec; unknown headers are an error for the whole file
+function bindHeader(spec, header) {
+  const byName = new Map(spec.columns.map(c => [c.name, c]));
+  const columns = header.map(name => {
+    const column = byName.get(name.trim().toLowerCase());
+    if (!column) throw new Error(`${spec.table}: unknown column "${name}" in CSV header`);
+    return column;
+  });
+  return columns;
+}
+
+// -> { values } or { error } for one record
+function normalizeRecord(columns, record, stats) {
+  if (record.length !== columns.length) {
+    return { error: `expected ${columns.length} fields, got ${record.length}` };
+  }
+  try {
+    return { values: columns.map((column, i) => normalizeValue(column, record[i], stats)) };
+  } catch (error) {
+    if (error instanceof RowError) return { error: error.message };
+    throw error;
+  }
+}
+
+// One line of COPY ... (FORMAT text)
+function toCopyLine(values) {
+  return values.map(value => (value === null
+    ? '\\N'
+    : value.replace(/\\/g, '\\\\').replace(/\t/g, '\\t').replace(/\n/g, '\\n').replace(/\r/g, '\\r')
+  )).join('\t') + '\n';
+}
+
+function toCsvLine(fields) {
+  return fields.map(field => {
+    const text = String(field ?? '');
+    return /[",\r\n]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text;
+  }).join(',') + '\n';
+}
+
+export { loadTableSpecs, parseCsv, bindHeader, normalizeRecord, toCopyLine, toCsvLine };
@@ -21,7 +21,7 @@ CREATE TABLE customers (
     lastname VARCHAR(100),
     phonenumber VARCHAR(20),
     businessphone VARCHAR(20),
-    extension VARCHAR(10),
+    extension VARCHAR(50),
     address1 VARCHAR(255),
     address2 VARCHAR(255),
     city VARCHAR(100),
@@ -55,8 +55,8 @@ CREATE TABLE orders (
     ordersiteid VARCHAR(10),
     salesperson1 VARCHAR(50),
     salesperson2 VARCHAR(50),
-    percentofsale1 DECIMAL(5,3),
-    percentofsale2 DECIMAL(5,3),
+    percentofsale1 DECIMAL(6,3),
+    percentofsale2 DECIMAL(6,3),
     fromsiteid VARCHAR(10),
     deliverytype VARCHAR(10),
     deliverydate TIMESTAMP,
@@ -86,10 +86,10 @@ CREATE TABLE orders (
     shipstate VARCHAR(10),
     shipzipcode VARCHAR(20),
     shipcountryid VARCHAR(10),
-    shipzoneid VARCHAR(20),
+    shipzoneid VARCHAR(100),
     shipphonenumber VARCHAR(20),
     shipbusinessphone VARCHAR(20),
-    shipextension VARCHAR(10),
+    shipextension VARCHAR(50),
     shipemail VARCHAR(255),
     closedby VARCHAR(50),
     createdby VARCHAR(50),
@@ -142,8 +142,8 @@ CREATE TABLE order_details (
     packageid VARCHAR(50),
     salesperson1 VARCHAR(50),
     salesperson2 VARCHAR(50),
-    percentofsale1 DECIMAL(5,3),
-    percentofsale2 DECIMAL(5,3),
+    percentofsale1 DECIMAL(6,3),
+    percentofsale2 DECIMAL(6,3),
     picked BOOLEAN DEFAULT FALSE,
     upcharge DECIMAL(10,2),
     discount DECIMAL(10,2),
@@ -157,8 +157,8 @@ CREATE TABLE order_details (
     takenwith BOOLEAN DEFAULT FALSE,
     setup BOOLEAN DEFAULT FALSE,
     pickupdiscount DECIMAL(10,2),
-    setupcommission DECIMAL(10,2),
-    deliverycommission DECIMAL(10,2),
+    setupcommission BOOLEAN DEFAULT FALSE,
+    deliverycommission BOOLEAN DEFAULT FALSE,
     taxruleid VARCHAR(20),
     taxliability DECIMAL(10,2),
     taxbasis DECIMAL(10,2),
@@ -179,7 +179,7 @@ CREATE TABLE order_details (
     autoadjusteduid VARCHAR(50),
     autoadjustedvoided BOOLEAN DEFAULT FALSE,
     storecardloaded BOOLEAN DEFAULT FALSE,
-    addedbyapp BOOLEAN DEFAULT FALSE,
+    addedbyapp TIMESTAMP,
     interfacedforsalescube BOOLEAN DEFAULT FALSE,
     interfacedforforecasting BOOLEAN DEFAULT FALSE,
     auditaction VARCHAR(10),
@@ -213,6 +213,28 @@ CREATE TABLE customer_analytics (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Customer 360: one pre-joined, normalized profile per customer for chatbot/inbox identification.
+-- phone_e164/email_norm are indexed lookup keys; maintained by refresh_customer_360().
+CREATE TABLE customer_360 (
+    customerid VARCHAR(20) PRIMARY KEY REFERENCES customers(customerid),
+    full_name VARCHAR(255),
+    phone_e164 VARCHAR(20),
+    business_phone_e164 VARCHAR(20),
+    email_norm VARCHAR(255),
+    city VARCHAR(100),
+    state VARCHAR(10),
+    zipcode VARCHAR(20),
+    noemail BOOLEAN DEFAULT FALSE,
+    total_orders INTEGER DEFAULT 0,
+    total_spent DECIMAL(12,2) DEFAULT 0,
+    loyalty_tier VARCHAR(20),
+    last_order_date TIMESTAMP,
+    days_since_last_order INTEGER,
+    open_orders INTEGER DEFAULT 0,
+    last_order JSONB,
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Product Analytics
 CREATE TABLE product_analytics (
     productid VARCHAR(50) PRIMARY KEY,
@@ -227,16 +249,20 @@ CREATE TABLE product_analytics (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Purchase Patterns
-CREATE TABLE purchase_patterns (
-    id SERIAL PRIMARY KEY,
-    customerid VARCHAR(20) REFERENCES customers(customerid),
-    productid VARCHAR(50),
-    companion_productid VARCHAR(50),
-    companion_product_name VARCHAR(255),
-    frequency INTEGER DEFAULT 1,
-    confidence_score DECIMAL(5,2),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+-- Co-purchase counts, maintained incrementally per loaded batch (see update_purchase_patterns
+-- and remove_purchase_patterns).
+-- Orders containing each product (the confidence denominator)
+CREATE TABLE product_order_counts (
+    productid VARCHAR(50) PRIMARY KEY,
+    order_count INTEGER NOT NULL DEFAULT 0
+);
+
+-- Orders containing both products, stored in both directions
+CREATE TABLE product_pair_counts (
+    productid VARCHAR(50) NOT NULL,
+    companion_productid VARCHAR(50) NOT NULL,
+    pair_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (productid, companion_productid)
 );
 
 -- =====================================================
@@ -304,6 +330,13 @@ CREATE INDEX idx_customer_analytics_loyalty ON customer_analytics(loyalty_tier);
 CREATE INDEX idx_customer_analytics_risk ON customer_analytics(risk_score);
 CREATE INDEX idx_product_analytics_category ON product_analytics(category);
 
+-- Customer 360 identification keys
+CREATE INDEX idx_customer_360_phone ON customer_360(phone_e164);
+CREATE INDEX idx_customer_360_business_phone ON customer_360(business_phone_e164);
+CREATE INDEX idx_customer_360_email ON customer_360(email_norm);
+-- "Frequently bought together": top companions of one product straight off the index
+CREATE INDEX idx_product_pair_counts_top ON product_pair_counts(productid, pair_count DESC);
+
 -- Campaign triggers indexes
 CREATE INDEX idx_campaign_triggers_status ON campaign_triggers(status);
 CREATE INDEX idx_campaign_triggers_type ON campaign_triggers(trigger_type);
@@ -312,10 +345,33 @@ CREATE INDEX idx_campaign_triggers_type ON campaign_triggers(trigger_type);
 -- FUNCTIONS FOR AUTOMATION
 -- =====================================================
 
--- Function to update customer analytics
-CREATE OR REPLACE FUNCTION update_customer_analytics()
-RETURNS TRIGGER AS $$
+-- Customers whose analytics are out of date. Filled by statement-level triggers, drained by
+-- refresh_customer_analytics(), so a load recomputes each affected customer once.
+CREATE TABLE customer_analytics_pending (
+    customerid VARCHAR(20) PRIMARY KEY
+);
+
+-- Recompute customer_analytics for every pending customer in one set-based statement.
+-- Order value = sum of non-voided order lines.
+CREATE OR REPLACE FUNCTION refresh_customer_analytics()
+RETURNS INTEGER AS $$
+DECLARE
+    refreshed INTEGER;
 BEGIN
+    WITH batch AS (
+        DELETE FROM customer_analytics_pending RETURNING customerid
+    ),
+    order_totals AS (
+        SELECT
+            o.customerid,
+            o.orderid,
+            o.orderdate,
+            COALESCE(SUM(od.itemprice * od.qtyordered) FILTER (WHERE od.voided IS NOT TRUE), 0) AS order_total
+        FROM orders o
+        LEFT JOIN order_details od ON od.orderid = o.orderid
+        WHERE o.customerid IN (SELECT customerid FROM batch)
+        GROUP BY o.customerid, o.orderid, o.orderdate
+    )
     INSERT INTO customer_analytics (
         customerid,
         total_orders,
@@ -328,71 +384,411 @@ BEGIN
     )
     SELECT 
         c.customerid,
-        COUNT(o.orderid) as total_orders,
-        COALESCE(SUM(o.sum::DECIMAL), 0) as total_spent,
-        MIN(o.orderdate) as first_order_date,
-        MAX(o.orderdate) as last_order_date,
-        COALESCE(AVG(o.sum::DECIMAL), 0) as average_order_value,
+        COUNT(t.orderid) as total_orders,
+        COALESCE(SUM(t.order_total), 0) as total_spent,
+        MIN(t.orderdate) as first_order_date,
+        MAX(t.orderdate) as last_order_date,
+        COALESCE(AVG(t.order_total), 0) as average_order_value,
         CASE 
-            WHEN COALESCE(SUM(o.sum::DECIMAL), 0) >= 5000 THEN 'PLATINUM'
-            WHEN COALESCE(SUM(o.sum::DECIMAL), 0) >= 2000 THEN 'GOLD'
-            WHEN COALESCE(SUM(o.sum::DECIMAL), 0) >= 500 THEN 'SILVER'
+            WHEN COALESCE(SUM(t.order_total), 0) >= 5000 THEN 'PLATINUM'
+            WHEN COALESCE(SUM(t.order_total), 0) >= 2000 THEN 'GOLD'
+            WHEN COALESCE(SUM(t.order_total), 0) >= 500 THEN 'SILVER'
             ELSE 'BRONZE'
         END as loyalty_tier,
-        EXTRACT(DAY FROM (CURRENT_TIMESTAMP - MAX(o.orderdate))) as days_since_last_order
+        EXTRACT(DAY FROM (CURRENT_TIMESTAMP - MAX(t.orderdate))) as days_since_last_order
     FROM customers c
-    LEFT JOIN orders o ON c.customerid = o.customerid
-    WHERE c.customerid = NEW.customerid
+    JOIN (SELECT DISTINCT customerid FROM batch) b ON b.customerid = c.customerid
+    LEFT JOIN order_totals t ON t.customerid = c.customerid
     GROUP BY c.customerid
     ON CONFLICT (customerid) DO UPDATE SET
         total_orders = EXCLUDED.total_orders,
         total_spent = EXCLUDED.total_spent,
+        first_order_date = EXCLUDED.first_order_date,
         last_order_date = EXCLUDED.last_order_date,
         average_order_value = EXCLUDED.average_order_value,
         loyalty_tier = EXCLUDED.loyalty_tier,
         days_since_last_order = EXCLUDED.days_since_last_order,
         updated_at = CURRENT_TIMESTAMP;
     
-    RETURN NEW;
+    GET DIAGNOSTICS refreshed = ROW_COUNT;
+    RETURN refreshed;
 END;
 $$ LANGUAGE plpgsql;
 
--- Trigger to update customer analytics when orders change
+-- Statement-level trigger body: queue the distinct customers touched by the statement
+-- (transition tables new_rows/old_rows), then refresh them once. Updates queue both the old and
+-- the new customer, so a line moved to another order or an order moved to another customer
+-- corrects both. Bulk loads set analytics.defer_refresh = 'on' and call
+-- refresh_customer_analytics() after the last COPY.
+CREATE OR REPLACE FUNCTION update_customer_analytics()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'order_details' THEN
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO customer_analytics_pending (customerid)
+            SELECT DISTINCT o.customerid
+            FROM new_rows d
+            JOIN orders o ON o.orderid = d.orderid
+            WHERE o.customerid IS NOT NULL
+            ON CONFLICT DO NOTHING;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            INSERT INTO customer_analytics_pending (customerid)
+            SELECT DISTINCT o.customerid
+            FROM old_rows d
+            JOIN orders o ON o.orderid = d.orderid
+            WHERE o.customerid IS NOT NULL
+            ON CONFLICT DO NOTHING;
+        END IF;
+    ELSE
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO customer_analytics_pending (customerid)
+            SELECT DISTINCT customerid
+            FROM new_rows
+            WHERE customerid IS NOT NULL
+            ON CONFLICT DO NOTHING;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            INSERT INTO customer_analytics_pending (customerid)
+            SELECT DISTINCT customerid
+            FROM old_rows
+            WHERE customerid IS NOT NULL
+            ON CONFLICT DO NOTHING;
+        END IF;
+    END IF;
+    
+    IF current_setting('analytics.defer_refresh', true) IS DISTINCT FROM 'on' THEN
+        PERFORM refresh_customer_analytics();
+    END IF;
+    
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Triggers to update customer analytics when customers, orders or order lines change. Transition
+-- tables allow only one event per trigger, hence one trigger per event. Voiding, repricing or
+-- deleting a line changes total_spent as much as adding one does.
 CREATE TRIGGER trigger_update_customer_analytics
-    AFTER INSERT OR UPDATE ON orders
-    FOR EACH ROW
+    AFTER INSERT ON orders
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION update_customer_analytics();
+
+CREATE TRIGGER trigger_update_customer_analytics_on_update
+    AFTER UPDATE ON orders
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION update_customer_analytics();
+
+CREATE TRIGGER trigger_update_customer_analytics_on_delete
+    AFTER DELETE ON orders
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION update_customer_analytics();
+
+CREATE TRIGGER trigger_update_customer_analytics_on_lines
+    AFTER INSERT ON order_details
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
     EXECUTE FUNCTION update_customer_analytics();
 
--- Function to detect purchase patterns
-CREATE OR REPLACE FUNCTION detect_purchase_patterns()
+CREATE TRIGGER trigger_update_customer_analytics_on_line_update
+    AFTER UPDATE ON order_details
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION update_customer_analytics();
+
+CREATE TRIGGER trigger_update_customer_analytics_on_line_delete
+    AFTER DELETE ON order_details
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION update_customer_analytics();
+
+CREATE TRIGGER trigger_update_customer_analytics_on_customers
+    AFTER INSERT ON customers
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION update_customer_analytics();
+
+-- Phone numbers are stored as typed ("678-326-9777", "(770) 555-0101 x2"); VAPI and SMS use
+-- E.164. US numbers only: 10 digits, or 11 starting with 1. Anything else is not a lookup key.
+CREATE OR REPLACE FUNCTION normalize_phone_e164(phone TEXT)
+RETURNS TEXT AS $$
+    SELECT CASE
+        WHEN d ~ '^[2-9][0-9]{9}$' THEN '+1' || d
+        WHEN d ~ '^1[2-9][0-9]{9}$' THEN '+' || d
+    END
+    FROM (SELECT regexp_replace(split_part(lower(COALESCE(phone, '')), 'x', 1), '[^0-9]', '', 'g') AS d) digits;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION normalize_email(email TEXT)
+RETURNS TEXT AS $$
+    SELECT CASE WHEN btrim(email) LIKE '%_@_%' THEN lower(btrim(email)) END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Customers whose customer_360 row is out of date (same pattern as customer_analytics_pending)
+CREATE TABLE customer_360_pending (
+    customerid VARCHAR(20) PRIMARY KEY
+);
+
+-- Rebuild the customer_360 rows of every pending customer in one statement
+CREATE OR REPLACE FUNCTION refresh_customer_360()
+RETURNS INTEGER AS $$
+DECLARE
+    refreshed INTEGER;
+BEGIN
+    WITH batch AS (
+        DELETE FROM customer_360_pending RETURNING customerid
+    )
+    INSERT INTO customer_360 (
+        customerid, full_name, phone_e164, business_phone_e164, email_norm,
+        city, state, zipcode, noemail, total_orders, total_spent, loyalty_tier,
+        last_order_date, days_since_last_order, open_orders, last_order, refreshed_at
+    )
+    SELECT
+        c.customerid,
+        NULLIF(btrim(concat_ws(' ', c.firstname, c.lastname)), ''),
+        normalize_phone_e164(c.phonenumber),
+        normalize_phone_e164(c.businessphone),
+        normalize_email(c.email),
+        c.city,
+        c.state,
+        c.zipcode,
+        c.noemail,
+        COALESCE(ca.total_orders, 0),
+        COALESCE(ca.total_spent, 0),
+        ca.loyalty_tier,
+        ca.last_order_date,
+        ca.days_since_last_order,
+        COALESCE(oo.open_orders, 0),
+        lo.last_order,
+        CURRENT_TIMESTAMP
+    FROM customers c
+    JOIN (SELECT DISTINCT customerid FROM batch) b ON b.customerid = c.customerid
+    LEFT JOIN customer_analytics ca ON ca.customerid = c.customerid
+    LEFT JOIN LATERAL (
+        SELECT COUNT(*) AS open_orders
+        FROM orders o
+        WHERE o.customerid = c.customerid AND o.status IN ('O', 'F')
+    ) oo ON true
+    LEFT JOIN LATERAL (
+        SELECT jsonb_build_object(
+            'orderid', o.orderid,
+            'orderdate', o.orderdate,
+            'status', o.status,
+            'deliverydate', o.deliverydate
+        ) AS last_order
+        FROM orders o
+        WHERE o.customerid = c.customerid
+        ORDER BY o.orderdate DESC NULLS LAST
+        LIMIT 1
+    ) lo ON true
+    ON CONFLICT (customerid) DO UPDATE SET
+        full_name = EXCLUDED.full_name,
+        phone_e164 = EXCLUDED.phone_e164,
+        business_phone_e164 = EXCLUDED.business_phone_e164,
+        email_norm = EXCLUDED.email_norm,
+        city = EXCLUDED.city,
+        state = EXCLUDED.state,
+        zipcode = EXCLUDED.zipcode,
+        noemail = EXCLUDED.noemail,
+        total_orders = EXCLUDED.total_orders,
+        total_spent = EXCLUDED.total_spent,
+        loyalty_tier = EXCLUDED.loyalty_tier,
+        last_order_date = EXCLUDED.last_order_date,
+        days_since_last_order = EXCLUDED.days_since_last_order,
+        open_orders = EXCLUDED.open_orders,
+        last_order = EXCLUDED.last_order,
+        refreshed_at = EXCLUDED.refreshed_at;
+    
+    GET DIAGNOSTICS refreshed = ROW_COUNT;
+    -- Inbox servers cache profiles; delivered at commit, so they never refetch ahead of the data
+    IF refreshed > 0 THEN
+        PERFORM pg_notify('customer_360_changed', refreshed::text);
+    END IF;
+    RETURN refreshed;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Queue customers whose profile changed (customers) or whose aggregates were recomputed
+-- (customer_analytics, which already follows orders and order lines). Honors
+-- analytics.defer_refresh like the analytics trigger.
+CREATE OR REPLACE FUNCTION update_customer_360()
 RETURNS TRIGGER AS $$
 BEGIN
-    -- Insert companion product patterns
-    INSERT INTO purchase_patterns (customerid, productid, companion_productid, companion_product_name, frequency, confidence_score)
-    SELECT 
-        od1.orderid,
-        od1.productid,
-        od2.productid as companion_productid,
-        od2.description as companion_product_name,
-        COUNT(*) as frequency,
-        (COUNT(*) * 100.0 / (SELECT COUNT(*) FROM order_details WHERE orderid = od1.orderid)) as confidence_score
-    FROM order_details od1
-    JOIN order_details od2 ON od1.orderid = od2.orderid AND od1.productid != od2.productid
-    WHERE od1.orderid = NEW.orderid
-    GROUP BY od1.orderid, od1.productid, od2.productid, od2.description
-    ON CONFLICT (customerid, productid, companion_productid) DO UPDATE SET
-        frequency = EXCLUDED.frequency,
-        confidence_score = EXCLUDED.confidence_score;
+    INSERT INTO customer_360_pending (customerid)
+    SELECT DISTINCT customerid
+    FROM new_rows
+    WHERE customerid IS NOT NULL
+    ON CONFLICT DO NOTHING;
+    
+    IF current_setting('analytics.defer_refresh', true) IS DISTINCT FROM 'on' THEN
+        PERFORM refresh_customer_360();
+    END IF;
     
-    RETURN NEW;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
--- Trigger to detect patterns when order details are added
+CREATE TRIGGER trigger_update_customer_360_on_update
+    AFTER UPDATE ON customers
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION update_customer_360();
+
+CREATE TRIGGER trigger_update_customer_360_on_analytics
+    AFTER INSERT ON customer_analytics
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION update_customer_360();
+
+CREATE TRIGGER trigger_update_customer_360_on_analytics_update
+    AFTER UPDATE ON customer_analytics
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION update_customer_360();
+
+-- Statement-level co-purchase maintenance: for the order lines added by one statement
+-- (transition table new_rows), count each product once per order and every product pair
+-- that became new in an order. O(lines in the batch x lines of the touched orders),
+-- once per COPY instead of a self-join per inserted row.
+CREATE OR REPLACE FUNCTION update_purchase_patterns()
+RETURNS TRIGGER AS $$
+BEGIN
+    WITH batch AS (
+        -- Distinct products per touched order, flagged if this statement added them
+        -- (already-present lines are the order's rows that are not in new_rows; an anti-join,
+        -- since NOT IN over a transition table past work_mem degrades to a per-row rescan)
+        SELECT orderid, productid, bool_and(is_new) AS is_new
+        FROM (
+            SELECT od.orderid, od.productid, false AS is_new
+            FROM order_details od
+            WHERE od.orderid IN (SELECT orderid FROM new_rows)
+            AND NOT EXISTS (SELECT 1 FROM new_rows n WHERE n.id = od.id)
+            AND od.voided IS NOT TRUE
+            UNION ALL
+            SELECT orderid, productid, true
+            FROM new_rows
+            WHERE voided IS NOT TRUE
+        ) lines
+        WHERE productid IS NOT NULL
+        GROUP BY orderid, productid
+    ),
+    order_counts AS (
+        INSERT INTO product_order_counts (productid, order_count)
+        SELECT productid, COUNT(*)
+        FROM batch
+        WHERE is_new
+        GROUP BY productid
+        ON CONFLICT (productid) DO UPDATE SET
+            order_count = product_order_counts.order_count + EXCLUDED.order_count
+    )
+    -- Pairs not seen in that order before: at least one side is new
+    INSERT INTO product_pair_counts (productid, companion_productid, pair_count)
+    SELECT a.productid, b.productid, COUNT(*)
+    FROM batch a
+    JOIN batch b ON b.orderid = a.orderid AND b.productid <> a.productid
+    WHERE a.is_new OR b.is_new
+    GROUP BY a.productid, b.productid
+    ON CONFLICT (productid, companion_productid) DO UPDATE SET
+        pair_count = product_pair_counts.pair_count + EXCLUDED.pair_count;
+    
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger to update co-purchase counts once per statement that adds order details
 CREATE TRIGGER trigger_detect_purchase_patterns
     AFTER INSERT ON order_details
-    FOR EACH ROW
-    EXECUTE FUNCTION detect_purchase_patterns();
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION update_purchase_patterns();
+
+-- Statement-level reverse of update_purchase_patterns for deleted order lines (transition table
+-- old_rows): a product leaves an order only when none of its lines remain, and a pair stops
+-- counting when either side left. Row locks on the touched counters only, so replacing the
+-- lines of re-exported orders (delete, then insert) nets out without a recount.
+CREATE OR REPLACE FUNCTION remove_purchase_patterns()
+RETURNS TRIGGER AS $$
+BEGIN
+    WITH batch AS (
+        -- Distinct products per touched order before the delete, flagged if they are now gone
+        SELECT orderid, productid, bool_and(is_removed) AS is_removed
+        FROM (
+            SELECT od.orderid, od.productid, false AS is_removed
+            FROM order_details od
+            WHERE od.orderid IN (SELECT orderid FROM old_rows)
+            AND od.voided IS NOT TRUE
+            UNION ALL
+            SELECT orderid, productid, true
+            FROM old_rows
+            WHERE voided IS NOT TRUE
+        ) lines
+        WHERE productid IS NOT NULL
+        GROUP BY orderid, productid
+    ),
+    order_counts AS (
+        UPDATE product_order_counts poc
+        SET order_count = poc.order_count - r.orders
+        FROM (
+            SELECT productid, COUNT(*) AS orders
+            FROM batch
+            WHERE is_removed
+            GROUP BY productid
+        ) r
+        WHERE poc.productid = r.productid
+    )
+    UPDATE product_pair_counts ppc
+    SET pair_count = ppc.pair_count - r.pairs
+    FROM (
+        SELECT a.productid, b.productid AS companion_productid, COUNT(*) AS pairs
+        FROM batch a
+        JOIN batch b ON b.orderid = a.orderid AND b.productid <> a.productid
+        WHERE a.is_removed OR b.is_removed
+        GROUP BY a.productid, b.productid
+    ) r
+    WHERE ppc.productid = r.productid AND ppc.companion_productid = r.companion_productid;
+    
+    -- Counters that reached zero would read as 0% recommendations
+    DELETE FROM product_pair_counts
+    WHERE pair_count <= 0
+    AND (productid IN (SELECT productid FROM old_rows) OR companion_productid IN (SELECT productid FROM old_rows));
+    DELETE FROM product_order_counts
+    WHERE order_count <= 0
+    AND productid IN (SELECT productid FROM old_rows);
+    
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_remove_purchase_patterns
+    AFTER DELETE ON order_details
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION remove_purchase_patterns();
+
+-- Full recount, for voids (not tracked incrementally) or a first backfill
+CREATE OR REPLACE FUNCTION rebuild_purchase_patterns()
+RETURNS VOID AS $$
+BEGIN
+    TRUNCATE product_order_counts, product_pair_counts;
+    
+    INSERT INTO product_order_counts (productid, order_count)
+    SELECT productid, COUNT(DISTINCT orderid)
+    FROM order_details
+    WHERE productid IS NOT NULL AND voided IS NOT TRUE
+    GROUP BY productid;
+    
+    INSERT INTO product_pair_counts (productid, companion_productid, pair_count)
+    SELECT a.productid, b.productid, COUNT(*)
+    FROM (SELECT DISTINCT orderid, productid FROM order_details
+          WHERE productid IS NOT NULL AND voided IS NOT TRUE) a
+    JOIN (SELECT DISTINCT orderid, productid FROM order_details
+          WHERE productid IS NOT NULL AND voided IS NOT TRUE) b
+        ON b.orderid = a.orderid AND b.productid <> a.productid
+    GROUP BY a.productid, b.productid;
+END;
+$$ LANGUAGE plpgsql;
 
 -- =====================================================
 -- SAMPLE DATA INSERTION (Loyalty Tiers)
@@ -426,6 +822,18 @@ SELECT
 FROM customers c
 LEFT JOIN customer_analytics ca ON c.customerid = ca.customerid;
 
+-- Purchase Patterns: co-purchase frequency and confidence read from the pair counts
+CREATE VIEW purchase_patterns AS
+SELECT 
+    ppc.productid,
+    ppc.companion_productid,
+    pa.product_name as companion_product_name,
+    ppc.pair_count as frequency,
+    ROUND(ppc.pair_count * 100.0 / NULLIF(poc.order_count, 0), 2) as confidence_score
+FROM product_pair_counts ppc
+JOIN product_order_counts poc ON poc.productid = ppc.productid
+LEFT JOIN product_analytics pa ON pa.productid = ppc.companion_productid;
+
 -- Product Recommendations View
 CREATE VIEW product_recommendations AS
 SELECT 
@@ -446,8 +854,13 @@ COMMENT ON TABLE customers IS 'Customer data imported from loftcustomers CSV';
 COMMENT ON TABLE orders IS 'Order data imported from loftorders CSV';
 COMMENT ON TABLE order_details IS 'Order line items imported from loftorderdetails CSV';
 COMMENT ON TABLE customer_analytics IS 'Derived customer analytics for proactive engagement';
+COMMENT ON TABLE customer_analytics_pending IS 'Customers queued for a customer_analytics refresh';
+COMMENT ON TABLE customer_360 IS 'Materialized customer profile keyed by normalized phone/email for identification';
+COMMENT ON TABLE customer_360_pending IS 'Customers queued for a customer_360 refresh';
 COMMENT ON TABLE product_analytics IS 'Product performance and recommendation data';
-COMMENT ON TABLE purchase_patterns IS 'Customer purchase pattern analysis for cross-selling';
+COMMENT ON VIEW purchase_patterns IS 'Co-purchase pattern analysis for cross-selling';
+COMMENT ON TABLE product_pair_counts IS 'Incremental count of orders containing each product pair';
+COMMENT ON TABLE product_order_counts IS 'Incremental count of orders containing each product';
 COMMENT ON TABLE campaign_triggers IS 'Proactive campaign triggers for chatbot engagement';
 COMMENT ON TABLE delivery_tracking IS 'Delivery status tracking for proactive notifications';
 
@@ -80,7 +80,8 @@ const AppContent = ({ user, onLogout, onChangePassword }) => {
     if (!isLoggedIn) return;
     let es;
     try {
-      es = new EventSource(`${API_BASE_URL}/api/inbox/stream`);
+      // EventSource can't set X-ACCESS-TOKEN, so the stream takes the token as a query param
+      es = new EventSource(`${API_BASE_URL}/api/inbox/stream?access_token=${encodeURIComponent(userToken || '')}`);
       es.onmessage = (evt) => {
         try {
           const payload = JSON.parse(evt.data || '{}');
@@ -93,7 +94,7 @@ const AppContent = ({ user, onLogout, onChangePassword }) => {
       };
     } catch {}
     return () => { try { es?.close(); } catch {} };
-  }, [isLoggedIn, platform]); // Removed currentContact?.id to prevent SSE reconnection on conversation change
+  }, [isLoggedIn, platform, userToken]); // Removed currentContact?.id to prevent SSE reconnection on conversation change
 
   // Initialize app state
   useEffect(() => {
@@ -0,0 +1,80 @@
+#!/usr/bin/env node
+
+// Microbenchmark: unified conversation sort, legacy parse-in-comparator vs precomputed last_message_ts
+// Usage: node test-scripts/bench-conversation-sort.js [conversations=10000] [runs=20]
+
+import { performance } from 'node:perf_hooks';
+import { toEpochMs, byRecency } from '../backend/conversation-index.js';
+
+const COUNT = Number(process.argv[2] || 10000);
+const RUNS = Number(process.argv[3] || 20);
+const NOW = Date.now();
+
+// Half ChatRace (unix-ms strings), half Woodstock/VAPI (Date objects from pg / ISO strings)
+function makeRows(n) {
+  const rows = [];
+  for (let i = 0; i < n; i++) {
+    const t = NOW - Math.floor(Math.random() * 90 * 24 * 3600 * 1000);
+    let last_message_at;
+    if (i % 2 === 0) last_message_at = String(t);
+    else if (i % 4 === 1) last_message_at = new Date(t);
+    else last_message_at = new Date(t).toISOString();
+    rows.push({ conversation_id: `c${i}`, last_message_at, source: i % 2 === 0 ? 'chatrace' : 'woodstock' });
+  }
+  return rows;
+}
+
+let sampledLogs = 0;
+let lastLog = '';
+
+// Comparator as it was in unified-inbox-endpoints.js (console.log swapped for a counter)
+function legacyCompare(a, b) {
+  let timeA = a.last_message_at || 0;
+  let timeB = b.last_message_at || 0;
+  if (typeof timeA === 'string' && /^\d+$/.test(timeA)) timeA = parseInt(timeA);
+  if (typeof timeB === 'string' && /^\d+$/.test(timeB)) timeB = parseInt(timeB);
+  const dateA = new Date(timeA).getTime();
+  const dateB = new Date(timeB).getTime();
+  if (Math.random() < 0.01) {
+    // Keep the formatting work the original log line did
+    lastLog = `🔄 Sort compare: ${dateA} vs ${dateB} (${new Date(dateA).toISOString()} vs ${new Date(dateB).toISOString()})`;
+    sampledLogs += 1;
+  }
+  return dateB - dateA;
+}
+
+function median(values) {
+  const sorted = [...values].sort((a, b) => a - b);
+  return sorted[Math.floor(sorted.length / 2)];
+}
+
+function bench(label, fn) {
+  const times = [];
+  for (let run = 0; run < RUNS; run++) {
+    const rows = makeRows(COUNT);
+    const start = performance.now();
+    fn(rows);
+    times.push(performance.now() - start);
+  }
+  const result = { label, median_ms: +median(times).toFixed(2), min_ms: +Math.min(...times).toFixed(2) };
+  console.log(`⏱️  ${label.padEnd(34)} median ${String(result.median_ms).padStart(8)} ms   min ${result.min_ms} ms`);
+  return result;
+}
+
+console.log(`🧪 Sorting ${COUNT} conversations, ${RUNS} runs each\n`);
+
+const legacy = bench('legacy comparator', rows => rows.sort(legacyCompare));
+// Ingest cost included: the key is computed once per row, then the sort compares numbers
+const precomputed = bench('normalize at ingest + numeric sort', rows => {
+  for (const row of rows) row.last_message_ts = toEpochMs(row.last_message_at);
+  rows.sort(byRecency);
+});
+
+// Same order either way
+const check = makeRows(1000);
+const a = [...check].sort(legacyCompare).map(r => r.conversation_id);
+for (const row of check) row.last_message_ts = toEpochMs(row.last_message_at);
+const b = [...check].sort(byRecency).map(r => r.conversation_id);
+const sameOrder = a.every((id, i) => id === b[i]);
+
+console.log(`\n📊 Speedup: ${(legacy.median_ms / precomputed.median_ms).toFixed(1)}x  (same order: ${sameOrder ? '✅' : '❌'}, sampled logs skipped: ${sampledLogs})`);
@@ -0,0 +1,126 @@
+#!/usr/bin/env node
+
+// Load test: cross-instance inbox event delivery over Postgres LISTEN/NOTIFY (backend/event-fanout.js)
+// Forks `replicas` processes that each run an InboxEventBus + EventFanout like server.js does;
+// `publishers` of them publish `rate` events/s for `seconds`, every other replica must receive them.
+// Usage: DATABASE_URL=postgres://... node test-scripts/bench-event-fanout.js [replicas=4] [publishers=2] [rate=500] [seconds=10]
+
+import { fork } from 'node:child_process';
+import { fileURLToPath } from 'node:url';
+import { performance } from 'node:perf_hooks';
+import pg from 'pg';
+import { InboxEventBus } from '../backend/inbox-events.js';
+import { EventFanout } from '../backend/event-fanout.js';
+
+const REPLICAS = Number(process.argv[2] || 4);
+const PUBLISHERS = Math.min(Number(process.argv[3] || 2), REPLICAS);
+const RATE = Number(process.argv[4] || 500);
+const SECONDS = Number(process.argv[5] || 10);
+const CHANNEL = `inbox_events_bench_${process.pid}`;
+const ssl = /localhost|127\.0\.0\.1/.test(process.env.DATABASE_URL || '') ? false : { rejectUnauthorized: false };
+
+const nowMs = () => performance.timeOrigin + performance.now();
+
+function percentile(sorted, p) {
+  if (sorted.length === 0) return 0;
+  return sorted[Math.min(sorted.length - 1, Math.floor((p / 100) * sorted.length))];
+}
+
+// ---- child: one replica ----
+async function runReplica(index, channel, publish) {
+  const pool = new pg.Pool({ connectionString: process.env.DATABASE_URL, ssl, max: 2 });
+  const bus = new InboxEventBus();
+  const fanout = await new EventFanout({ bus, pool, connectionString: process.env.DATABASE_URL, ssl, channel }).start();
+  const latencies = [];
+  let received = 0;
+
+  bus.subscribe((event) => {
+    if (!event.origin || event.type !== 'message_appended') return;
+    received += 1;
+    latencies.push(nowMs() - event.sent_at);
+  });
+
+  process.send({ type: 'ready' });
+  await new Promise(resolve => process.once('message', resolve)); // 'go'
+
+  let published = 0;
+  if (publish) {
+    const perTick = Math.max(1, Math.round(RATE / 100));
+    const ticks = Math.round((RATE * SECONDS) / perTick);
+    for (let i = 0; i < ticks; i++) {
+      for (let j = 0; j < perTick; j++) {
+        published += 1;
+        bus.publish({ type: 'message_appended', conversation_id: `bench_${index}_${published}`, sent_at: nowMs() });
+      }
+      await new Promise(resolve => setTimeout(resolve, 10));
+    }
+  }
+  // Leave time for the tail to arrive
+  await fanout.outbox.drain();
+  await new Promise(resolve => setTimeout(resolve, 2000));
+
+  process.send({ type: 'done', index, published, received, latencies, fanout: fanout.metrics() });
+  await fanout.stop();
+  await pool.end();
+  process.exit(0);
+}
+
+// ---- parent ----
+async function main() {
+  if (!process.env.DATABASE_URL) {
+    console.error('❌ DATABASE_URL is required');
+    process.exit(1);
+  }
+  console.log(`🚀 ${REPLICAS} replicas, ${PUBLISHERS} publishing ${RATE} events/s each for ${SECONDS}s on "${CHANNEL}"`);
+
+  const script = fileURLToPath(import.meta.url);
+  const children = [];
+  for (let i = 0; i < REPLICAS; i++) {
+    children.push(fork(script, process.argv.slice(2), {
+      env: { ...process.env, BENCH_ROLE: 'replica', BENCH_INDEX: String(i), BENCH_CHANNEL: CHANNEL, BENCH_PUBLISH: i < PUBLISHERS ? '1' : '' }
+    }));
+  }
+  const messages = (type) => Promise.all(children.map(child => new Promise((resolve) => {
+    const onMessage = (msg) => {
+      if (msg.type !== type) return;
+      child.off('message', onMessage);
+      resolve(msg);
+    };
+    child.on('message', onMessage);
+  })));
+
+  await messages('ready');
+  const started = Date.now();
+  children.forEach(child => child.send('go'));
+  const results = await messages('done');
+  const elapsed = (Date.now() - started) / 1000;
+
+  const published = results.reduce((sum, r) => sum + r.published, 0);
+  // Each event should reach every replica except the one that published it
+  const expected = results.reduce((sum, r) => sum + r.published * (REPLICAS - 1), 0);
+  const received = results.reduce((sum, r) => sum + r.received, 0);
+  const latencies = results.flatMap(r => r.latencies).sort((a, b) => a - b);
+  const dropped = results.reduce((sum, r) => sum + r.fanout.outbox.dropped + r.fanout.oversized, 0);
+  const notifies = results.reduce((sum, r) => sum + r.fanout.sentPayloads, 0);
+
+  console.log(`\n📊 Results (${elapsed.toFixed(1)}s wall clock)`);
+  console.log(`   published: ${published}  (${notifies} NOTIFY payloads, ${(published / Math.max(notifies, 1)).toFixed(1)} events each)`);
+  console.log(`   delivered: ${received}/${expected} (${((received / Math.max(expected, 1)) * 100).toFixed(2)}%), dropped by senders: ${dropped}`);
+  console.log(`   latency ms: p50 ${percentile(latencies, 50).toFixed(1)}  p95 ${percentile(latencies, 95).toFixed(1)}  p99 ${percentile(latencies, 99).toFixed(1)}  max ${(latencies[latencies.length - 1] || 0).toFixed(1)}`);
+  for (const r of results) {
+    console.log(`   replica ${r.index}: published ${r.published}, received ${r.received}, avg flush ${r.fanout.outbox.avgFlushMs}ms`);
+  }
+  process.exit(received === expected ? 0 : 1);
+}
+
+if (process.env.BENCH_ROLE === 'replica') {
+  runReplica(Number(process.env.BENCH_INDEX), process.env.BENCH_CHANNEL, Boolean(process.env.BENCH_PUBLISH)).catch((error) => {
+    console.error('❌ Replica failed:', error.message);
+    process.exit(1);
+  });
+} else {
+  main().catch((error) => {
+    console.error('❌ Benchmark failed:', error.message);
+    process.exit(1);
+  });
+}
@@ -0,0 +1,130 @@
+#!/usr/bin/env node
+
+// Memory benchmark: composing a Gmail message with one attachment of N MB
+//   legacy - string concatenation + base64 + three regex replaces (old sendEmailWithAttachment)
+//   raw    - streaming composer + one-pass base64url (what small messages still use)
+//   stream - streaming composer piped to a sink (what the media upload path sends)
+// Each case runs in a fresh process so peaks don't leak between runs.
+// Usage: node test-scripts/bench-mime-compose.js [sizesMB=1,5,10,20,40]
+
+import { fork } from 'node:child_process';
+import { fileURLToPath } from 'node:url';
+import { Writable } from 'node:stream';
+import { pipeline } from 'node:stream/promises';
+import fs from 'node:fs';
+import os from 'node:os';
+import path from 'node:path';
+import { composeRaw, mimeStream } from '../backend/mime-stream.js';
+
+const SIZES = (process.argv[2] || '1,5,10,20,40').split(',').map(Number);
+const MODES = ['legacy', 'raw', 'stream'];
+const MB = 1024 * 1024;
+
+function legacyCompose({ to, subject, body, attachments }) {
+  const boundary = 'boundary_chatrace_' + Date.now();
+  let email = [
+    'MIME-Version: 1.0\n',
+    `To: ${to}\n`,
+    `Subject: ${subject}\n`,
+    `Content-Type: multipart/mixed; boundary="${boundary}"\n\n`,
+    `--${boundary}\n`,
+    'Content-Type: text/plain; charset="UTF-8"\n\n',
+    body + '\n\n'
+  ].join('');
+  for (const att of attachments) {
+    email += `--${boundary}\n`;
+    email += `Content-Type: ${att.mimeType}\n`;
+    email += `Content-Disposition: attachment; filename="${att.filename}"\n`;
+    email += 'Content-Transfer-Encoding: base64\n\n';
+    email += att.data + '\n\n';
+  }
+  email += `--${boundary}--`;
+  return Buffer.from(email)
+    .toString('base64')
+    .replace(/\+/g, '-')
+    .replace(/\//g, '_')
+    .replace(/=+$/, '');
+}
+
+// ---- child: one (mode, size) case ----
+async function runCase(mode, file) {
+  global.gc?.();
+  const baseline = process.memoryUsage();
+  let peakRss = baseline.rss;
+  let peakHeap = baseline.heapUsed + baseline.external;
+  const sample = () => {
+    const m = process.memoryUsage();
+    peakRss = Math.max(peakRss, m.rss);
+    peakHeap = Math.max(peakHeap, m.heapUsed + m.external);
+  };
+  const sampler = setInterval(sample, 5);
+
+  const started = Date.now();
+  const message = { to: 'customer@example.com', subject: 'Benchmark', body: 'See attached.' };
+  let outBytes = 0;
+  if (mode === 'legacy') {
+    // Callers had to hand over the attachment as a base64 string
+    const data = fs.readFileSync(file).toString('base64');
+    outBytes = legacyCompose({ ...message, attachments: [{ filename: 'a.bin', mimeType: 'application/octet-stream', data }] }).length;
+  } else if (mode === 'raw') {
+    outBytes = (await composeRaw({ ...message, attachments: [{ filename: 'a.bin', path: file }] })).length;
+  } else {
+    const sink = new Writable({ write(chunk, _enc, cb) { outBytes += chunk.length; cb(); } });
+    await pipeline(mimeStream({ ...message, attachments: [{ filename: 'a.bin', path: file }] }), sink);
+  }
+  sample();
+  clearInterval(sampler);
+
+  process.send({
+    ms: Date.now() - started,
+    outMB: outBytes / MB,
+    rssMB: (peakRss - baseline.rss) / MB,
+    heapMB: (peakHeap - baseline.heapUsed - baseline.external) / MB
+  });
+}
+
+// ---- parent ----
+async function main() {
+  const script = fileURLToPath(import.meta.url);
+  const dir = fs.mkdtempSync(path.join(os.tmpdir(), 'bench-mime-'));
+  console.log('📧 Peak memory above baseline while composing one message (MB)\n');
+  console.log('attachment  mode      time ms   output MB   peak RSS   peak heap+ext');
+
+  try {
+    for (const size of SIZES) {
+      const file = path.join(dir, `${size}mb.bin`);
+      const chunk = Buffer.alloc(MB, 0x5a);
+      const fd = fs.openSync(file, 'w');
+      for (let i = 0; i < size; i++) fs.writeSync(fd, chunk);
+      fs.closeSync(fd);
+
+      for (const mode of MODES) {
+        const child = fork(script, [], { env: { ...process.env, BENCH_MODE: mode, BENCH_FILE: file }, execArgv: ['--expose-gc'] });
+        const result = await new Promise((resolve, reject) => {
+          child.once('message', resolve);
+          child.once('error', reject);
+          child.once('exit', code => code && reject(new Error(`${mode} ${size}MB exited with ${code}`)));
+        });
+        child.kill();
+        console.log(
+          `${String(size).padStart(7)} MB  ${mode.padEnd(8)}  ${String(result.ms).padStart(7)}  ${result.outMB.toFixed(1).padStart(10)}  ${result.rssMB.toFixed(1).padStart(9)}  ${result.heapMB.toFixed(1).padStart(13)}`
+        );
+      }
+      fs.unlinkSync(file);
+    }
+  } finally {
+    fs.rmSync(dir, { recursive: true, force: true });
+  }
+}
+
+if (process.env.BENCH_MODE) {
+  runCase(process.env.BENCH_MODE, process.env.BENCH_FILE).catch((error) => {
+    console.error('❌ Case failed:', error.message);
+    process.exit(1);
+  });
+} else {
+  main().catch((error) => {
+    console.error('❌ Benchmark failed:', error.message);
+    process.exit(1);
+  });
+}
@@ -0,0 +1,49 @@
+/**
+ * Conversation cursor tests
+ * Keyset merge across sources and cursor round-tripping
+ */
+
+import { encodeCursor, decodeCursor, mergeKeyset, stripKeyset } from '../backend/conversation-cursor.js';
+
+const BASE = 1754658235988;
+
+function source(name, times) {
+  return times.map((dt, i) => ({
+    conversation_id: `${name}${i}`,
+    last_message_at: name === 'cr' ? String(BASE - dt) : new Date(BASE - dt).toISOString(),
+    source: name
+  }));
+}
+
+describe('conversation cursor', () => {
+  it('round-trips cursor state and treats an empty cursor as the first page', () => {
+    const state = { cr: 40, db: { t: '1754658235988', id: 'woodstock_7' }, end: ['chatrace'] };
+
+    expect(decodeCursor(encodeCursor(state))).toEqual(state);
+    expect(decodeCursor('')).toEqual({});
+    expect(() => decodeCursor(encodeCursor([1, 2]))).toThrow('Invalid cursor');
+  });
+
+  it('k-way merges sources newest first and reports per-source consumption', () => {
+    const streams = {
+      chatrace: { rows: source('cr', [0, 30, 50]) },
+      db: { rows: source('db', [10, 20, 40, 60]) }
+    };
+
+    const { page, consumed } = mergeKeyset(streams, 5);
+
+    expect(page.map(r => r.conversation_id)).toEqual(['cr0', 'db0', 'db1', 'cr1', 'db2']);
+    expect(consumed).toEqual({ chatrace: 2, db: 3 });
+  });
+
+  it('breaks timestamp ties by conversation_id so pages never overlap', () => {
+    const streams = {
+      a: { rows: [{ conversation_id: 'b', last_message_at: BASE, _next: 1 }] },
+      b: { rows: [{ conversation_id: 'a', last_message_at: String(BASE) }] }
+    };
+
+    const { page } = mergeKeyset(streams, 1);
+
+    expect(page.map(stripKeyset)).toEqual([{ conversation_id: 'b', last_message_at: BASE, last_message_ts: BASE }]);
+  });
+});
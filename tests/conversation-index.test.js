@@ -0,0 +1,99 @@
+/**
+ * Conversation index tests
+ * Cached merged conversation list: paging, TTL refresh and SSE-driven patches
+ */
+
+import { jest } from '@jest/globals';
+import { ConversationIndex } from '../backend/conversation-index.js';
+
+function makeRows(n) {
+  // Most recent first, mixing ChatRace unix-ms strings and ISO timestamps
+  return Array.from({ length: n }, (_, i) => ({
+    conversation_id: `c${i}`,
+    last_message_at: i % 2 === 0
+      ? String(1754658235988 - i * 1000)
+      : new Date(1754658235988 - i * 1000).toISOString(),
+    source: i % 2 === 0 ? 'chatrace' : 'woodstock'
+  }));
+}
+
+describe('ConversationIndex', () => {
+  it('builds once and serves later pages from the cache', async () => {
+    const index = new ConversationIndex({ ttlMs: 60000 });
+    const loader = jest.fn(async () => makeRows(50));
+
+    const first = await index.getPage('acct', 'all', 0, 10, loader);
+    const second = await index.getPage('acct', 'all', 10, 10, loader);
+
+    expect(loader).toHaveBeenCalledTimes(1);
+    expect(first.state).toBe('miss');
+    expect(second.state).toBe('hit');
+    expect(second.data.map(r => r.conversation_id)[0]).toBe('c10');
+    expect(second.total).toBe(50);
+    expect(second.sources).toMatchObject({ chatrace: 25, woodstock: 25 });
+  });
+
+  it('coalesces concurrent cold reads into a single build', async () => {
+    const index = new ConversationIndex();
+    const loader = jest.fn(async () => makeRows(5));
+
+    await Promise.all([
+      index.getPage('acct', 'all', 0, 5, loader),
+      index.getPage('acct', 'all', 0, 5, loader)
+    ]);
+
+    expect(loader).toHaveBeenCalledTimes(1);
+  });
+
+  it('serves stale data and refreshes in the background after the TTL', async () => {
+    const index = new ConversationIndex({ ttlMs: 1000 });
+    const loader = jest.fn(async () => makeRows(3));
+
+    await index.getPage('acct', 'all', 0, 3, loader);
+    // Past the TTL but well inside the synchronous-rebuild limit
+    index.entries.get(index.key('acct', 'all')).builtAt = Date.now() - 1500;
+    const page = await index.getPage('acct', 'all', 0, 3, loader);
+
+    expect(page.state).toBe('stale');
+    expect(page.data).toHaveLength(3);
+    expect(loader).toHaveBeenCalledTimes(2);
+  });
+
+  it('rebuilds a list built while a source was failing after the short partial TTL', async () => {
+    const index = new ConversationIndex({ ttlMs: 60000, partialTtlMs: 1000 });
+    const loader = jest.fn(async () => ({ rows: makeRows(2), partial: true }));
+
+    const first = await index.getPage('acct', 'all', 0, 2, loader);
+    expect(first.partial).toBe(true);
+    expect(index.stats.partialBuilds).toBe(1);
+    expect((await index.getPage('acct', 'all', 0, 2, loader)).state).toBe('hit');
+
+    index.entries.get(index.key('acct', 'all')).builtAt = Date.now() - 1500;
+    const page = await index.getPage('acct', 'all', 0, 2, loader);
+
+    expect(page.state).toBe('stale');
+    expect(loader).toHaveBeenCalledTimes(2);
+  });
+
+  it('moves a conversation to the top on message_sent without rebuilding', async () => {
+    const index = new ConversationIndex({ ttlMs: 60000 });
+    const loader = jest.fn(async () => makeRows(20));
+    await index.getPage('acct', 'all', 0, 5, loader);
+
+    index.applyEvent({ type: 'message_sent', account_id: 'acct', conversation_id: 'c17', message: 'hi', t: Date.now() });
+    const page = await index.getPage('acct', 'all', 0, 5, loader);
+
+    expect(loader).toHaveBeenCalledTimes(1);
+    expect(page.data[0]).toMatchObject({ conversation_id: 'c17', last_message_content: 'hi' });
+    expect(page.total).toBe(20);
+  });
+
+  it('marks the account stale on conversation_updated', async () => {
+    const index = new ConversationIndex({ ttlMs: 60000 });
+    await index.getPage('acct', 'all', 0, 5, async () => makeRows(5));
+
+    index.applyEvent({ type: 'conversation_updated', account_id: 'acct', conversation_id: 'c1' });
+
+    expect(index.entries.get(index.key('acct', 'all')).stale).toBe(true);
+  });
+});
@@ -0,0 +1,77 @@
+/**
+ * Customer 360 lookup tests
+ * Phone/email normalization and the cached, single-flight profile lookup, cleared by
+ * customer_360_changed notifications
+ */
+
+import { EventEmitter } from 'events';
+import { jest } from '@jest/globals';
+import { CustomerLookup, normalizePhone, normalizeEmail, phoneFromConversationId } from '../backend/customer-360.js';
+
+function fakeDb(rows) {
+  return {
+    query: jest.fn(async (_sql, [value]) => ({ rows: rows.filter(r => r.phone_e164 === value || r.email_norm === value) }))
+  };
+}
+
+const ROW = { customerid: '9318667506', full_name: 'Wesley Lackey', phone_e164: '+16783865251', email_norm: 'wes@example.com', total_orders: '3', total_spent: '1200.50' };
+
+describe('customer 360', () => {
+  it('normalizes stored and VAPI phone formats to the same E.164 key', () => {
+    expect(normalizePhone('678-386-5251')).toBe('+16783865251');
+    expect(normalizePhone('(678) 386-5251 x12')).toBe('+16783865251');
+    expect(normalizePhone('+1 678 386 5251')).toBe('+16783865251');
+    expect(normalizePhone('386-5251')).toBeNull();
+    expect(phoneFromConversationId('vapi_rural_+16783865251')).toBe('+16783865251');
+    expect(phoneFromConversationId('woodstock_abc')).toBeNull();
+    expect(normalizeEmail('  Wes@Example.COM ')).toBe('wes@example.com');
+    expect(normalizeEmail('n/a')).toBeNull();
+  });
+
+  it('serves repeat lookups from cache and coalesces concurrent misses', async () => {
+    const db = fakeDb([ROW]);
+    const lookup = new CustomerLookup(db);
+
+    const [a, b] = await Promise.all([lookup.lookup({ phone: '678-386-5251' }), lookup.lookup({ phone: '+16783865251' })]);
+    const c = await lookup.lookup({ phone: '(678) 386-5251' });
+
+    expect(db.query).toHaveBeenCalledTimes(1);
+    expect(a).toMatchObject({ customerid: '9318667506', total_orders: 3, total_spent: 1200.5 });
+    expect(b).toBe(a);
+    expect(c).toBe(a);
+    expect(lookup.metrics()).toMatchObject({ hits: 1, queries: 1 });
+  });
+
+  it('falls back to email and caches misses', async () => {
+    const db = fakeDb([ROW]);
+    const lookup = new CustomerLookup(db);
+
+    expect(await lookup.lookup({ phone: '404-555-0100', email: 'WES@example.com' })).toMatchObject({ customerid: '9318667506' });
+    expect(await lookup.lookup({ phone: '404-555-0100' })).toBeNull();
+    expect(db.query).toHaveBeenCalledTimes(2);
+
+    lookup.invalidate();
+    await lookup.lookup({ phone: '404-555-0100' });
+    expect(db.query).toHaveBeenCalledTimes(3);
+  });
+
+  it('clears cached profiles when customer_360_changed arrives', async () => {
+    const db = fakeDb([ROW]);
+    const lookup = new CustomerLookup(db);
+    const client = Object.assign(new EventEmitter(), {
+      connect: jest.fn(async () => {}),
+      query: jest.fn(async () => ({ rows: [] })),
+      end: jest.fn(async () => {})
+    });
+    await lookup.listenForChanges({ createClient: () => client });
+    expect(client.query).toHaveBeenCalledTimes(1);
+
+    await lookup.lookup({ phone: '678-386-5251' });
+    client.emit('notification', { channel: 'customer_360_changed', payload: '1' });
+    await lookup.lookup({ phone: '678-386-5251' });
+
+    expect(db.query).toHaveBeenCalledTimes(2);
+    expect(lookup.metrics()).toMatchObject({ invalidations: 1, listening: true });
+    await lookup.stop();
+  });
+});
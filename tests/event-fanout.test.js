@@ -0,0 +1,113 @@
+/**
+ * Inbox event fan-out tests
+ * Two in-process "replicas" share a fake LISTEN/NOTIFY channel: local events go out in
+ * batches, remote ones are republished once and never echoed back
+ */
+
+import { EventEmitter } from 'events';
+import { InboxEventBus } from '../backend/inbox-events.js';
+import { EventFanout, packPayloads, MAX_PAYLOAD_BYTES } from '../backend/event-fanout.js';
+
+// Minimal stand-in for Postgres: pool.query(pg_notify ...) delivers to every LISTENing client
+function fakeServer() {
+  const listeners = new Set();
+  const notifies = [];
+  const pool = {
+    async query(_sql, [channel, payloads]) {
+      notifies.push(payloads.length);
+      for (const payload of payloads) {
+        for (const client of listeners) client.emit('notification', { channel, payload });
+      }
+      return { rows: [] };
+    }
+  };
+  const createClient = () => {
+    const client = new EventEmitter();
+    client.connect = async () => {};
+    client.query = async () => { listeners.add(client); };
+    client.end = async () => { listeners.delete(client); };
+    return client;
+  };
+  return { pool, createClient, notifies, listeners };
+}
+
+const replica = (server) => {
+  const bus = new InboxEventBus({ bufferSize: 100 });
+  const fanout = new EventFanout({
+    bus,
+    pool: server.pool,
+    createClient: server.createClient,
+    maxBatch: 50,
+    maxDelayMs: 5
+  });
+  return { bus, fanout };
+};
+
+describe('EventFanout', () => {
+  it('relays local events to other replicas in batches without echoing them back', async () => {
+    const server = fakeServer();
+    const a = replica(server);
+    const b = replica(server);
+    await a.fanout.start();
+    await b.fanout.start();
+
+    const seenOnA = [];
+    const seenOnB = [];
+    a.bus.subscribe(e => seenOnA.push(e));
+    b.bus.subscribe(e => seenOnB.push(e));
+
+    for (let i = 0; i < 10; i++) {
+      a.bus.publish({ type: 'message_appended', conversation_id: `c${i}`, account_id: 'acct1' });
+    }
+    await a.fanout.outbox.drain();
+
+    expect(seenOnA).toHaveLength(10);
+    expect(seenOnB.map(e => e.conversation_id)).toEqual(seenOnA.map(e => e.conversation_id));
+    expect(seenOnB[0].origin).toBe(a.fanout.origin);
+    expect(seenOnB[0].account_id).toBe('acct1');
+    expect(seenOnB[0].id).toBe(`${b.bus.epoch}-1`);
+    // One NOTIFY round trip, one payload, and B never sent anything back
+    expect(server.notifies).toEqual([1]);
+    expect(b.fanout.outbox.metrics().enqueued).toBe(0);
+    expect(a.fanout.metrics().sentEvents).toBe(10);
+    expect(b.fanout.metrics().receivedEvents).toBe(10);
+
+    await a.fanout.stop();
+    await b.fanout.stop();
+  });
+
+  it('splits large batches under the NOTIFY payload limit and trims oversized messages', () => {
+    const events = Array.from({ length: 40 }, (_, i) => ({ type: 'message_appended', conversation_id: `c${i}`, message: 'x'.repeat(500) }));
+    events.push({ type: 'message_appended', conversation_id: 'huge', message: 'y'.repeat(20000) });
+
+    const { payloads, oversized } = packPayloads('abc', events);
+    expect(oversized).toHaveLength(0);
+    expect(payloads.length).toBeGreaterThan(1);
+    for (const payload of payloads) expect(Buffer.byteLength(payload)).toBeLessThanOrEqual(MAX_PAYLOAD_BYTES);
+
+    const delivered = payloads.flatMap(p => JSON.parse(p).e);
+    expect(delivered).toHaveLength(41);
+    expect(delivered[40]).toEqual({ type: 'message_appended', conversation_id: 'huge', truncated: true });
+  });
+
+  it('reconnects after losing the listener and tells local clients to resync', async () => {
+    const server = fakeServer();
+    const a = replica(server);
+    await a.fanout.start();
+    const seen = [];
+    a.bus.subscribe(e => seen.push(e));
+
+    a.fanout.listener.emit('error', new Error('connection terminated'));
+    expect(a.fanout.metrics().listening).toBe(false);
+    await new Promise(resolve => setTimeout(resolve, 600));
+
+    expect(a.fanout.metrics().listening).toBe(true);
+    expect(a.fanout.metrics().reconnects).toBe(1);
+    expect(seen).toHaveLength(1);
+    expect(seen[0]).toMatchObject({ type: 'resync', reason: 'fanout_reconnect' });
+    // The resync is local only
+    expect(a.fanout.outbox.metrics().enqueued).toBe(0);
+
+    await a.fanout.stop();
+  });
+});
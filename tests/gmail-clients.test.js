@@ -0,0 +1,104 @@
+/**
+ * Gmail client cache tests
+ * Bulk sends reuse one client, an expired token is refreshed once for concurrent sends,
+ * tokens near expiry refresh in the background, and newer stored tokens are adopted
+ */
+
+import { jest } from '@jest/globals';
+import { GmailClientCache } from '../backend/gmail-clients.js';
+
+const MINUTE = 60 * 1000;
+
+function setup(row) {
+  const db = { row };
+  const deps = {
+    loadTokens: jest.fn(async () => (db.row ? { ...db.row } : null)),
+    saveTokens: jest.fn(async (_businessId, _email, credentials) => {
+      db.row = { ...db.row, access_token: credentials.access_token, expires_at: new Date(credentials.expiry_date) };
+    }),
+    refreshTokens: jest.fn(async () => {
+      await new Promise(resolve => setTimeout(resolve, 20));
+      return { access_token: 'fresh', expiry_date: Date.now() + 60 * MINUTE };
+    }),
+    createClient: jest.fn(() => {
+      const auth = { credentials: null, setCredentials(c) { this.credentials = c; } };
+      return { auth, gmail: { auth } };
+    })
+  };
+  return { db, deps, cache: new GmailClientCache(deps) };
+}
+
+describe('GmailClientCache', () => {
+  it('reads tokens once for a run of sends to the same mailbox', async () => {
+    const { deps, cache } = setup({ access_token: 'a', refresh_token: 'r', expires_at: new Date(Date.now() + 50 * MINUTE) });
+
+    const clients = [];
+    for (let i = 0; i < 100; i++) clients.push(await cache.get(1145545, 'sales@example.com'));
+
+    expect(new Set(clients).size).toBe(1);
+    expect(deps.loadTokens).toHaveBeenCalledTimes(1);
+    expect(deps.refreshTokens).toHaveBeenCalledTimes(0);
+    // Only the access token: the googleapis client must not refresh on its own
+    expect(clients[0].auth.credentials).toEqual({ access_token: 'a' });
+  });
+
+  it('refreshes an expired token once for concurrent sends', async () => {
+    const { db, deps, cache } = setup({ access_token: 'old', refresh_token: 'r', expires_at: new Date(Date.now() - MINUTE) });
+
+    const clients = await Promise.all([1, 2, 3, 4, 5].map(() => cache.get(1145545, 'sales@example.com')));
+
+    expect(deps.refreshTokens).toHaveBeenCalledTimes(1);
+    expect(deps.saveTokens).toHaveBeenCalledTimes(1);
+    expect(db.row.access_token).toBe('fresh');
+    expect(clients.every(client => client.auth.credentials.access_token === 'fresh')).toBe(true);
+    expect(cache.metrics()).toMatchObject({ refreshes: 1, loads: 1 });
+  });
+
+  it('refreshes in the background when the token is close to expiry', async () => {
+    const { deps, cache } = setup({ access_token: 'a', refresh_token: 'r', expires_at: new Date(Date.now() + 2 * MINUTE) });
+
+    const client = await cache.get(1145545, 'sales@example.com');
+    // Handed out straight away with the still-valid token
+    expect(client.auth.credentials.access_token).toBe('a');
+    await cache.get(1145545, 'sales@example.com');
+
+    await new Promise(resolve => setTimeout(resolve, 50));
+    expect(deps.refreshTokens).toHaveBeenCalledTimes(1);
+    expect(client.auth.credentials.access_token).toBe('fresh');
+    expect(cache.metrics()).toMatchObject({ backgroundRefreshes: 1 });
+  });
+
+  it('adopts a token another replica already refreshed instead of refreshing again', async () => {
+    const { db, deps, cache } = setup({ access_token: 'old', refresh_token: 'r', expires_at: new Date(Date.now() - MINUTE) });
+    // The re-read just before refreshing sees what the other replica stored
+    let reads = 0;
+    cache.loadTokens = async () => {
+      reads += 1;
+      if (reads === 2) db.row = { ...db.row, access_token: 'other', expires_at: new Date(Date.now() + 60 * MINUTE) };
+      return { ...db.row };
+    };
+
+    const client = await cache.get(1145545, 'sales@example.com');
+
+    expect(client.auth.credentials.access_token).toBe('other');
+    expect(deps.refreshTokens).toHaveBeenCalledTimes(0);
+    expect(cache.metrics()).toMatchObject({ adopted: 1 });
+  });
+
+  it('reloads from the database after invalidation', async () => {
+    const { db, deps, cache } = setup({ access_token: 'a', refresh_token: 'r', expires_at: new Date(Date.now() + 50 * MINUTE) });
+    await cache.get(1145545, 'sales@example.com');
+
+    db.row = { ...db.row, access_token: 'reconsented' };
+    cache.invalidate(1145545, 'sales@example.com');
+    const client = await cache.get(1145545, 'sales@example.com');
+
+    expect(deps.loadTokens).toHaveBeenCalledTimes(2);
+    expect(client.auth.credentials.access_token).toBe('reconsented');
+  });
+
+  it('fails without a refresh token once the access token has expired', async () => {
+    const { cache } = setup({ access_token: 'old', refresh_token: null, expires_at: new Date(Date.now() - MINUTE) });
+    await expect(cache.get(1145545, 'sales@example.com')).rejects.toThrow('no refresh token');
+  });
+});
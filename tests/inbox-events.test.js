@@ -0,0 +1,49 @@
+/**
+ * Inbox event bus tests
+ * Per-account visibility and Last-Event-ID replay from the ring buffer
+ */
+
+import { jest } from '@jest/globals';
+import { InboxEventBus, EVENT_TYPES, visibleTo, formatSse } from '../backend/inbox-events.js';
+
+describe('InboxEventBus', () => {
+  it('stamps increasing ids and notifies subscribers', () => {
+    const bus = new InboxEventBus({ bufferSize: 10 });
+    const listener = jest.fn();
+    bus.subscribe(listener);
+
+    const a = bus.publish({ type: EVENT_TYPES.MESSAGE_APPENDED, conversation_id: 'c1' });
+    const b = bus.publish({ type: EVENT_TYPES.CONVERSATION_UPSERTED, conversation_id: 'c2' });
+
+    expect(a.id).toBe(`${bus.epoch}-1`);
+    expect(b.id).toBe(bus.lastId);
+    expect(listener).toHaveBeenCalledTimes(2);
+    expect(formatSse(a)).toBe(`id: ${a.id}\ndata: ${JSON.stringify(a)}\n\n`);
+  });
+
+  it('replays missed events for the account only', () => {
+    const bus = new InboxEventBus({ bufferSize: 10 });
+    const start = bus.lastId;
+    const first = bus.publish({ type: 'message_appended', account_id: 'acct1', conversation_id: 'a' });
+    bus.publish({ type: 'message_appended', account_id: 'acct2', conversation_id: 'b' });
+    bus.publish({ type: 'conversation_upserted', source: 'woodstock', conversation_id: 'woodstock_1' });
+
+    expect(bus.since(start, 'acct1').map(e => e.conversation_id)).toEqual(['a', 'woodstock_1']);
+    expect(bus.since(first.id, 'acct1').map(e => e.conversation_id)).toEqual(['woodstock_1']);
+    expect(bus.since(bus.lastId, 'acct1')).toEqual([]);
+    expect(visibleTo({ account_id: 'acct2' }, undefined)).toBe(false);
+  });
+
+  it('asks for a resync once the id has been evicted or comes from another process', () => {
+    const bus = new InboxEventBus({ bufferSize: 3 });
+    const start = bus.lastId;
+    const ids = [];
+    for (let i = 0; i < 5; i++) ids.push(bus.publish({ type: 'message_appended', conversation_id: `c${i}` }).id);
+
+    expect(bus.since(start, null)).toBeNull();
+    expect(bus.since(ids[1], null).map(e => e.conversation_id)).toEqual(['c2', 'c3', 'c4']);
+    expect(bus.since(new InboxEventBus().lastId, null)).toBeNull();
+    expect(bus.since(`${bus.epoch}-999`, null)).toBeNull();
+    expect(bus.since('garbage', null)).toBeNull();
+  });
+});
@@ -0,0 +1,50 @@
+/**
+ * LOFT CSV ingestion tests
+ * Streaming parser edge cases and per-column normalization against the schema
+ */
+
+import { loadTableSpecs, parseCsv, bindHeader, normalizeRecord, toCopyLine } from '../data-samples/loft-csv.js';
+
+async function collect(chunks) {
+  const records = [];
+  for await (const record of parseCsv(chunks)) records.push(record);
+  return records;
+}
+
+describe('LOFT CSV ingestion', () => {
+  const specs = loadTableSpecs();
+
+  it('parses quoted fields, escaped quotes and CRLF regardless of chunk boundaries', async () => {
+    const text = 'a,b,c\r\n"1,5","say ""hi""",\r\n"multi\nline",x,"y"\r\n';
+    const expected = [['a', 'b', 'c'], ['1,5', 'say "hi"', ''], ['multi\nline', 'x', 'y']];
+
+    expect(await collect([text])).toEqual(expected);
+    // One character per chunk splits every quote pair and CRLF
+    expect(await collect(text.split(''))).toEqual(expected);
+    expect(await collect(['a,b'])).toEqual([['a', 'b']]);
+  });
+
+  it('nulls LOFT sentinel dates and normalizes flags and money', () => {
+    const columns = bindHeader(specs.orders, ['orderid', 'deliverydate', 'massclose', 'tax', 'percentofsale1']);
+    const stats = {};
+    const { values, error } = normalizeRecord(columns, ['0711512II98', '3333-03-03 00:00:00.000', 'Y', '$1,234.50', '100.000'], stats);
+
+    expect(error).toBeUndefined();
+    expect(values).toEqual(['0711512II98', null, 't', '1234.50', '100.000']);
+    expect(stats.sentinelDates).toBe(1);
+  });
+
+  it('rejects rows that would fail COPY instead of aborting the file', () => {
+    const columns = bindHeader(specs.orders, ['orderid', 'orderdate', 'tax']);
+
+    expect(normalizeRecord(columns, ['', '2025-07-11', '1'], {}).error).toMatch(/orderid is required/);
+    expect(normalizeRecord(columns, ['A1', '2025-02-30', '1'], {}).error).toMatch(/invalid date/);
+    expect(normalizeRecord(columns, ['A1', '2025-07-11', 'abc'], {}).error).toMatch(/invalid number/);
+    expect(normalizeRecord(columns, ['A1', '2025-07-11'], {}).error).toMatch(/expected 3 fields/);
+    expect(() => bindHeader(specs.orders, ['orderid', 'nope'])).toThrow('unknown column');
+  });
+
+  it('escapes COPY text format', () => {
+    expect(toCopyLine(['a\tb', null, 'c\\d\ne'])).toBe('a\\tb\t\\N\tc\\\\d\\ne\n');
+  });
+});
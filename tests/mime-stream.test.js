@@ -0,0 +1,74 @@
+/**
+ * MIME composer tests
+ * Attachments from Buffers, streams and legacy base64 strings round-trip byte for byte,
+ * lines stay within 76 chars, streaming base64url matches the one-shot encoding, and the size
+ * estimate behind the raw/media choice counts attachments as encoded once
+ */
+
+import { Readable } from 'stream';
+import { composeMime, composeRaw, encodeHeaderValue, estimatedSize } from '../backend/mime-stream.js';
+
+const bytes = (n) => Buffer.from(Array.from({ length: n }, (_, i) => (i * 31) % 256));
+
+async function compose(message) {
+  const parts = [];
+  for await (const part of composeMime({ boundary: 'XYZ', ...message })) parts.push(Buffer.from(part));
+  return Buffer.concat(parts).toString('latin1');
+}
+
+// Decoded body of the n-th MIME part
+function partBody(text, n) {
+  const part = text.split('--XYZ')[n];
+  return Buffer.from(part.slice(part.indexOf('\r\n\r\n') + 4).replace(/\r\n/g, ''), 'base64');
+}
+
+describe('composeMime', () => {
+  it('encodes Buffer, stream and base64 attachments in 76-char lines', async () => {
+    const big = bytes(200003);
+    const streamed = bytes(5000);
+    const text = await compose({
+      to: 'customer@example.com',
+      subject: 'Invoice',
+      body: 'Attached.',
+      attachments: [
+        { filename: 'a.bin', mimeType: 'application/octet-stream', content: big },
+        // Odd chunk sizes: the encoder must carry partial lines between chunks
+        { filename: 'b.bin', content: Readable.from([streamed.subarray(0, 100), streamed.subarray(100, 4001), streamed.subarray(4001)]) },
+        { filename: 'c.txt', mimeType: 'text/plain', data: Buffer.from('hello').toString('base64') }
+      ]
+    });
+
+    expect(partBody(text, 2).equals(big)).toBe(true);
+    expect(partBody(text, 3).equals(streamed)).toBe(true);
+    expect(partBody(text, 4).toString()).toBe('hello');
+    expect(Math.max(...text.split('\r\n').map(line => line.length))).toBeLessThanOrEqual(76);
+    expect(text.endsWith('--XYZ--\r\n')).toBe(true);
+  });
+
+  it('encodes non-ASCII subjects', () => {
+    expect(encodeHeaderValue('Factura pequeña')).toBe(`=?UTF-8?B?${Buffer.from('Factura pequeña').toString('base64')}?=`);
+    expect(encodeHeaderValue('Invoice')).toBe('Invoice');
+  });
+});
+
+describe('composeRaw', () => {
+  it('produces the same base64url as encoding the whole message at once', async () => {
+    const message = { to: 'a@example.com', subject: 'x', body: 'y', attachments: [{ filename: 'f', content: bytes(100001) }] };
+    const raw = await composeRaw({ boundary: 'XYZ', ...message });
+    const whole = Buffer.from(await compose(message), 'latin1');
+
+    expect(raw).toBe(whole.toString('base64url'));
+    expect(/[+/=]/.test(raw)).toBe(false);
+  });
+});
+
+describe('estimatedSize', () => {
+  it('counts attachments as encoded once', () => {
+    const MB = 1024 * 1024;
+    const size = estimatedSize({ body: 'abc', attachments: [{ filename: 'a.bin', size: 3 * MB }] });
+
+    // 3 MB of file is 4 MB of base64 plus line breaks, not another third on top
+    expect(size).toBe(4 + 4 * MB * (78 / 76));
+    expect(size).toBeLessThan(4.2 * MB);
+  });
+});
@@ -0,0 +1,114 @@
+/**
+ * Rate limiter tests
+ * Token-bucket refill, bounded key space, per-IP and per-authenticated-account limits per route class,
+ * and fallback to local buckets when the shared store fails
+ */
+
+import { jest } from '@jest/globals';
+import { RateLimiter, MemoryBucketStore, PgBucketStore, perWindow, clientIp } from '../backend/rate-limiter.js';
+
+// account: the authenticated account (set by requireAuth); claimed: a spoofable x-business-id
+const req = (ip, account, claimed) => ({
+  headers: { 'x-forwarded-for': `${ip}, 10.0.0.1`, ...(claimed ? { 'x-business-id': claimed } : {}) },
+  socket: { remoteAddress: '10.0.0.1' },
+  query: {},
+  accountId: account
+});
+
+function fakeRes() {
+  return {
+    headers: {},
+    statusCode: 200,
+    body: null,
+    setHeader(name, value) { this.headers[name] = value; },
+    status(code) { this.statusCode = code; return this; },
+    json(body) { this.body = body; return this; }
+  };
+}
+
+// Resolves once the middleware either calls next() or answers
+function call(middleware, request) {
+  const res = fakeRes();
+  return new Promise((resolve) => {
+    const json = res.json.bind(res);
+    res.json = (body) => { json(body); resolve({ res, passed: false }); return res; };
+    middleware(request, res, () => resolve({ res, passed: true }));
+  });
+}
+
+describe('MemoryBucketStore', () => {
+  it('spends the burst, then refills over time', () => {
+    const store = new MemoryBucketStore();
+    const limits = perWindow(3, 3000); // 1 token per second
+    const t = 1000000;
+
+    expect([1, 2, 3, 4].map(() => store.take('k', limits, 1, t).allowed)).toEqual([true, true, true, false]);
+    expect(store.take('k', limits, 1, t).retryAfterMs).toBe(1000);
+    expect(store.take('k', limits, 1, t + 1000).allowed).toBe(true);
+    expect(store.take('k', limits, 1, t + 1000).allowed).toBe(false);
+  });
+
+  it('keeps at most maxKeys buckets, dropping the least recently used', () => {
+    const store = new MemoryBucketStore({ maxKeys: 100 });
+    for (let i = 0; i < 1000; i++) store.take(`ip:${i}`, perWindow(10, 60000));
+    store.take('ip:950', perWindow(10, 60000));
+    store.take('ip:new', perWindow(10, 60000));
+
+    expect(store.metrics()).toMatchObject({ keys: 100, evicted: 901 });
+    expect(store.buckets.has('ip:950')).toBe(true);
+    expect(store.buckets.has('ip:0')).toBe(false);
+  });
+});
+
+describe('RateLimiter', () => {
+  it('limits per IP and per account within a route class', async () => {
+    const limiter = new RateLimiter({
+      classes: {
+        send: { ip: perWindow(2, 60000), account: perWindow(3, 60000) },
+        read: { ip: perWindow(100, 60000) }
+      }
+    });
+    const send = limiter.middleware('send');
+    const read = limiter.middleware('read');
+
+    expect((await call(send, req('1.1.1.1', 'acct1'))).passed).toBe(true);
+    expect((await call(send, req('1.1.1.1', 'acct1'))).passed).toBe(true);
+    const limited = await call(send, req('1.1.1.1', 'acct1'));
+    expect(limited.passed).toBe(false);
+    expect(limited.res.statusCode).toBe(429);
+    expect(limited.res.headers['Retry-After']).toBe('30');
+
+    // Another IP of the same account has one account token left
+    expect((await call(send, req('2.2.2.2', 'acct1'))).passed).toBe(true);
+    expect((await call(send, req('2.2.2.2', 'acct1'))).passed).toBe(false);
+    // Reads have their own budget
+    expect((await call(read, req('1.1.1.1', 'acct1'))).passed).toBe(true);
+    expect(limiter.metrics()).toMatchObject({ allowed: 4, limited: 2, store: 'memory' });
+  });
+
+  it('ignores an account the caller only claims', async () => {
+    const limiter = new RateLimiter({ classes: { send: { ip: perWindow(100, 60000), account: perWindow(2, 60000) } } });
+    const send = limiter.middleware('send');
+
+    // An unauthenticated caller naming acct1 only spends its own IP bucket
+    for (let i = 0; i < 5; i++) expect((await call(send, req('6.6.6.6', null, 'acct1'))).passed).toBe(true);
+    expect((await call(send, req('1.1.1.1', 'acct1'))).passed).toBe(true);
+    expect((await call(send, req('1.1.1.1', 'acct1'))).passed).toBe(true);
+    expect((await call(send, req('1.1.1.1', 'acct1'))).passed).toBe(false);
+  });
+
+  it('falls back to local buckets when the shared store is down', async () => {
+    const db = { query: jest.fn(async () => { throw new Error('connection refused'); }) };
+    const limiter = new RateLimiter({ classes: { send: { ip: perWindow(1, 60000) } }, store: new PgBucketStore(db) });
+    const send = limiter.middleware('send');
+
+    expect((await call(send, req('1.1.1.1'))).passed).toBe(true);
+    expect((await call(send, req('1.1.1.1'))).passed).toBe(false);
+    expect(limiter.metrics().storeErrors).toBe(2);
+  });
+
+  it('takes the client address from the first forwarded hop', () => {
+    expect(clientIp(req('203.0.113.9'))).toBe('203.0.113.9');
+    expect(clientIp({ headers: {}, socket: { remoteAddress: '::1' } })).toBe('::1');
+  });
+});
@@ -0,0 +1,86 @@
+/**
+ * Reference data cache tests
+ * TTL per op, stale-while-revalidate, byte-bounded eviction, per-account invalidation
+ * and ETag matching
+ */
+
+import { jest } from '@jest/globals';
+import { ReferenceCache, etagFor, isNotModified } from '../backend/reference-cache.js';
+
+const ok = (data) => JSON.stringify({ status: 'OK', data });
+const tags = (accountId = 'acct1', token = 't1') => ({ accountId, token, payload: { op: 'tags', op1: 'get', account_id: accountId } });
+
+describe('ReferenceCache', () => {
+  it('serves hits within the TTL and keys by account and token', async () => {
+    const cache = new ReferenceCache();
+    const load = jest.fn(async () => ok(['vip']));
+
+    expect((await cache.get(tags(), load)).state).toBe('miss');
+    const hit = await cache.get(tags(), load);
+    expect(hit).toEqual({ body: ok(['vip']), etag: etagFor(ok(['vip'])), state: 'hit' });
+    await cache.get(tags('acct2'), load);
+    await cache.get(tags('acct1', 't2'), load);
+    expect(load).toHaveBeenCalledTimes(3);
+  });
+
+  it('answers stale entries immediately and refreshes once in the background', async () => {
+    const cache = new ReferenceCache({ ttls: { tags: 1000 } });
+    await cache.get(tags(), async () => ok(['old']));
+    cache.entries.forEach((entry) => { entry.fetchedAt -= 5000; });
+
+    let release;
+    const load = jest.fn(() => new Promise((resolve) => { release = resolve; }));
+    const [a, b] = await Promise.all([cache.get(tags(), load), cache.get(tags(), load)]);
+    expect([a.state, b.state]).toEqual(['stale', 'stale']);
+    expect(a.body).toBe(ok(['old']));
+    expect(load).toHaveBeenCalledTimes(1);
+
+    release(ok(['new']));
+    await cache.refreshing.values().next().value;
+    expect((await cache.get(tags(), load)).body).toBe(ok(['new']));
+  });
+
+  it('does not keep ChatRace errors', async () => {
+    const cache = new ReferenceCache();
+    const result = await cache.get(tags(), async () => JSON.stringify({ status: 'ERROR', message: 'bad token' }));
+    expect(result.state).toBe('uncacheable');
+    expect(cache.metrics().entries).toBe(0);
+  });
+
+  it('evicts least recently used entries past the byte budget', async () => {
+    const cache = new ReferenceCache({ maxBytes: 1000 });
+    for (let i = 0; i < 5; i++) await cache.get(tags(`acct${i}`), async () => ok('x'.repeat(300)));
+
+    expect(cache.metrics().entries).toBe(3);
+    expect(cache.metrics().bytes).toBeLessThan(1001);
+    expect(cache.metrics().evictions).toBe(2);
+  });
+
+  it('invalidates one op of one account, including a refresh in flight', async () => {
+    const cache = new ReferenceCache();
+    const replies = (accountId) => ({ accountId, token: 't1', payload: { op: 'inbox_saved_reply', op1: 'get', account_id: accountId } });
+    await cache.get(replies('acct1'), async () => ok(['hi']));
+    await cache.get(replies('acct2'), async () => ok(['hey']));
+    await cache.get(tags('acct1'), async () => ok(['vip']));
+
+    // A load that was in flight when the write happened must not store its old answer
+    let release;
+    const inFlight = cache.get(replies('acct3'), () => new Promise((resolve) => { release = resolve; }));
+    await Promise.resolve();
+    cache.invalidate('acct1', 'inbox_saved_reply');
+    cache.invalidate('acct3', 'inbox_saved_reply');
+    release(ok(['before the write']));
+    expect((await inFlight).state).toBe('uncacheable');
+
+    expect(cache.metrics().entries).toBe(2);
+    expect((await cache.get(replies('acct1'), async () => ok(['hi', 'bye']))).body).toBe(ok(['hi', 'bye']));
+  });
+});
+
+describe('isNotModified', () => {
+  it('matches any tag in If-None-Match', () => {
+    const etag = etagFor(ok([]));
+    expect(isNotModified({ headers: { 'if-none-match': `W/"other", ${etag}` } }, etag)).toBe(true);
+    expect(isNotModified({ headers: {} }, etag)).toBe(false);
+  });
+});
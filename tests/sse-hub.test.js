@@ -0,0 +1,123 @@
+/**
+ * SSE hub tests
+ * Backpressure on slow streams: queue until 'drain', coalesce an overflowing backlog into one
+ * resync, evict clients that stay stalled, one shared heartbeat
+ */
+
+import { EventEmitter } from 'events';
+import { SseHub } from '../backend/sse-hub.js';
+
+// Response stand-in whose socket buffer holds `capacity` bytes until flushed
+function fakeRes(capacity = Infinity) {
+  const res = new EventEmitter();
+  res.chunks = [];
+  res.writableLength = 0;
+  res.destroyed = false;
+  res.write = (chunk) => {
+    res.chunks.push(chunk);
+    res.writableLength += Buffer.byteLength(chunk);
+    return res.writableLength < capacity;
+  };
+  res.flush = () => {
+    res.writableLength = 0;
+    res.emit('drain');
+  };
+  res.destroy = () => { res.destroyed = true; };
+  res.end = () => { res.ended = true; };
+  return res;
+}
+
+const event = (n, extra = {}) => ({ id: `e-${n}`, type: 'message_appended', conversation_id: `c${n}`, ...extra });
+const types = (res) => res.chunks.map(c => JSON.parse(c.split('data: ')[1]).type);
+
+describe('SseHub', () => {
+  it('writes directly while the socket keeps up and filters by account', () => {
+    const hub = new SseHub();
+    const a = fakeRes();
+    const b = fakeRes();
+    hub.add(a, { accountId: 'acct1' });
+    hub.add(b, { accountId: 'acct2' });
+
+    hub.broadcast(event(1, { account_id: 'acct1' }));
+    hub.broadcast(event(2));
+
+    expect(a.chunks).toHaveLength(2);
+    expect(b.chunks).toHaveLength(1);
+    expect(hub.metrics()).toMatchObject({ clients: 2, paused: 0, sent: 3, queuedBytes: 0 });
+    hub.stopTimer();
+  });
+
+  it('queues while paused and flushes in order on drain', () => {
+    const hub = new SseHub();
+    const res = fakeRes(1); // every write fills the buffer
+    hub.add(res);
+
+    hub.broadcast(event(1));
+    hub.broadcast(event(2));
+    hub.broadcast(event(3));
+    expect(res.chunks).toHaveLength(1);
+    expect(hub.metrics()).toMatchObject({ paused: 1, queued: 2 });
+
+    res.flush(); // writes #2, full again
+    res.flush(); // writes #3
+    expect(res.chunks.map(c => c.match(/id: (\S+)/)[1])).toEqual(['e-1', 'e-2', 'e-3']);
+    expect(hub.metrics().queuedBytes).toBe(0);
+    hub.stopTimer();
+  });
+
+  it('collapses an overflowing backlog into a single resync', () => {
+    const hub = new SseHub({ maxQueueBytes: 500 });
+    const res = fakeRes(1);
+    hub.add(res);
+
+    for (let i = 0; i < 50; i++) hub.broadcast(event(i, { message: 'x'.repeat(50) }));
+    expect(hub.metrics().coalesced).toBe(1);
+    expect(hub.metrics().queuedBytes).toBeLessThan(500);
+
+    res.flush();
+    res.flush();
+    expect(types(res)).toEqual(['message_appended', 'resync']);
+
+    // Back to normal delivery once drained
+    res.flush();
+    hub.broadcast(event(99));
+    expect(types(res)).toEqual(['message_appended', 'resync', 'message_appended']);
+    hub.stopTimer();
+  });
+
+  it('shares one heartbeat and evicts clients stalled past the limit', () => {
+    const hub = new SseHub({ evictAfterMs: 1000 });
+    const healthy = fakeRes();
+    const stalled = fakeRes(1);
+    hub.add(healthy);
+    const client = hub.add(stalled);
+    hub.broadcast(event(1)); // stalls the second client
+
+    const now = client.pausedAt;
+    hub.tick(now + 500);
+    expect(types(healthy)).toEqual(['message_appended', 'heartbeat']);
+    expect(stalled.chunks).toHaveLength(1);
+
+    hub.tick(now + 1000);
+    expect(stalled.destroyed).toBe(true);
+    expect(hub.metrics()).toMatchObject({ clients: 1, evicted: 1 });
+
+    hub.remove([...hub.clients][0]);
+    expect(hub.timer).toBeNull();
+  });
+
+  it('ends every stream on shutdown', () => {
+    const hub = new SseHub({ heartbeatMs: 60000 });
+    const a = fakeRes();
+    const b = fakeRes(1);
+    hub.add(a, { accountId: '1' });
+    hub.send(hub.add(b, { accountId: '2' }), 'data: {"type":"hello"}\n\n');
+
+    hub.closeAll();
+
+    expect(a.ended).toBe(true);
+    expect(b.ended).toBe(true);
+    expect(hub.metrics()).toMatchObject({ clients: 0, queuedBytes: 0 });
+    expect(hub.timer).toBeNull();
+  });
+});
@@ -0,0 +1,55 @@
+/**
+ * TTL cache tests
+ * LRU bound, expiry, single-flight loads and invalidation racing an in-flight load
+ */
+
+import { jest } from '@jest/globals';
+import { TtlCache } from '../backend/ttl-cache.js';
+
+describe('TtlCache', () => {
+  it('loads once for concurrent callers and serves hits afterwards, misses included', async () => {
+    const cache = new TtlCache({ ttlMs: 1000 });
+    const loader = jest.fn(async () => null);
+
+    const results = await Promise.all([1, 2, 3].map(() => cache.getOrLoad('1145545\u0000nobody@example.com', loader)));
+    expect(results).toEqual([null, null, null]);
+    await cache.getOrLoad('1145545\u0000nobody@example.com', loader);
+
+    expect(loader).toHaveBeenCalledTimes(1);
+    expect(cache.metrics()).toMatchObject({ hits: 1, misses: 3, loads: 1, entries: 1 });
+  });
+
+  it('expires entries and evicts the least recently used', async () => {
+    const cache = new TtlCache({ ttlMs: 1000, maxEntries: 2 });
+    cache.set('a', 1);
+    cache.set('b', 2);
+    cache.get('a');
+    cache.set('c', 3);
+    expect(cache.get('b')).toBeUndefined();
+    expect(cache.get('a')).toBe(1);
+
+    cache.entries.get('a').expiresAt = Date.now() - 1;
+    expect(cache.get('a')).toBeUndefined();
+  });
+
+  it('does not cache failed loads', async () => {
+    const cache = new TtlCache();
+    await expect(cache.getOrLoad('k', async () => { throw new Error('db down'); })).rejects.toThrow('db down');
+    expect(await cache.getOrLoad('k', async () => 'ok')).toBe('ok');
+  });
+
+  it('drops a load that was in flight when the entry was invalidated', async () => {
+    const cache = new TtlCache();
+    let release;
+    const slow = cache.getOrLoad('biz1\u0000a@example.com', () => new Promise((resolve) => { release = resolve; }));
+    await Promise.resolve(); // let the loader start
+
+    cache.deleteWhere(key => key.startsWith('biz1\u0000'));
+    release({ role: 'admin' });
+    expect(await slow).toEqual({ role: 'admin' });
+    expect(cache.get('biz1\u0000a@example.com')).toBeUndefined();
+
+    // The next caller loads the fresh row
+    expect(await cache.getOrLoad('biz1\u0000a@example.com', async () => ({ role: 'user' }))).toEqual({ role: 'user' });
+  });
+});
@@ -0,0 +1,79 @@
+/**
+ * Upstream client tests
+ * Identical concurrent reads share one request, writes and different tokens don't,
+ * and sequential calls reuse one keep-alive socket
+ */
+
+import http from 'http';
+import { postUpstream, upstreamMetrics, isReadOp } from '../backend/upstream-client.js';
+
+let server;
+let url;
+let requests;
+let connections;
+
+beforeAll(async () => {
+  server = http.createServer((req, res) => {
+    let body = '';
+    req.on('data', (chunk) => { body += chunk; });
+    req.on('end', () => {
+      requests.push({ token: req.headers['x-access-token'], payload: JSON.parse(body) });
+      setTimeout(() => {
+        res.setHeader('Content-Type', 'application/json');
+        res.end(JSON.stringify({ status: 'OK', data: [{ op: JSON.parse(body).op }] }));
+      }, 30);
+    });
+  });
+  server.on('connection', () => { connections += 1; });
+  await new Promise(resolve => server.listen(0, '127.0.0.1', resolve));
+  url = `http://127.0.0.1:${server.address().port}/php/user`;
+});
+
+afterAll(() => new Promise(resolve => server.close(resolve)));
+
+beforeEach(() => {
+  requests = [];
+  connections = 0;
+});
+
+const headers = (token) => ({ 'Content-Type': 'application/json', 'X-ACCESS-TOKEN': token });
+
+describe('postUpstream', () => {
+  it('coalesces identical in-flight reads and gives every caller a readable body', async () => {
+    const before = upstreamMetrics().coalesced;
+    const responses = await Promise.all(Array.from({ length: 10 }, (_, i) =>
+      // Same payload, different key order
+      postUpstream(url, headers('t1'), i % 2 ? { op: 'tags', op1: 'get', account_id: '1145545' } : { account_id: '1145545', op1: 'get', op: 'tags' })
+    ));
+
+    expect(requests).toHaveLength(1);
+    expect(upstreamMetrics().coalesced - before).toBe(9);
+    const bodies = await Promise.all(responses.map(r => r.json()));
+    expect(bodies.every(b => b.status === 'OK' && b.data[0].op === 'tags')).toBe(true);
+    expect(responses[3].status).toBe(200);
+    expect(responses[3].headers.get('content-type')).toBe('application/json');
+  });
+
+  it('sends writes and reads with other tokens or accounts separately', async () => {
+    await Promise.all([
+      postUpstream(url, headers('t1'), { op: 'tags', op1: 'get', account_id: 'a' }),
+      postUpstream(url, headers('t2'), { op: 'tags', op1: 'get', account_id: 'a' }),
+      postUpstream(url, headers('t1'), { op: 'tags', op1: 'get', account_id: 'b' }),
+      postUpstream(url, headers('t1'), { op: 'inbox_saved_reply', op1: 'add', account_id: 'a', data: { shortcode: 'hi' } }),
+      postUpstream(url, headers('t1'), { op: 'inbox_saved_reply', op1: 'add', account_id: 'a', data: { shortcode: 'hi' } })
+    ]);
+    expect(requests).toHaveLength(5);
+    expect(isReadOp({ op: 'calendars', op1: 'appointments', op2: 'get' })).toBe(true);
+    expect(isReadOp({ op: 'login', op1: 'email', op2: 'sendOTP' })).toBe(false);
+  });
+
+  it('reuses a keep-alive socket for sequential calls', async () => {
+    for (let i = 0; i < 5; i++) {
+      const response = await postUpstream(url, headers('t1'), { op: 'flows', op1: 'get', account_id: 'a', n: i });
+      await response.text();
+    }
+    expect(requests).toHaveLength(5);
+    // At most one new socket (a free one left by the tests above may be reused instead)
+    expect(connections).toBeLessThan(2);
+  });
+});
@@ -0,0 +1,79 @@
+/**
+ * Write batcher tests
+ * Size/time-triggered flushes, retries with backoff, bad-row isolation and drain
+ */
+
+import { jest } from '@jest/globals';
+import { WriteBatcher } from '../backend/write-batcher.js';
+
+describe('WriteBatcher', () => {
+  it('flushes as soon as a batch fills up', async () => {
+    const flush = jest.fn(async () => {});
+    const batcher = new WriteBatcher({ name: 'test', flush, maxBatch: 3, maxDelayMs: 60000 });
+
+    [1, 2, 3].forEach(n => batcher.add(n));
+    await batcher.flushing;
+
+    expect(flush).toHaveBeenCalledWith([1, 2, 3]);
+    expect(batcher.metrics()).toMatchObject({ written: 3, queueDepth: 0, flushes: 1 });
+  });
+
+  it('flushes a partial batch after maxDelayMs', async () => {
+    const flush = jest.fn(async () => {});
+    const batcher = new WriteBatcher({ name: 'test', flush, maxBatch: 100, maxDelayMs: 5 });
+
+    batcher.add('a');
+    expect(batcher.metrics().queueDepth).toBe(1);
+    await new Promise(resolve => setTimeout(resolve, 30));
+
+    expect(flush).toHaveBeenCalledWith(['a']);
+  });
+
+  it('retries a failed batch and gives up after maxAttempts', async () => {
+    const flush = jest.fn(async () => { throw new Error('db down'); });
+    const onDrop = jest.fn();
+    const batcher = new WriteBatcher({ name: 'test', flush, onDrop, maxBatch: 10, maxDelayMs: 1, maxAttempts: 2, retryDelayMs: 1 });
+
+    batcher.add('x');
+    await batcher.drain();
+
+    expect(flush).toHaveBeenCalledTimes(2);
+    expect(onDrop).toHaveBeenCalledTimes(1);
+    expect(onDrop.mock.calls[0][0]).toBe('x');
+    expect(batcher.metrics()).toMatchObject({ dropped: 1, retried: 1, failedFlushes: 2, queueDepth: 0 });
+  });
+
+  it('backs off exponentially between attempts', async () => {
+    const attempts = [];
+    const flush = jest.fn(async () => {
+      attempts.push(Date.now());
+      throw new Error('db down');
+    });
+    const batcher = new WriteBatcher({ name: 'test', flush, onDrop: () => {}, maxBatch: 10, maxDelayMs: 1, maxAttempts: 3, retryDelayMs: 20 });
+
+    batcher.add('x');
+    await batcher.drain();
+
+    expect(attempts).toHaveLength(3);
+    expect(attempts[1] - attempts[0]).toBeGreaterThan(15);
+    expect(attempts[2] - attempts[1]).toBeGreaterThan(35);
+  });
+
+  it('drops only the bad row of a failed batch', async () => {
+    const written = [];
+    const flush = jest.fn(async (items) => {
+      if (items.includes('bad')) throw new Error('violates check constraint');
+      written.push(...items);
+    });
+    const onDrop = jest.fn();
+    const batcher = new WriteBatcher({ name: 'test', flush, onDrop, maxBatch: 8, maxDelayMs: 60000, maxAttempts: 2, retryDelayMs: 1 });
+
+    ['a', 'b', 'c', 'bad', 'd', 'e', 'f', 'g'].forEach(item => batcher.add(item));
+    await batcher.drain();
+
+    expect(written.sort()).toEqual(['a', 'b', 'c', 'd', 'e', 'f', 'g']);
+    expect(onDrop).toHaveBeenCalledTimes(1);
+    expect(onDrop.mock.calls[0][0]).toBe('bad');
+    expect(batcher.metrics()).toMatchObject({ written: 7, dropped: 1, queueDepth: 0, retryPending: 0 });
+  });
+});